@@ -0,0 +1,5 @@
+"""
+Benchmarks for the Chat Crown project.
+
+Each module can be run directly, e.g. `python -m benchmarks.keyword_matcher_bench`.
+"""
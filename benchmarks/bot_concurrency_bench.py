@@ -0,0 +1,223 @@
+"""
+Many bot users at once: sync sessions inside the handlers vs the async database layer.
+
+Usage:
+    python -m benchmarks.bot_concurrency_bench [--users 200] [--messages 5] [--db-latency-ms 1]
+                                               [--url postgresql://...]
+
+Every simulated user sends `--messages` expenses (writes), then asks for
+/resumo as many times (reads), all users at the same time on one event loop,
+the way the bot receives updates with `concurrent_updates`:
+
+- sync:  the previous handlers, calling the sync services (and so blocking
+         the event loop) for the user lookup, the insert and the summary
+- async: the real `message_handler` and `summary_handler`, which await the
+         async services
+
+Local SQLite answers in microseconds, so `--db-latency-ms` adds a simulated
+network round trip to every statement (a blocking sleep for the sync driver,
+an awaited one for the async driver, as with psycopg2 vs asyncpg). Pass
+`--url` with `--db-latency-ms 0` to measure a real PostgreSQL server instead;
+its schema must be migrated and the benchmark users (ids from 1_000_000) are
+deleted afterwards. Reported per phase: wall time, updates/sec and how long
+the event loop was stalled (the delay any other user's update would have
+waited). SQLite allows a single writer, so on SQLite the write phase gains
+responsiveness rather than throughput; reads run in parallel.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import delete, event
+from sqlalchemy.util import await_only
+
+import models  # registers every mapper before the first query
+from bot.handlers.message_handler import message_handler
+from bot.handlers.summary_handler import summary_handler
+from models.rollup import DailyRollup, MonthlyRollup
+from models.transaction import Transaction
+from models.user import User
+from services.ai_processor import ai_processor
+from services.async_database import async_db_manager
+from services.database import db_manager
+from services.finance_calculator import finance_calculator
+from services.transactions_service import transactions_service
+from services.users_service import UsersService
+
+FIRST_USER = 1_000_000
+MESSAGES = ["almoço 32,50", "uber 18", "mercado 245,90", "farmácia 37", "cinema 60", "padaria 12,40"]
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def fake_update(telegram_id: int, text: str):
+    user = {"id": telegram_id, "username": f"user{telegram_id}", "first_name": "Bench", "last_name": None}
+    return SimpleNamespace(effective_user=user, message=FakeMessage(text))
+
+
+async def legacy_message(update, context):
+    """The previous `message_handler`: sync user lookup and insert inside the coroutine."""
+    user = UsersService.get_or_create_user(update.effective_user)
+    data = await ai_processor.detect_expense_async(update.message.text, telegram_id=user.telegram_id)
+    transaction = transactions_service.create(
+        telegram_id=user.telegram_id,
+        description=data["description"],
+        amount=data["amount"],
+        category=data["category"],
+        type=data["type"],
+        date=data.get("date") or datetime.now().date(),
+        detected_by=data["detected_by"],
+    )
+    await update.message.reply_text(f"✅ Transação registrada: {transaction.category} - R$ {transaction.amount:.2f}")
+
+
+async def legacy_summary(update, context):
+    """The previous `summary_handler`'s database work."""
+    user = UsersService.get_or_create_user(update.effective_user)
+    resumo = finance_calculator.get_monthly_summary(user.telegram_id)
+    await update.message.reply_text(f"📝 *Total de transações:* {resumo['transacoes_count']}")
+
+
+def add_latency(latency_ms: float):
+    """Simulate a network round trip per statement on both engines; returns a function that removes it."""
+    seconds = latency_ms / 1000
+
+    def blocking(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(seconds)
+
+    def awaited(conn, cursor, statement, parameters, context, executemany):
+        # Runs inside SQLAlchemy's greenlet, so the event loop keeps going during the sleep.
+        await_only(asyncio.sleep(seconds))
+
+    listeners = [(engine, blocking) for engine in {db_manager.engine, db_manager.read_engine}]
+    listeners += [(engine.sync_engine, awaited) for engine in {async_db_manager.engine, async_db_manager.read_engine}]
+    for engine, listener in listeners:
+        event.listen(engine, "before_cursor_execute", listener)
+
+    def remove():
+        for engine, listener in listeners:
+            event.remove(engine, "before_cursor_execute", listener)
+    return remove
+
+
+async def watch_loop(stalls: list, last_tick: list, interval: float = 0.005):
+    """Record how late each tick of the event loop runs (time other updates would have waited)."""
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        stalls.append(now - last_tick[0] - interval)
+        last_tick[0] = now
+
+
+async def timed(sessions):
+    """Run the user sessions concurrently; return (seconds, sorted event-loop stalls)."""
+    stalls, last_tick = [], [time.perf_counter()]
+    watcher = asyncio.create_task(watch_loop(stalls, last_tick))
+    started = time.perf_counter()
+    await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    # A loop blocked until the very end never ticked again; count that wait too.
+    stalls.append(time.perf_counter() - last_tick[0] - 0.005)
+    return elapsed, sorted(stalls)
+
+
+async def run_mode(on_message, on_summary, users: int, messages: int, first_user: int):
+    async def send_messages(telegram_id):
+        for i in range(messages):
+            update = fake_update(telegram_id, MESSAGES[(telegram_id + i) % len(MESSAGES)])
+            await on_message(update, None)
+            assert update.message.replies[0].startswith("✅"), update.message.replies
+
+    async def ask_summaries(telegram_id):
+        for _ in range(messages):
+            await on_summary(fake_update(telegram_id, "/resumo"), None)
+
+    result = {}
+    for phase, session in (("messages", send_messages), ("summaries", ask_summaries)):
+        elapsed, stalls = await timed(session(first_user + i) for i in range(users))
+        result[phase] = {
+            "seconds": elapsed,
+            "per_second": users * messages / elapsed,
+            "loop_stall_p99_ms": stalls[int(len(stalls) * 0.99)] * 1000,
+            "loop_stall_max_ms": stalls[-1] * 1000,
+        }
+    return result
+
+
+def cleanup(first_user: int, last_user: int):
+    with db_manager.get_session() as session:
+        for model in (DailyRollup, MonthlyRollup, Transaction, User):
+            session.execute(delete(model).where(model.telegram_id.between(first_user, last_user)))
+        session.commit()
+
+
+async def run(users: int, messages: int, latency_ms: float):
+    remove_latency = add_latency(latency_ms) if latency_ms else None
+    try:
+        modes = [
+            ("sync", legacy_message, legacy_summary, FIRST_USER),
+            ("async", message_handler, summary_handler, FIRST_USER + users),
+        ]
+        results = {}
+        for name, on_message, on_summary, first_user in modes:
+            results[name] = await run_mode(on_message, on_summary, users, messages, first_user)
+            with db_manager.get_session() as session:
+                count = session.query(Transaction).filter(
+                    Transaction.telegram_id.between(first_user, first_user + users - 1)
+                ).count()
+            assert count == users * messages, f"{name}: {count} transactions stored"
+    finally:
+        if remove_latency:
+            remove_latency()
+        cleanup(FIRST_USER, FIRST_USER + 2 * users)
+        await async_db_manager.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    parser.add_argument("--url", help="migrated database to use (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if not url:
+            from scripts.migrate import migrate
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db_manager.configure(url)
+            migrate()
+        db_manager.configure(url)
+        async_db_manager.configure(url)
+        dialect = db_manager.engine.dialect.name
+
+        results = asyncio.run(run(args.users, args.messages, args.db_latency_ms))
+        db_manager.engine.dispose()
+
+    print(f"\n📏 {args.users} users x {args.messages} messages, then {args.messages} /resumo each, "
+          f"{args.db_latency_ms:g} ms per statement, {dialect}")
+    for phase in ("messages", "summaries"):
+        for name, r in results.items():
+            r = r[phase]
+            print(f"   {phase:9} {name:5}  {r['seconds']:7.2f} s  {r['per_second']:8.0f}/s  "
+                  f"loop stalled p99 {r['loop_stall_p99_ms']:7.1f} ms, max {r['loop_stall_max_ms']:7.1f} ms")
+        print(f"   {phase:9} async/sync throughput: "
+              f"{results['sync'][phase]['seconds'] / results['async'][phase]['seconds']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Synthetic, labeled corpus of pt-BR finance messages.
+
+Usage:
+    python -m benchmarks.corpus --size 10000 --output corpus.jsonl
+
+Every message carries the transaction the user meant (amount, category, type)
+plus tags describing how it was written ("typo", "no_accents", "multi_item",
+"no_amount", ...), so accuracy can be broken down by writing style. The same
+seed always produces the same corpus.
+"""
+
+import argparse
+import json
+import random
+import unicodedata
+from dataclasses import asdict, dataclass, field
+
+# (type, category) -> things people write. Some items are keywords of
+# `AIProcessor.categories`, others are not, so the tiers after the regex have
+# something to do.
+VOCABULARY = {
+    ("despesa_fixa", "Moradia"): ["aluguel", "conta de luz", "conta de água", "condomínio", "internet",
+                                  "gás de cozinha", "iptu", "telefone"],
+    ("despesa_fixa", "Transporte"): ["ônibus", "metrô", "uber", "táxi", "combustível", "gasolina",
+                                     "estacionamento", "pedágio", "bilhete único"],
+    ("despesa_fixa", "Saúde"): ["plano de saúde", "médico", "dentista", "farmácia", "remédio", "academia",
+                                "consulta", "exame de sangue"],
+    ("despesa_fixa", "Educação"): ["faculdade", "curso de inglês", "livro", "material escolar",
+                                   "mensalidade da escola"],
+    ("despesa_fixa", "Seguros"): ["seguro do carro", "seguro de vida", "seguro residencial"],
+    ("despesa_fixa", "Dívidas"): ["parcela do carro", "financiamento", "empréstimo", "fatura do cartão"],
+    ("despesa_variavel", "Alimentação"): ["almoço", "janta", "lanche", "mercado", "supermercado", "restaurante",
+                                          "ifood", "padaria", "pizza", "açaí", "pastel", "hamburguer"],
+    ("despesa_variavel", "Lazer"): ["cinema", "netflix", "spotify", "shopping", "bar", "viagem", "show",
+                                    "ingresso do jogo", "boliche"],
+    ("despesa_variavel", "Vestuário"): ["roupa", "sapato", "camisa", "calça", "tênis", "vestido", "jaqueta"],
+    ("despesa_variavel", "Diversos"): ["presente de aniversário", "reparo da pia", "manutenção do carro",
+                                       "chaveiro", "corte de cabelo"],
+    ("renda", "Salário"): ["salário", "contracheque", "pagamento do mês"],
+    ("renda", "Freela"): ["freela", "freelance", "projeto do cliente", "job de design"],
+    ("renda", "Investimentos"): ["dividendos", "juros", "rendimento"],
+    ("renda", "Outros"): ["bônus", "extra", "reembolso", "venda do celular"],
+    ("economia", "Investimentos"): ["tesouro direto", "cdb", "fii", "ações"],
+    ("economia", "Poupança"): ["poupança", "reserva de emergência", "cofrinho"],
+    ("economia", "Fundos"): ["fundo", "etf", "fundo multimercado"],
+    ("economia", "Previdência"): ["previdência privada", "aposentadoria"],
+}
+
+TEMPLATES = {
+    "despesa_fixa": ["{item} {amount}", "{amount} {item}", "paguei {amount} de {item}", "{item} {amount} {date}"],
+    "despesa_variavel": ["{item} {amount}", "{amount} {item}", "gastei {amount} com {item}",
+                         "comprei {item} por {amount}", "{item} {amount} {date}"],
+    "renda": ["recebi {amount} de {item}", "{item} {amount}", "entrou {amount} do {item}"],
+    "economia": ["guardei {amount} na {item}", "apliquei {amount} em {item}", "{item} {amount}"],
+}
+
+NO_AMOUNT_TEMPLATES = {
+    "despesa_fixa": ["paguei {item}", "{item} pago"],
+    "despesa_variavel": ["gastei com {item}", "{item} {date}"],
+    "renda": ["recebi {item}", "caiu o {item}"],
+    "economia": ["guardei na {item}", "apliquei em {item}"],
+}
+
+DATES = ["hoje", "ontem", "anteontem", "05/03", "28/02/2025"]
+
+
+@dataclass
+class LabeledMessage:
+    text: str
+    amount: float
+    category: str
+    type: str
+    tags: list = field(default_factory=list)
+
+
+def format_amount(value: float, rng: random.Random) -> str:
+    """Write a value the way people type it: "23", "23,90", "R$ 1.234,56", "45.50", "23 reais"."""
+    cents = round(value * 100) % 100
+    whole = int(value)
+    grouped = f"{whole:,}".replace(",", ".")
+    style = rng.randrange(6)
+    if style == 0:
+        return f"{whole},{cents:02d}" if cents else str(whole)
+    if style == 1:
+        return f"R$ {grouped},{cents:02d}"
+    if style == 2:
+        return f"R${whole}" if not cents else f"R${whole},{cents:02d}"
+    if style == 3:
+        return f"{whole}.{cents:02d}" if cents else grouped
+    if style == 4:
+        return f"{grouped},{cents:02d}" if whole >= 1000 else f"{whole},{cents:02d}"
+    return f"{whole} reais" if not cents else f"{whole},{cents:02d} reais"
+
+
+def random_amount(type_: str, rng: random.Random) -> float:
+    low, high = {"despesa_fixa": (40, 3000), "despesa_variavel": (5, 400), "renda": (200, 9000),
+                 "economia": (50, 5000)}[type_]
+    value = rng.uniform(low, high)
+    # Round amounts are common in chat messages.
+    return float(round(value)) if rng.random() < 0.5 else round(value, 2)
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def add_typo(word: str, rng: random.Random) -> str:
+    """Drop, swap or double one letter of a word (words shorter than 4 letters are left alone)."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+
+def _item_text(item: str, rng: random.Random, typo_rate: float, tags: list) -> str:
+    words = item.split()
+    if rng.random() < typo_rate:
+        i = rng.randrange(len(words))
+        typo = add_typo(words[i], rng)
+        if typo != words[i]:
+            words[i] = typo
+            tags.append("typo")
+    return " ".join(words)
+
+
+def generate(size: int, seed: int = 42, typo_rate: float = 0.1, no_accent_rate: float = 0.3,
+             multi_item_rate: float = 0.05, no_amount_rate: float = 0.05, upper_rate: float = 0.05) -> list:
+    """Return `size` labeled messages; the same arguments always give the same corpus."""
+    rng = random.Random(seed)
+    labels = list(VOCABULARY)
+    corpus = []
+    for _ in range(size):
+        type_, category = rng.choice(labels)
+        tags = []
+        item = _item_text(rng.choice(VOCABULARY[(type_, category)]), rng, typo_rate, tags)
+        date = rng.choice(DATES)
+
+        if rng.random() < no_amount_rate:
+            text = rng.choice(NO_AMOUNT_TEMPLATES[type_]).format(item=item, date=date)
+            amount = None
+            tags.append("no_amount")
+        else:
+            amount = random_amount(type_, rng)
+            text = rng.choice(TEMPLATES[type_]).format(item=item, amount=format_amount(amount, rng), date=date)
+            if rng.random() < multi_item_rate:
+                # The bot stores one transaction per message; the first item is the one that counts.
+                other_type, other_category = rng.choice(labels)
+                other = rng.choice(VOCABULARY[(other_type, other_category)])
+                text += f" e {other} {format_amount(random_amount(other_type, rng), rng)}"
+                tags.append("multi_item")
+
+        if rng.random() < no_accent_rate and strip_accents(text) != text:
+            text = strip_accents(text)
+            tags.append("no_accents")
+        if rng.random() < upper_rate:
+            text = text.upper()
+            tags.append("upper")
+        corpus.append(LabeledMessage(text=text, amount=amount, category=category, type=type_, tags=tags))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--typo-rate", type=float, default=0.1)
+    parser.add_argument("--output", help="JSONL file; prints a sample when omitted")
+    args = parser.parse_args()
+
+    corpus = generate(args.size, seed=args.seed, typo_rate=args.typo_rate)
+    if not args.output:
+        for message in corpus[:20]:
+            print(f"{message.type:17} {message.category:14} {message.amount!s:>9}  {message.text}")
+        return
+    with open(args.output, "w", encoding="utf-8") as f:
+        for message in corpus:
+            f.write(json.dumps(asdict(message), ensure_ascii=False) + "\n")
+    print(f"✅ {len(corpus)} messages -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
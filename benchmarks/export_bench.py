@@ -0,0 +1,118 @@
+"""
+Export memory and throughput: loading every ORM object vs the streaming exporter.
+
+Usage:
+    python -m benchmarks.export_bench [--sizes 20000,200000]
+
+Fills a temporary, migrated SQLite database with one user per size and,
+for each user, measures with tracemalloc:
+
+- orm:     `session.query(Transaction)...all()`, the whole history hydrated
+           at once (what an export built on the listing queries would do)
+- csv:     `TransactionExporter` writing CSV to a file
+- parquet: same, as Parquet (skipped when pyarrow is not installed)
+
+The exporter's peak should stay flat as the history grows.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+import models  # registers every mapper before the first query
+from models.category import resolve_category_id
+from models.transaction import Transaction
+from models.user import User
+from scripts.migrate import migrate
+from services.database import db_manager
+from services.transaction_export import parquet_available, transaction_exporter
+
+DESCRIPTIONS = ["Mercado", "Padaria", "Uber", "Netflix", "Farmácia", "Gasolina", "Almoço", "Aluguel", "Salário"]
+CATEGORIES = ["Alimentação", "Transporte", "Lazer", "Saúde", "Moradia", "Outros"]
+
+
+def seed(telegram_id: int, rows: int):
+    rng = random.Random(telegram_id)
+    start = date.today() - timedelta(days=3 * 365)
+    now = datetime.now(timezone.utc)
+    with db_manager.get_session() as session:
+        session.add(User(telegram_id=telegram_id, first_name="bench"))
+        category_ids = [resolve_category_id(session, name) for name in CATEGORIES]
+        for first in range(0, rows, 10000):
+            session.execute(insert(Transaction.__table__), [
+                {
+                    "telegram_id": telegram_id,
+                    "type": "despesa_variavel",
+                    "amount_cents": rng.randint(100, 50000),
+                    "category_id": rng.choice(category_ids),
+                    "description": f"{rng.choice(DESCRIPTIONS)} {index % 997}",
+                    "date": start + timedelta(days=index * 3 * 365 // rows),
+                    "detected_by": "manual",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for index in range(first, min(rows, first + 10000))
+            ])
+        session.commit()
+
+
+def measure(fn):
+    """(seconds, peak traced bytes) of fn()."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def load_orm(telegram_id: int):
+    with db_manager.get_session() as session:
+        rows = session.query(Transaction).filter(Transaction.telegram_id == telegram_id).all()
+        assert rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20000,200000")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = ["csv", "parquet"] if parquet_available() else ["csv"]
+    if "parquet" in formats:
+        # Imported up front (pyarrow loads its pandas shim on first use) so imports are not counted as export memory.
+        import pandas  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.configure(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrate()
+        for telegram_id, size in enumerate(sizes, start=1):
+            seed(telegram_id, size)
+            results.append((size, "orm", *measure(lambda: load_orm(telegram_id)), None))
+            for fmt in formats:
+                path = os.path.join(tmp, f"export_{size}.{fmt}")
+                stats = {}
+                seconds, peak = measure(lambda: stats.update(transaction_exporter.export_path(telegram_id, path, fmt)))
+                assert stats["rows"] == size and not stats["error"], stats
+                results.append((size, fmt, seconds, peak, os.path.getsize(path)))
+        db_manager.engine.dispose()
+
+    print(f"\n📤 Export ({', '.join(formats)}) vs loading every ORM object")
+    print(f"   {'rows':>8} {'method':>8} {'rows/s':>10} {'peak memory':>12} {'file':>9}")
+    for size, method, seconds, peak, file_bytes in results:
+        file_size = f"{file_bytes / 2 ** 20:7.1f}MB" if file_bytes is not None else f"{'-':>9}"
+        print(f"   {size:8} {method:>8} {size / seconds:10.0f} {peak / 2 ** 20:10.1f}MB {file_size}")
+    if "parquet" not in formats:
+        print("   (parquet skipped: pip install pyarrow)")
+
+
+if __name__ == "__main__":
+    main()
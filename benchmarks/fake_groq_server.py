@@ -0,0 +1,105 @@
+"""
+Local fake of the Groq chat completions endpoint, for exercising the AI path offline.
+
+Usage:
+    python -m benchmarks.fake_groq_server [--port 8765] [--delay 0.0] [--fail-rate 0.0]
+
+Then point the app at it:
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+# Canned answer; good enough for timing and for the fallback paths.
+DEFAULT_REPLY = {
+    "amount": 42.0,
+    "category": "Diversos",
+    "type": "variavel",
+    "description": "gasto",
+    "confidence": 0.9,
+}
+
+
+def make_handler(delay: float, fail_rate: float, reply: dict, seed: int = 0):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class FakeGroqHandler(BaseHTTPRequestHandler):
+        # Counters shared by all requests served by this handler class.
+        requests_served = 0
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            with lock:
+                FakeGroqHandler.requests_served += 1
+                fail = rng.random() < fail_rate
+
+            if self.path != COMPLETIONS_PATH:
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            if delay:
+                time.sleep(delay)
+            if fail:
+                self._send(500, {"error": {"message": "fake failure"}})
+                return
+
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(reply)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGroqHandler
+
+
+def start_server(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0, reply: dict = None):
+    """Start the fake server in a background thread and return it (`server.server_address` has the port)."""
+    handler = make_handler(delay, fail_rate, reply or DEFAULT_REPLY)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay, args.fail_rate, DEFAULT_REPLY))
+    print(f"🤖 Fake Groq server on http://127.0.0.1:{args.port} (delay={args.delay}s, fail_rate={args.fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Monthly summary cost: ORM rows summed in Python vs grouped SQL over the rollups.
+
+Usage:
+    python -m benchmarks.finance_calculator_bench [--rows 100000] [--rounds 5]
+
+Fills a temporary SQLite database with `--rows` transactions for one user in
+the benchmarked month (plus another user's rows as noise), builds the
+rollups with `RollupService.rebuild`, then times
+`get_monthly_summary` and `get_daily_budget_status` against the previous
+implementation and checks that both return the same numbers.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import timeit
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from models.base import Base
+from models.category import Category
+from models.transaction import Transaction
+from models.user import User
+from services.finance_calculator import FinanceCalculator
+from services.rollup_service import RollupService
+
+TYPES = ["renda", "despesa_fixa", "despesa_variavel", "despesa_variavel", "economia"]
+USER, OTHER_USER = 1, 2
+
+
+def legacy_monthly_transactions(session_factory, telegram_id: int, month: int, year: int, days: int):
+    """What `_get_monthly_transactions` used to do: hydrate every row of the month."""
+    with session_factory() as session:
+        return (
+            session.query(Transaction)
+            .filter(
+                Transaction.telegram_id == telegram_id,
+                Transaction.date >= f"{year}-{month:02d}-01",
+                Transaction.date <= f"{year}-{month:02d}-{days}",
+            )
+            .all()
+        )
+
+
+def legacy_daily_status(calculator, session_factory, telegram_id: int, month: int, year: int):
+    """The two full loads the old `get_daily_budget_status` made, with its four sums and day grouping."""
+    days = calculator._dias_no_mes(month, year)
+    transactions = legacy_monthly_transactions(session_factory, telegram_id, month, year, days)
+    totals = {t: sum(tr.amount for tr in transactions if tr.type == t) for t in set(TYPES)}
+    summary = calculator._build_summary(month, year, totals, len(transactions))
+
+    gastos_por_dia = {}
+    for tr in legacy_monthly_transactions(session_factory, telegram_id, month, year, days):
+        if tr.type == "despesa_variavel":
+            gastos_por_dia[tr.date.day] = gastos_por_dia.get(tr.date.day, 0) + tr.amount
+    return summary, gastos_por_dia
+
+
+def fill(session_factory, rows: int, month: int, year: int, days: int):
+    rng = random.Random(42)
+    with session_factory() as session:
+        category = Category(name="Diversos")
+        session.add_all([User(telegram_id=USER, first_name="bench"), User(telegram_id=OTHER_USER, first_name="noise"),
+                         category])
+        session.commit()
+        batch = []
+        for i in range(rows + rows // 10):
+            owner = USER if i < rows else OTHER_USER
+            batch.append({
+                "telegram_id": owner,
+                "type": rng.choice(TYPES),
+                "amount_cents": rng.randint(100, 50000),
+                "category_id": category.id,
+                "description": "bench",
+                "date": date(year, month, rng.randint(1, days)),
+            })
+            if len(batch) == 5000:
+                session.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Transaction), batch)
+        session.commit()
+
+
+def run(rows: int, rounds: int):
+    today = datetime.now()
+    month, year = today.month, today.year
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+
+        calculator = FinanceCalculator()
+
+        def fan_out(fn, read=True):
+            with session_factory() as session:
+                return {"bench": fn(session)}
+
+        calculator.db = SimpleNamespace(get_session=lambda telegram_id=None: session_factory(),
+                                        get_read_session=lambda telegram_id=None: session_factory(),
+                                        fan_out=fan_out)
+        days = calculator._dias_no_mes(month, year)
+        fill(session_factory, rows, month, year, days)
+        rollups = RollupService()
+        rollups.db = calculator.db
+        rollups.rebuild()
+
+        summary, _ = legacy_daily_status(calculator, session_factory, USER, month, year)
+        new_summary = calculator.get_monthly_summary(USER, month, year)
+        for key, value in summary.items():
+            new_value = new_summary[key]
+            same = abs(value - new_value) < 1e-6 * max(1, abs(value)) if isinstance(value, float) else value == new_value
+            assert same, f"{key}: {value!r} != {new_value!r}"
+
+        legacy = timeit.timeit(lambda: legacy_daily_status(calculator, session_factory, USER, month, year),
+                               number=rounds) / rounds
+        summary_time = timeit.timeit(lambda: calculator.get_monthly_summary(USER, month, year),
+                                     number=rounds) / rounds
+        daily_time = timeit.timeit(lambda: calculator.get_daily_budget_status(USER, month, year),
+                                   number=rounds) / rounds
+        engine.dispose()
+
+    print(f"📏 {rows} transactions in {month:02d}/{year}, {rounds} rounds")
+    print(f"   legacy daily status (2 ORM loads): {legacy * 1000:9.1f} ms")
+    print(f"   get_monthly_summary (rollups):     {summary_time * 1000:9.1f} ms  ({legacy / summary_time:.0f}x)")
+    print(f"   get_daily_budget_status:           {daily_time * 1000:9.1f} ms  ({legacy / daily_time:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Statement import throughput and memory: row-by-row `create` vs the streaming importer.
+
+Usage:
+    python -m benchmarks.import_bench [--sizes 20000,200000] [--baseline 2000]
+
+Writes synthetic bank CSVs (pt-BR format, ";" separated) to a temporary
+directory and imports them into a temporary, migrated SQLite database:
+
+- create:   `--baseline` rows through `TransactionsService.create`, one
+            session, commit and refresh per row (the only way in before)
+- import:   each file through `StatementImporter`, reporting rows/s
+- memory:   the same file for another user with tracemalloc on; the peak
+            should not grow with the file size
+- re-import: the first user's file again, every row a duplicate
+
+Categorization runs locally (no GROQ_API_KEY), so this measures parsing,
+dedupe and writes.
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import models  # registers every mapper before the first query
+from models.user import User
+from scripts.migrate import migrate
+from services.database import db_manager
+from services.statement_import import statement_importer
+from services.transactions_service import transactions_service
+
+DESCRIPTIONS = ["Pix enviado mercado", "Compra cartão padaria", "UBER *TRIP", "Netflix.com", "Farmácia drogasil",
+                "Posto gasolina", "Restaurante almoço", "Aluguel apartamento", "Salário empresa", "Transferência"]
+
+
+def write_statement(path: str, rows: int, seed: int):
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=3 * 365)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(["Data Lançamento", "Descrição", "Valor", "Saldo"])
+        for index in range(rows):
+            amount = rng.randint(100, 50000) * (1 if rng.random() < 0.1 else -1)
+            writer.writerow([
+                # Chronological, like bank exports: each chunk covers a few days.
+                (start + timedelta(days=index * 3 * 365 // rows)).strftime("%d/%m/%Y"),
+                f"{rng.choice(DESCRIPTIONS)} {index % 997}",
+                f"{amount / 100:.2f}".replace(".", ","),
+                "",
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20000,200000")
+    parser.add_argument("--baseline", type=int, default=2000)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.configure(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrate()
+        with db_manager.get_session() as session:
+            session.add_all([User(telegram_id=user, first_name="bench") for user in range(1, 2 * len(sizes) + 2)])
+            session.commit()
+
+        rng = random.Random(1)
+        started = time.perf_counter()
+        for _ in range(args.baseline):
+            transactions_service.create(2 * len(sizes) + 1, rng.choice(DESCRIPTIONS), rng.randint(1, 500),
+                                        "Diversos", "despesa_variavel", date.today())
+        create_rate = args.baseline / (time.perf_counter() - started)
+
+        results = []
+        for index, size in enumerate(sizes):
+            path = os.path.join(tmp, f"statement_{size}.csv")
+            write_statement(path, size, seed=size)
+            imported = statement_importer.import_path(2 * index + 1, path)
+            assert imported["imported"] == size, imported
+
+            tracemalloc.start()
+            statement_importer.import_path(2 * index + 2, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            again = statement_importer.import_path(2 * index + 1, path)
+            assert again["duplicates"] == size, again
+            results.append((size, os.path.getsize(path), imported["rows_per_second"], peak, again["rows_per_second"]))
+        db_manager.engine.dispose()
+
+    print(f"\n📥 Row by row (`create`): {create_rate:8.0f} rows/s over {args.baseline} rows")
+    print(f"   {'rows':>8} {'file':>9} {'import':>13} {'peak memory':>12} {'re-import':>13}")
+    for size, file_bytes, rate, peak, again in results:
+        print(f"   {size:8} {file_bytes / 2 ** 20:7.1f}MB {rate:8.0f} rows/s {peak / 2 ** 20:10.1f}MB "
+              f"{again:8.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
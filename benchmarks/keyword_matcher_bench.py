@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: compiled KeywordMatcher vs the old nested keyword loops.
+
+Usage:
+    python -m benchmarks.keyword_matcher_bench [--rounds 2000] [--extra-keywords 500]
+"""
+
+import argparse
+import random
+import timeit
+
+from services.ai_processor import ai_processor
+from services.keyword_matcher import KeywordMatcher
+
+# A small corpus of messages that look like what users actually send to the bot.
+CORPUS = [
+    "almoço 45,50",
+    "uber 23",
+    "ifood 67,90 pizza",
+    "aluguel 1500",
+    "salário 5000",
+    "investi 1000 no tesouro",
+    "mercado 350",
+    "conta de luz 180,35",
+    "netflix 55,90",
+    "farmácia remédio 42",
+    "guardei 300 na poupança",
+    "freela site 1200",
+    "presente aniversário mãe 150",
+    "gasolina 120",
+    "padaria 12",
+    "cinema com a namorada 80",
+    "parcela do carro 980",
+    "dividendos fii 87,40",
+    "camisa nova 99",
+    "R$ 35 lanche",
+]
+
+
+def legacy_match(categories: dict, message: str):
+    """Copy of the nested loops `_detect_with_regex` used before the compiled matcher."""
+    message_lower = message.lower()
+    category = "Diversos"
+    type_ = "despesa_variavel"
+    confidence = 0.6
+
+    for cat_name, keywords in categories['rendas'].items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                category, type_, confidence = cat_name, "renda", 0.9
+                break
+
+    if type_ != "renda":
+        for cat_name, keywords in categories['economia'].items():
+            for keyword in keywords:
+                if keyword in message_lower:
+                    category, type_, confidence = cat_name, "economia", 0.9
+                    break
+
+    if type_ not in ['renda', 'economia']:
+        for cat_name, keywords in categories['despesas_fixas'].items():
+            for keyword in keywords:
+                if keyword in message_lower:
+                    category, type_, confidence = cat_name, "despesa_fixa", 0.8
+                    break
+
+        if type_ == "despesa_variavel":
+            for cat_name, keywords in categories['despesas_variaveis'].items():
+                for keyword in keywords:
+                    if keyword in message_lower:
+                        category, confidence = cat_name, 0.7
+                        break
+
+    return category, type_, confidence
+
+
+def with_extra_keywords(categories: dict, count: int) -> dict:
+    """Return a copy of `categories` padded with synthetic keywords, simulating per-user tables."""
+    rng = random.Random(42)
+    padded = {section: {name: list(words) for name, words in groups.items()} for section, groups in categories.items()}
+    sections = list(padded)
+    for i in range(count):
+        section = sections[i % len(sections)]
+        group = rng.choice(list(padded[section]))
+        padded[section][group].append(f"kw{i:04d}x")
+    return padded
+
+
+def run(rounds: int, extra_keywords: int):
+    for extra in sorted({0, extra_keywords}):
+        categories = with_extra_keywords(ai_processor.categories, extra)
+        matcher = KeywordMatcher(categories)
+        keyword_count = sum(len(words) for groups in categories.values() for words in groups.values())
+
+        legacy = timeit.timeit(lambda: [legacy_match(categories, m) for m in CORPUS], number=rounds)
+        compiled = timeit.timeit(lambda: [matcher.match(m) for m in CORPUS], number=rounds)
+
+        total = rounds * len(CORPUS)
+        print(f"📏 {keyword_count} keywords, {total} messages")
+        print(f"   legacy loops:     {legacy / total * 1e6:8.2f} µs/msg")
+        print(f"   compiled matcher: {compiled / total * 1e6:8.2f} µs/msg  ({legacy / compiled:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--extra-keywords", type=int, default=500)
+    args = parser.parse_args()
+    run(args.rounds, args.extra_keywords)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Throughput and accuracy of the message parser, tier by tier.
+
+Usage:
+    python -m benchmarks.parser_bench [--size 5000] [--output results.json] [--compare old.json]
+
+Runs fully offline on a synthetic corpus (see benchmarks/corpus.py):
+
+- regex:        lexer + keyword tables (`_detect_with_regex`)
+- memory:       per-user memory, then regex
+- local_model:  memory, regex, then the offline classifier (`_detect_locally`)
+- full:         `detect_expense`, with the Groq client replaced by a deterministic stub
+
+The memory and the local model are trained on a second corpus generated with
+another seed, so they are scored on phrasings they have not seen. Results
+(messages/sec, p50/p99 latency, accuracy, per-category precision and recall)
+are printed and saved as JSON, and `--compare` prints the change against an
+earlier run.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks.corpus import generate
+from config.config import config
+from services.ai_processor import AIProcessor
+from services.category_memory import CategoryMemory
+from services.llm_cache import LLMCache
+from services.local_classifier import NaiveBayesTrainer
+from services.message_lexer import parse_message
+
+BENCH_USER = 1
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class StubGroqClient:
+    """
+    Stands in for `Groq` with canned answers, so the full tier runs offline.
+
+    It knows the true label of every corpus message and answers correctly for
+    a fixed share of them (chosen by a hash of the text, so runs are
+    repeatable); the rest get "Diversos".
+    """
+
+    def __init__(self, corpus, accuracy: float = 0.85, latency_ms: float = 0.0):
+        self.labels = {m.text: m for m in corpus}
+        self.accuracy = accuracy
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        text = messages[-1]["content"]
+        label = self.labels.get(text)
+        if label is not None and zlib.crc32(text.encode()) % 1000 < self.accuracy * 1000:
+            answer = {"amount": label.amount, "category": label.category, "type": label.type}
+        else:
+            answer = {"amount": None, "category": "Diversos", "type": "despesa_variavel"}
+        answer.update(description=parse_message(text).description[:40] or "Despesa", confidence=0.9)
+        content = json.dumps(answer, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class HistoryMemory(CategoryMemory):
+    """Category memory fed from the training corpus instead of the database."""
+
+    def __init__(self, rows, **kwargs):
+        super().__init__(**kwargs)
+        self._rows = rows
+
+    def _load_history(self, telegram_id: int, since=None):
+        return [(*row, None) for row in self._rows] if since is None else []
+
+
+def build_processor(train_corpus, eval_corpus, model_dir: str, stub_accuracy: float, stub_latency_ms: float):
+    """An `AIProcessor` wired to the training history, a freshly trained model and the stub client."""
+    processor = AIProcessor()
+
+    rows, trainer = [], NaiveBayesTrainer()
+    for message in train_corpus:
+        description = parse_message(message.text).description
+        if description:
+            rows.append((description, message.category, message.type))
+            trainer.add(description, message.type, message.category)
+    model_path = os.path.join(model_dir, "local_model.npy")
+    trainer.save(model_path)
+
+    config.LOCAL_MODEL_PATH = model_path
+    processor._reload_local_model()
+    processor.category_memory = HistoryMemory(rows, max_entries_per_user=config.CATEGORY_MEMORY_MAX_PER_USER)
+    processor.client = StubGroqClient(eval_corpus, accuracy=stub_accuracy, latency_ms=stub_latency_ms)
+    processor.async_client = None
+    processor.batcher = None
+    # Memory-only cache, so earlier runs on disk do not change the numbers.
+    processor.ai_cache = LLMCache(path=None) if config.LLM_CACHE_ENABLED else None
+    return processor
+
+
+def tiers(processor):
+    def memory(text):
+        parsed = parse_message(text)
+        return processor._detect_with_memory(BENCH_USER, parsed) or processor._detect_with_regex(text, parsed)
+
+    return {
+        "regex": processor._detect_with_regex,
+        "memory": memory,
+        "local_model": lambda text: processor._detect_locally(text, parse_message(text), BENCH_USER),
+        "full": lambda text: processor.detect_expense(text, telegram_id=BENCH_USER),
+    }
+
+
+def percentile(sorted_values, p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def same_amount(expected, found) -> bool:
+    if expected is None or found is None:
+        return expected is found
+    return abs(expected - found) < 0.005
+
+
+def score(corpus, results) -> dict:
+    """Accuracy of (type, category) and amount, per-label precision/recall and a breakdown by tag."""
+    true_positive, predicted, actual = Counter(), Counter(), Counter()
+    by_tag = defaultdict(lambda: [0, 0])
+    label_hits = amount_hits = 0
+
+    for message, result in zip(corpus, results):
+        expected = f"{message.type}/{message.category}"
+        found = f"{result['type']}/{result['category']}"
+        actual[expected] += 1
+        predicted[found] += 1
+        hit = expected == found
+        label_hits += hit
+        true_positive[expected] += hit
+        amount_hits += same_amount(message.amount, result["amount"])
+        for tag in message.tags or ["plain"]:
+            by_tag[tag][0] += hit
+            by_tag[tag][1] += 1
+
+    per_label = {}
+    for label in sorted(actual):
+        precision = true_positive[label] / predicted[label] if predicted[label] else 0.0
+        recall = true_positive[label] / actual[label]
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_label[label] = {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+                            "support": actual[label]}
+
+    total = len(corpus)
+    return {
+        "label_accuracy": round(label_hits / total, 4),
+        "amount_accuracy": round(amount_hits / total, 4),
+        "macro_f1": round(sum(v["f1"] for v in per_label.values()) / len(per_label), 4),
+        "by_tag": {tag: round(hits / count, 4) for tag, (hits, count) in sorted(by_tag.items())},
+        "per_label": per_label,
+    }
+
+
+def run_tier(detect, corpus, warmup: int) -> dict:
+    for message in corpus[:warmup]:
+        detect(message.text)
+
+    latencies, results = [], []
+    started = time.perf_counter()
+    for message in corpus:
+        t0 = time.perf_counter()
+        results.append(detect(message.text))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        "messages": len(corpus),
+        "seconds": round(elapsed, 4),
+        "messages_per_sec": round(len(corpus) / elapsed, 1),
+        "latency_us": {
+            "p50": round(percentile(latencies, 50) * 1e6, 1),
+            "p99": round(percentile(latencies, 99) * 1e6, 1),
+            "max": round(latencies[-1] * 1e6, 1),
+        },
+        "detected_by": dict(Counter(r.get("detected_by") for r in results)),
+    }
+    report.update(score(corpus, results))
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, previous: dict = None):
+    print(f"📏 {report['corpus']['size']} messages (seed {report['corpus']['seed']}), revision {report['revision']}")
+    for name, tier in report["tiers"].items():
+        line = (f"   {name:12} {tier['messages_per_sec']:>10,.0f} msg/s  p50 {tier['latency_us']['p50']:>8.1f} µs"
+                f"  p99 {tier['latency_us']['p99']:>8.1f} µs  label {tier['label_accuracy']:.1%}"
+                f"  amount {tier['amount_accuracy']:.1%}  macro-F1 {tier['macro_f1']:.3f}")
+        old = (previous or {}).get("tiers", {}).get(name)
+        if old:
+            speed = tier["messages_per_sec"] / old["messages_per_sec"] - 1
+            accuracy = tier["label_accuracy"] - old["label_accuracy"]
+            line += f"  (speed {speed:+.1%}, label {accuracy * 100:+.2f} pts)"
+        print(line)
+
+
+def run(size: int, seed: int, typo_rate: float, stub_accuracy: float, stub_latency_ms: float, warmup: int) -> dict:
+    eval_corpus = generate(size, seed=seed, typo_rate=typo_rate)
+    train_corpus = generate(max(1, size // 2), seed=seed + 1, typo_rate=typo_rate)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        processor = build_processor(train_corpus, eval_corpus, model_dir, stub_accuracy, stub_latency_ms)
+        results = {name: run_tier(detect, eval_corpus, warmup) for name, detect in tiers(processor).items()}
+
+    results["full"]["stub_calls"] = processor.client.calls
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "corpus": {"size": size, "seed": seed, "typo_rate": typo_rate, "train_size": len(train_corpus)},
+        "stub": {"accuracy": stub_accuracy, "latency_ms": stub_latency_ms},
+        "tiers": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--typo-rate", type=float, default=0.1)
+    parser.add_argument("--stub-accuracy", type=float, default=0.85)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/parser_<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    report = run(args.size, args.seed, args.typo_rate, args.stub_accuracy, args.stub_latency_ms, args.warmup)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"parser_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
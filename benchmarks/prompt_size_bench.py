@@ -0,0 +1,64 @@
+"""
+Prompt size before/after moving the categories and rules into a fixed system prompt.
+
+Usage:
+    python -m benchmarks.prompt_size_bench
+
+Token counts are estimated as characters / 4, which is close enough to compare
+two prompts in the same language.
+"""
+
+import json
+
+from services.ai_processor import ai_processor
+
+SAMPLE_MESSAGES = ["cinquenta no mercado", "paguei o dentista", "recebi do cliente", "quarenta e dois de uber"]
+
+
+def legacy_prompt(categories: dict, message: str) -> str:
+    """The prompt `_detect_with_ai` used to rebuild on every call."""
+    return f"""
+        Analise esta mensagem financeira e retorne APENAS JSON:
+
+        Mensagem: "{message}"
+
+        Categorias FIXAS: {list(categories['despesas_fixas'].keys())}
+        Categorias VARIÁVEIS: {list(categories['despesas_variaveis'].keys())}
+        Categorias RENDA: {list(categories['rendas'].keys())}
+        Categorias ECONOMIA: {list(categories['economia'].keys())}
+
+        Regras:
+        - Se for aluguel, conta de casa, parcela fixa → FIXA
+        - Se for comida, transporte, compras do dia → VARIÁVEL  
+        - Se for salário, recebimento → RENDA
+        - Se for investimento, poupança, guardar dinheiro → ECONOMIA
+        - Extraia o valor numérico (pode ter R$, pontos, vírgulas)
+        - Descrição resumida em 2-3 palavras
+
+        Retorne JSON: {{"amount": float, "category": string, "type": "fixa"|"variavel"|"renda"|"economia", "description": string, "confidence": float}}
+        """
+
+
+def request_chars(request: dict) -> int:
+    return sum(len(m["content"]) for m in request["messages"])
+
+
+def main():
+    before = [len(legacy_prompt(ai_processor.categories, m)) for m in SAMPLE_MESSAGES]
+    after = [request_chars(ai_processor._ai_request(m)) for m in SAMPLE_MESSAGES]
+    system = len(ai_processor.system_prompt)
+    batch = request_chars(ai_processor._ai_batch_request(SAMPLE_MESSAGES))
+
+    avg_before = sum(before) / len(before)
+    avg_after = sum(after) / len(after)
+    print("📏 Prompt size per call (characters / ~tokens)")
+    print(f"   before (legacy f-string):   {avg_before:7.0f} / ~{avg_before / 4:.0f}")
+    print(f"   after  (system + user):     {avg_after:7.0f} / ~{avg_after / 4:.0f}  ({(1 - avg_after / avg_before) * 100:.0f}% smaller)")
+    print(f"          fixed system part:   {system:7d} (identical on every call)")
+    print(f"   batch of {len(SAMPLE_MESSAGES)} messages:        {batch:7d} / ~{batch / 4:.0f}  ({batch / len(SAMPLE_MESSAGES):.0f} per message)")
+    print(json.dumps({"before_avg_chars": avg_before, "after_avg_chars": avg_after, "system_chars": system,
+                      "batch_chars": batch}))
+
+
+if __name__ == "__main__":
+    main()
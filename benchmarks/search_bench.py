@@ -0,0 +1,120 @@
+"""
+Description search latency as a user's history grows: LIKE scan vs the full-text index.
+
+Usage:
+    python -m benchmarks.search_bench [--sizes 10000,100000,300000] [--rounds 20]
+
+Grows one user's history in a temporary, migrated SQLite database (so the
+FTS5 triggers index every insert) and, at each size, times the first page
+of `TransactionsService.get_transactions` with a search term:
+
+- like:      the previous filter, lower(description) LIKE '%term%' over all
+             of the user's rows (no accent folding), plus the page count
+- fts:       the search index, newest first
+- relevance: the search index, ranked by bm25
+
+Terms: a common word (in ~10% of rows), a rare one (~0.1%) and a prefix.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert
+
+import models  # registers every mapper before the first query
+from models.category import Category
+from models.transaction import Transaction
+from models.user import User
+from scripts.migrate import migrate
+from services.database import db_manager
+from services.transactions_service import transactions_service
+
+USER = 1
+COMMON, RARE = "almoço", "dentista"
+FILLER = ["mercado", "uber", "padaria", "farmácia", "cinema", "gasolina", "aluguel", "internet", "academia"]
+SEARCHES = {"common word": "almoco", "rare word": "dentista", "prefix": "padar"}
+
+
+def grow(count: int, rng: random.Random, category_id: int):
+    start = date.today() - timedelta(days=5 * 365)
+    rows = []
+    for _ in range(count):
+        roll = rng.random()
+        words = rng.sample(FILLER, 2)
+        if roll < 0.1:
+            words.append(COMMON)
+        elif roll < 0.101:
+            words.append(RARE)
+        rng.shuffle(words)
+        rows.append({
+            "telegram_id": USER, "type": "despesa_variavel", "amount_cents": rng.randint(100, 50000),
+            "category_id": category_id, "description": " ".join(words).capitalize(),
+            "date": start + timedelta(days=rng.randrange(5 * 365)),
+        })
+    with db_manager.get_session() as session:
+        for i in range(0, len(rows), 5000):
+            session.execute(insert(Transaction), rows[i:i + 5000])
+        session.commit()
+
+
+def legacy_search(term: str, limit: int = 25):
+    """The previous search: substring match on the lowercased description, then the page count."""
+    with db_manager.get_read_session(USER) as session:
+        filtered = session.query(Transaction).filter(
+            Transaction.telegram_id == USER,
+            func.lower(Transaction.description).contains(term.lower(), autoescape=True),
+        )
+        page = filtered.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit).all()
+        return page, filtered.with_entities(func.count(Transaction.id)).scalar()
+
+
+def timed(fn, rounds: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    rng = random.Random(42)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager.configure(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrate()
+        with db_manager.get_session() as session:
+            session.add_all([User(telegram_id=USER, first_name="bench"), Category(name="Diversos")])
+            session.commit()
+            category_id = session.query(Category.id).scalar()
+
+        current = 0
+        for size in sizes:
+            grow(size - current, rng, category_id)
+            current = size
+            for label, term in SEARCHES.items():
+                like = timed(lambda: legacy_search(term), args.rounds)
+                fts = timed(lambda: transactions_service.get_transactions(
+                    USER, {"search_term": term}), args.rounds)
+                ranked = timed(lambda: transactions_service.get_transactions(
+                    USER, {"search_term": term, "sort_by": "relevance"}), args.rounds)
+                results.append((size, label, like, fts, ranked))
+        db_manager.engine.dispose()
+
+    print(f"\n📏 First page (25 rows) of a search, one user's history, {args.rounds} rounds")
+    print(f"   {'rows':>8}  {'search':12} {'like':>10} {'fts':>10} {'relevance':>10}")
+    for size, label, like, fts, ranked in results:
+        print(f"   {size:8}  {label:12} {like * 1000:8.2f}ms {fts * 1000:8.2f}ms {ranked * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Row size, index size and aggregation time before and after migration 0004 (cents + category ids).
+
+Usage:
+    python -m benchmarks.storage_bench [--rows 300000] [--users 200] [--rounds 5]
+
+Builds a temporary SQLite database at revision 0003 (FLOAT amounts, category
+names on every row), fills `--rows` transactions and their rollups, then
+measures it, runs migration 0004 and measures again. Sizes come from
+SQLite's dbstat table after a VACUUM: bytes per table and per index, and the
+average record payload per row. Aggregations timed:
+
+- category totals over the whole table (an admin report)
+- one user's category totals over their full history
+- one user's month from the monthly rollups (what the dashboards read)
+
+Both schemas must return the same totals (to the cent).
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from scripts.migrate import migrate
+from services.ai_processor import ai_processor
+from services.database import db_manager
+
+TYPES = ["renda", "despesa_fixa", "despesa_variavel", "despesa_variavel", "economia"]
+TABLES = ["transactions", "daily_rollups", "monthly_rollups"]
+
+QUERIES = {
+    "0003": {
+        "all users by category": "SELECT category, SUM(amount) FROM transactions GROUP BY category",
+        "one user by category": "SELECT category, SUM(amount) FROM transactions WHERE telegram_id = :user "
+                                "GROUP BY category",
+        "one user's month (rollups)": "SELECT category, SUM(total) FROM monthly_rollups "
+                                      "WHERE telegram_id = :user AND year = :year AND month = :month "
+                                      "GROUP BY category",
+    },
+    "0004": {
+        "all users by category": "SELECT c.name, s.total FROM (SELECT category_id, SUM(amount_cents) AS total "
+                                 "FROM transactions GROUP BY category_id) s JOIN categories c ON c.id = s.category_id",
+        "one user by category": "SELECT c.name, s.total FROM (SELECT category_id, SUM(amount_cents) AS total "
+                                "FROM transactions WHERE telegram_id = :user GROUP BY category_id) s "
+                                "JOIN categories c ON c.id = s.category_id",
+        "one user's month (rollups)": "SELECT c.name, s.total FROM (SELECT category_id, SUM(total_cents) AS total "
+                                      "FROM monthly_rollups WHERE telegram_id = :user AND year = :year "
+                                      "AND month = :month GROUP BY category_id) s "
+                                      "JOIN categories c ON c.id = s.category_id",
+    },
+}
+
+
+def fill(path: str, rows: int, users: int):
+    rng = random.Random(42)
+    categories = list(ai_processor.categories)
+    start = date.today() - timedelta(days=3 * 365)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (telegram_id, first_name) VALUES (?, 'bench')",
+                     [(user,) for user in range(1, users + 1)])
+    batch = []
+    for _ in range(rows):
+        batch.append((
+            rng.randint(1, users), rng.choice(TYPES), round(rng.uniform(1, 500), 2), rng.choice(categories),
+            "bench", (start + timedelta(days=rng.randrange(3 * 365))).isoformat(),
+        ))
+        if len(batch) == 10000:
+            conn.executemany("INSERT INTO transactions (telegram_id, type, amount, category, description, date) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO transactions (telegram_id, type, amount, category, description, date) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", batch)
+    # Same rollups `RollupService.rebuild` builds, in the 0003 schema.
+    conn.execute("INSERT INTO daily_rollups (telegram_id, date, type, category, total, count) "
+                 "SELECT telegram_id, date, type, category, SUM(amount), COUNT(*) FROM transactions "
+                 "GROUP BY telegram_id, date, type, category")
+    conn.execute("INSERT INTO monthly_rollups (telegram_id, year, month, type, category, total, count) "
+                 "SELECT telegram_id, CAST(strftime('%Y', date) AS INTEGER), CAST(strftime('%m', date) AS INTEGER), "
+                 "type, category, SUM(total), SUM(count) FROM daily_rollups GROUP BY 1, 2, 3, 4, 5")
+    conn.commit()
+    conn.close()
+
+
+def measure(path: str, rounds: int, revision: str) -> dict:
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    sizes = {}
+    for table in TABLES:
+        indexes = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,))]
+        table_bytes, payload = conn.execute(
+            "SELECT SUM(pgsize), SUM(payload) FROM dbstat WHERE name = ?", (table,)).fetchone()
+        index_bytes = sum(conn.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?", (index,))
+                          .fetchone()[0] for index in indexes)
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        sizes[table] = {"rows": count, "table": table_bytes, "indexes": index_bytes, "row": payload / max(count, 1)}
+
+    user = conn.execute("SELECT telegram_id FROM transactions GROUP BY telegram_id "
+                        "ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    year, month = conn.execute("SELECT year, month FROM monthly_rollups WHERE telegram_id = ? "
+                               "ORDER BY year DESC, month DESC LIMIT 1", (user,)).fetchone()
+    params = {"user": user, "year": year, "month": month}
+    timings, results = {}, {}
+    for name, sql in QUERIES[revision].items():
+        rows = conn.execute(sql, params).fetchall()
+        # Totals in cents, whichever schema produced them.
+        results[name] = {category: round(total * 100) if revision == "0003" else total for category, total in rows}
+        started = time.perf_counter()
+        for _ in range(rounds):
+            conn.execute(sql, params).fetchall()
+        timings[name] = (time.perf_counter() - started) / rounds
+    conn.close()
+    return {"sizes": sizes, "timings": timings, "results": results, "file": os.path.getsize(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db_manager.configure(f"sqlite:///{path}")
+        migrate("0003")
+        fill(path, args.rows, args.users)
+        db_manager.engine.dispose()
+        before = measure(path, args.rounds, "0003")
+
+        started = time.perf_counter()
+        migrate("head")
+        migration = time.perf_counter() - started
+        db_manager.engine.dispose()
+        after = measure(path, args.rounds, "0004")
+
+    for name in QUERIES["0003"]:
+        assert before["results"][name] == after["results"][name], f"{name}: totals differ"
+
+    print(f"\n📏 {args.rows} transactions, {args.users} users; migration 0004 took {migration:.1f}s")
+    print(f"   {'':16} {'rows':>9}  {'row bytes':>17}  {'table KiB':>17}  {'index KiB':>17}")
+    for table in TABLES:
+        b, a = before["sizes"][table], after["sizes"][table]
+        print(f"   {table:16} {a['rows']:9}  {b['row']:7.1f} -> {a['row']:6.1f}  "
+              f"{b['table'] / 1024:7.0f} -> {a['table'] / 1024:6.0f}  "
+              f"{b['indexes'] / 1024:7.0f} -> {a['indexes'] / 1024:6.0f}")
+    print(f"   {'database file':16} {'':9}  {'':17}  {before['file'] / 1024:7.0f} -> {after['file'] / 1024:6.0f}")
+    print(f"\n   {'aggregation':28} {'before':>9}  {'after':>9}")
+    for name in QUERIES["0003"]:
+        b, a = before["timings"][name], after["timings"][name]
+        print(f"   {name:28} {b * 1000:7.2f}ms  {a * 1000:7.2f}ms  ({b / a:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
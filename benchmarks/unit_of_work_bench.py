@@ -0,0 +1,137 @@
+"""
+Statements and round trips per bot message: user lookup + insert vs one unit of work.
+
+Usage:
+    python -m benchmarks.unit_of_work_bench [--messages 200] [--db-latency-ms 1] [--url postgresql://...]
+
+Every message of one user is written both ways, one after the other:
+
+- before: `UsersService.get_or_create_user_async` then
+          `transactions_service.create_async` (two sessions: the user SELECT,
+          then INSERT, rollup upserts, commit and refresh)
+- after:  `transactions_service.create_for_user_async` (one session: the
+          profile upsert, INSERT and rollup upserts, one commit; a single
+          statement on PostgreSQL)
+
+Reported: statements and commits per message, counted on the async engine,
+and messages/sec. `--db-latency-ms` adds a simulated round trip to every
+statement (see bot_concurrency_bench); pass `--url` with `--db-latency-ms 0`
+to measure a real, migrated PostgreSQL server (benchmark users from
+3_000_000 are deleted afterwards).
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import delete, event
+
+import models  # registers every mapper before the first query
+from benchmarks.bot_concurrency_bench import add_latency
+from models.rollup import DailyRollup, MonthlyRollup
+from models.transaction import Transaction
+from models.user import User
+from services.async_database import async_db_manager
+from services.database import db_manager
+from services.transactions_service import transactions_service
+from services.users_service import UsersService
+
+FIRST_USER = 3_000_000
+
+
+async def before(profile: dict):
+    user = await UsersService.get_or_create_user_async(profile)
+    return await transactions_service.create_async(
+        user.telegram_id, "almoço", 32.5, "Alimentação", "despesa_variavel", date.today(), "regex"
+    )
+
+
+async def after(profile: dict):
+    return await transactions_service.create_for_user_async(
+        profile, "almoço", 32.5, "Alimentação", "despesa_variavel", date.today(), "regex"
+    )
+
+
+async def run_mode(write, telegram_id: int, messages: int) -> dict:
+    counts = {"statements": 0, "commits": 0}
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    def count_commit(conn):
+        counts["commits"] += 1
+
+    engine = async_db_manager.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    profile = {"id": telegram_id, "username": None, "first_name": "bench", "last_name": None}
+    try:
+        started = time.perf_counter()
+        for _ in range(messages):
+            t = await write(profile)
+            assert t is not None and t.id is not None
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        event.remove(engine, "commit", count_commit)
+
+    return {
+        "statements": counts["statements"] / messages,
+        "commits": counts["commits"] / messages,
+        "per_second": messages / elapsed,
+    }
+
+
+def cleanup(first_user: int, last_user: int):
+    with db_manager.get_session() as session:
+        for model in (DailyRollup, MonthlyRollup, Transaction, User):
+            session.execute(delete(model).where(model.telegram_id.between(first_user, last_user)))
+        session.commit()
+
+
+async def run(messages: int, latency_ms: float):
+    remove_latency = add_latency(latency_ms) if latency_ms else None
+    try:
+        return {
+            "before": await run_mode(before, FIRST_USER, messages),
+            "after": await run_mode(after, FIRST_USER + 1, messages),
+        }
+    finally:
+        if remove_latency:
+            remove_latency()
+        cleanup(FIRST_USER, FIRST_USER + 1)
+        await async_db_manager.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    parser.add_argument("--url", help="migrated database to use (default: a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if not url:
+            from scripts.migrate import migrate
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db_manager.configure(url)
+            migrate()
+        db_manager.configure(url)
+        async_db_manager.configure(url)
+        dialect = db_manager.engine.dialect.name
+
+        results = asyncio.run(run(args.messages, args.db_latency_ms))
+        db_manager.engine.dispose()
+
+    print(f"\n🧾 {args.messages} messages, {args.db_latency_ms:g} ms per statement, {dialect}")
+    for name, r in results.items():
+        print(f"   {name:7} {r['statements']:5.1f} statements/message  {r['commits']:4.1f} commits/message  "
+              f"{r['per_second']:7.0f} messages/s  ({r['per_second'] / results['before']['per_second']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
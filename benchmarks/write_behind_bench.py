@@ -0,0 +1,151 @@
+"""
+Bot inserts under load: one commit per message vs the write-behind batcher.
+
+Usage:
+    python -m benchmarks.write_behind_bench [--users 200] [--messages 10] [--batch-sizes 10,50,200]
+                                            [--window-ms 10] [--db-latency-ms 1] [--url postgresql://...]
+
+Every simulated user creates `--messages` transactions through
+`transactions_service.create_for_user_async` (what `message_handler`
+calls), all users at the same time on one event loop:
+
+- off:    WRITE_BEHIND_ENABLED=false, a session, profile upsert, INSERT,
+          rollup upserts and commit per message
+- batch N: the write-behind batcher with WRITE_BEHIND_MAX_ROWS=N and
+          `--window-ms`
+
+Reported: acknowledged transactions/sec, commits/sec, the mean batch and
+the failed writes (error replies). Every acknowledged row is checked to be
+in the database afterwards.
+`--db-latency-ms` adds a simulated round trip to every statement (see
+bot_concurrency_bench); pass `--url` with `--db-latency-ms 0` to measure a
+real, migrated PostgreSQL server (benchmark users from 2_000_000 are deleted
+afterwards).
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import delete, func, select
+
+import models  # registers every mapper before the first query
+from benchmarks.bot_concurrency_bench import add_latency
+from models.rollup import DailyRollup, MonthlyRollup
+from models.transaction import Transaction
+from models.user import User
+from services.async_database import async_db_manager
+from services.database import db_manager
+from services.transaction_batcher import TransactionWriteBatcher
+from services.transactions_service import transactions_service
+
+FIRST_USER = 2_000_000
+EXPENSES = [("almoço", 32.5, "Alimentação"), ("uber", 18.0, "Transporte"), ("farmácia", 37.0, "Saúde")]
+
+
+async def run_mode(batcher, users: int, messages: int, first_user: int) -> dict:
+    transactions_service.write_batcher = batcher
+
+    async def send(telegram_id):
+        profile = {"id": telegram_id, "username": None, "first_name": "bench", "last_name": None}
+        acknowledged = 0
+        for i in range(messages):
+            description, amount, category = EXPENSES[(telegram_id + i) % len(EXPENSES)]
+            t = await transactions_service.create_for_user_async(
+                profile, description, amount, category, "despesa_variavel", date.today(), "regex"
+            )
+            # None is the error reply ("database is locked" once SQLite's busy timeout runs out).
+            acknowledged += t is not None and t.id is not None
+        return acknowledged
+
+    started = time.perf_counter()
+    acknowledged = sum(await asyncio.gather(*(send(first_user + i) for i in range(users))))
+    elapsed = time.perf_counter() - started
+    if batcher is not None:
+        await batcher.close()
+
+    with db_manager.get_session() as session:
+        stored = session.execute(
+            select(func.count(Transaction.id)).where(Transaction.telegram_id.between(first_user, first_user + users - 1))
+        ).scalar()
+    assert stored == acknowledged, f"{stored} stored, {acknowledged} acknowledged"
+
+    commits = batcher.commits if batcher is not None else acknowledged
+    return {
+        "per_second": acknowledged / elapsed,
+        "commits_per_second": commits / elapsed,
+        "mean_batch": acknowledged / commits if commits else 0.0,
+        "failed": users * messages - acknowledged,
+    }
+
+
+def add_users(first_user: int, count: int):
+    with db_manager.get_session() as session:
+        session.add_all([User(telegram_id=first_user + i, first_name="bench") for i in range(count)])
+        session.commit()
+
+
+def cleanup(first_user: int, last_user: int):
+    with db_manager.get_session() as session:
+        for model in (DailyRollup, MonthlyRollup, Transaction, User):
+            session.execute(delete(model).where(model.telegram_id.between(first_user, last_user)))
+        session.commit()
+
+
+async def run(users: int, messages: int, batch_sizes: list, window_ms: float, latency_ms: float):
+    modes = [("off", None)] + [
+        (f"batch {size}", TransactionWriteBatcher(window_ms=window_ms, max_rows=size)) for size in batch_sizes
+    ]
+    add_users(FIRST_USER, users * len(modes))
+    remove_latency = add_latency(latency_ms) if latency_ms else None
+    results = {}
+    try:
+        for index, (name, batcher) in enumerate(modes):
+            results[name] = await run_mode(batcher, users, messages, FIRST_USER + index * users)
+    finally:
+        if remove_latency:
+            remove_latency()
+        transactions_service.write_batcher = None
+        cleanup(FIRST_USER, FIRST_USER + users * len(modes))
+        await async_db_manager.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--batch-sizes", default="10,50,200")
+    parser.add_argument("--window-ms", type=float, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    parser.add_argument("--url", help="migrated database to use (default: a temporary SQLite file)")
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if not url:
+            from scripts.migrate import migrate
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            db_manager.configure(url)
+            migrate()
+        db_manager.configure(url)
+        async_db_manager.configure(url)
+        dialect = db_manager.engine.dialect.name
+
+        results = asyncio.run(run(args.users, args.messages, batch_sizes, args.window_ms, args.db_latency_ms))
+        db_manager.engine.dispose()
+
+    print(f"\n✍️ {args.users} users x {args.messages} transactions, {args.window_ms:g} ms window, "
+          f"{args.db_latency_ms:g} ms per statement, {dialect}")
+    for name, r in results.items():
+        print(f"   {name:10} {r['per_second']:8.0f} transactions/s  {r['commits_per_second']:7.0f} commits/s  "
+              f"mean batch {r['mean_batch']:6.1f}  failed {r['failed']:4}  "
+              f"({r['per_second'] / results['off']['per_second']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,19 @@ from telegram.ext import (
 )
 
 from config import config
+from services.ai_processor import ai_processor
+from services.shard_router import shard_router
+from services.transactions_service import transactions_service
 
+from bot.update_processor import PerUserUpdateProcessor
 from bot.handlers.start_handler import start_handler
 from bot.handlers.help_handler import help_handler
 from bot.handlers.login_handler import login_handler
 from bot.handlers.summary_handler import summary_handler
 from bot.handlers.message_handler import message_handler
 from bot.handlers.list_handler import list_transactions_handler
+from bot.handlers.import_handler import import_handler
+from bot.handlers.export_handler import export_handler
 from bot.handlers.edit_handler import (
     edit_init_handler,
     edit_choice_handler,
@@ -38,7 +44,16 @@ class FinanceBot:
 
     def __init__(self):
         # Build the Telegram application using the bot token from config.
-        self.application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+        # Handlers await the async database layer, so updates from different
+        # users are processed concurrently instead of one after the other;
+        # each user's own updates still run in order (see PerUserUpdateProcessor).
+        self.application = (
+            Application.builder()
+            .token(config.TELEGRAM_BOT_TOKEN)
+            .concurrent_updates(PerUserUpdateProcessor(config.BOT_CONCURRENT_UPDATES))
+            .post_shutdown(self._shutdown)
+            .build()
+        )
         self._setup_handlers()
 
     def _setup_handlers(self):
@@ -49,6 +64,7 @@ class FinanceBot:
         self.application.add_handler(CommandHandler("login", login_handler))
         self.application.add_handler(CommandHandler("resumo", summary_handler))
         self.application.add_handler(CommandHandler("listar", list_transactions_handler))
+        self.application.add_handler(CommandHandler("exportar", export_handler))
 
         # --- Edit handlers (edit an existing transaction) ---
         # Use specific regex patterns to avoid collisions between edit_init and edit_choice/edit_cancel.
@@ -61,6 +77,11 @@ class FinanceBot:
         self.application.add_handler(CallbackQueryHandler(delete_cancel_handler, pattern=r"^cancel_delete$"))
         self.application.add_handler(CallbackQueryHandler(delete_confirm_handler, pattern=r"^delete_\d+$"))
 
+        # --- Bank statements sent as documents ---
+        self.application.add_handler(
+            MessageHandler(filters.Document.FileExtension("csv") | filters.Document.FileExtension("ofx"), import_handler)
+        )
+
         # --- Text message handlers ---
         # edit_process_handler is in group 0 (default), message_handler in group 1.
         # edit_process_handler checks if an edit is in progress; if not, it does nothing
@@ -74,6 +95,14 @@ class FinanceBot:
             group=1,
         )
 
+    async def _shutdown(self, application: Application):
+        """Finish the queued categorizations and transactions, then close the async database connections, when polling stops."""
+        if ai_processor.batcher is not None:
+            await ai_processor.batcher.close()
+        if transactions_service.write_batcher is not None:
+            await transactions_service.write_batcher.close()
+        await shard_router.dispose_async()
+
     def run(self):
         """Start polling for Telegram updates."""
         self.application.run_polling()
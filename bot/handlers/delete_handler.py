@@ -11,7 +11,7 @@ async def delete_confirm_handler(update: Update, context: ContextTypes.DEFAULT_T
     context.user_data["delete_id"] = transaction_id
 
     # Load the transaction so we can show what will be deleted.
-    t = transactions_service.get_by_id(transaction_id)
+    t = await transactions_service.get_by_id_async(transaction_id, update.effective_user.id)
     if not t:
         await query.edit_message_text("⚠️ Could not find that transaction to delete.")
         return
@@ -43,7 +43,7 @@ async def delete_execute_handler(update: Update, context: ContextTypes.DEFAULT_T
         await query.edit_message_text("⚠️ No transaction selected for deletion.")
         return
 
-    deleted = transactions_service.delete(transaction_id)
+    deleted = await transactions_service.delete_async(transaction_id, update.effective_user.id)
 
     if deleted:
         await query.edit_message_text("✅ *Transaction deleted successfully!*", parse_mode="Markdown")
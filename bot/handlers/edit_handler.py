@@ -18,7 +18,7 @@ async def edit_init_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Load the transaction so we can show the current values before editing.
-    t = transactions_service.get_by_id(transaction_id)
+    t = await transactions_service.get_by_id_async(transaction_id, update.effective_user.id)
     if not t:
         await query.edit_message_text("❌ Transação não encontrada.")
         return
@@ -101,7 +101,7 @@ async def edit_process_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         update_data[field] = new_value
 
     # Call the service to apply the partial update.
-    success = transactions_service.update(transaction_id, **update_data)
+    success = await transactions_service.update_async(transaction_id, update.effective_user.id, **update_data)
 
     if success:
         await update.message.reply_text(f"✅ Campo *{field}* atualizado com sucesso!", parse_mode='Markdown')
@@ -0,0 +1,59 @@
+# bot/handlers/export_handler.py
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import date
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from services.transaction_export import parquet_available, transaction_exporter
+from services.users_service import UsersService
+
+logger = logging.getLogger(__name__)
+
+# Largest file a bot can send.
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+async def export_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /exportar [parquet] and send the full history as a document."""
+
+    fmt = "parquet" if context.args and context.args[0].lower() == "parquet" else "csv"
+
+    try:
+        user = await UsersService.get_or_create_user_async(update.effective_user)
+        if fmt == "parquet" and not parquet_available():
+            await update.message.reply_text("❌ A exportação em Parquet não está disponível. Use /exportar para CSV.")
+            return
+
+        await update.message.reply_text("📤 Gerando o arquivo com todas as suas transações, aguarde...")
+        with tempfile.TemporaryDirectory() as folder:
+            # Written to disk chunk by chunk, so the history never sits in memory.
+            path = os.path.join(folder, f"transacoes_{date.today():%Y-%m-%d}.{fmt}")
+            # The export is blocking database work; keep it off the event loop.
+            stats = await asyncio.to_thread(transaction_exporter.export_path, user.telegram_id, path, fmt)
+
+            if stats["error"]:
+                await update.message.reply_text(f"❌ Não consegui exportar as transações: {stats['error']}")
+                return
+            if stats["rows"] == 0:
+                await update.message.reply_text("📭 Você ainda não tem transações para exportar.")
+                return
+            if os.path.getsize(path) > MAX_UPLOAD_BYTES:
+                await update.message.reply_text(
+                    "❌ O arquivo passou de 50 MB, o limite do Telegram. Exporte pelo painel web."
+                )
+                return
+
+            with open(path, "rb") as document:
+                await update.message.reply_document(
+                    document=document,
+                    filename=os.path.basename(path),
+                    caption=f"📤 {stats['rows']} transações exportadas.",
+                )
+
+    except Exception as e:
+        logger.error(f"Erro no comando /exportar: {e}")
+        await update.message.reply_text("❌ Ocorreu um erro ao exportar as transações.")
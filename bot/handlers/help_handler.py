@@ -13,6 +13,7 @@ async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /login - Gera um código para acessar o painel web.
 /resumo - Mostra um resumo financeiro detalhado do mês.
 /listar - Lista suas transações com opções de editar e excluir.
+/exportar - Envia todas as suas transações em CSV (`/exportar parquet` para Parquet).
 
 💰 *Registro de Gastos (Inteligente):*
 Apenas escreva naturalmente. Exemplos:
@@ -23,6 +24,9 @@ Apenas escreva naturalmente. Exemplos:
 • `investi 1000` (será categorizado como 'economia')
 • `recebi 5000` (será categorizado como 'renda')
 
+📥 *Importar Extrato:*
+Envie o arquivo `.csv` ou `.ofx` do seu banco como documento. Transações que já existem são ignoradas.
+
 🛠️ *Como Editar/Excluir:*
 1. Use `/listar` para ver suas transações.
 2. Clique em "✏️ Editar" ou "🗑️ Excluir" ao lado de cada item.
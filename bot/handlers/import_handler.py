@@ -0,0 +1,49 @@
+# bot/handlers/import_handler.py
+import asyncio
+import logging
+import os
+import tempfile
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from services.statement_import import statement_importer
+from services.users_service import UsersService
+
+logger = logging.getLogger(__name__)
+
+
+async def import_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Import a bank statement (.csv or .ofx) sent as a document."""
+
+    document = update.message.document
+
+    try:
+        user = await UsersService.get_or_create_user_async(update.effective_user)
+        await update.message.reply_text("📥 Importando extrato, aguarde...")
+        with tempfile.TemporaryDirectory() as folder:
+            # Saved to disk and read as a stream, so large statements never sit in memory.
+            path = os.path.join(folder, os.path.basename(document.file_name or "extrato.csv"))
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_drive(path)
+            # The import is blocking database and CPU work; keep it off the event loop.
+            stats = await asyncio.to_thread(statement_importer.import_path, user.telegram_id, path)
+
+        if stats["error"] and not stats["imported"]:
+            await update.message.reply_text(f"❌ Não consegui importar o extrato: {stats['error']}")
+            return
+
+        lines = [
+            f"✅ Extrato importado: {stats['imported']} novas transações.",
+            f"🔁 {stats['duplicates']} já existentes foram ignoradas.",
+        ]
+        if stats["invalid"]:
+            lines.append(f"⚠️ {stats['invalid']} linhas sem data ou valor foram ignoradas.")
+        if stats["error"]:
+            lines.append(f"❌ A importação parou antes do fim: {stats['error']}. Envie o arquivo de novo para continuar.")
+        lines.append(f"⏱️ {stats['read']} linhas em {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} linhas/s)")
+        await update.message.reply_text("\n".join(lines))
+
+    except Exception as e:
+        logger.error(f"Erro no import_handler: {e}")
+        await update.message.reply_text("❌ Ocorreu um erro ao importar o extrato.")
@@ -9,7 +9,7 @@ async def list_transactions_handler(update: Update, context: ContextTypes.DEFAUL
     telegram_id = update.effective_user.id  # Read Telegram ID from the message.
     now = datetime.now()
 
-    transactions, _ = transactions_service.get_transactions(
+    transactions, _ = await transactions_service.get_transactions_async(
         telegram_id=telegram_id,
         filters={"date_range": "current_month"}
     )
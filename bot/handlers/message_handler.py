@@ -1,7 +1,6 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from services.transactions_service import transactions_service
-from services.users_service import UsersService
 from services.ai_processor import ai_processor
 from datetime import datetime
 import logging
@@ -12,24 +11,25 @@ logger = logging.getLogger(__name__)
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle free text messages and try to create a transaction from them."""
 
-    # Make sure the Telegram user exists in the database and get the corresponding model instance.
-    user = UsersService.get_or_create_user(update.effective_user)
+    telegram_user = update.effective_user
     user_message = update.message.text
 
     try:
-        data = ai_processor.detect_expense(user_message)
+        # Async detection: a slow external call must not stall the other users' updates.
+        data = await ai_processor.detect_expense_async(user_message, telegram_id=telegram_user["id"])
         if data['amount'] is None:
             await update.message.reply_text("❌ Não consegui identificar o valor. Ex: 'almoço 45,50'")
             return
 
-        # Use the Telegram ID consistently when creating the transaction.
-        transaction = transactions_service.create(
-            telegram_id=user.telegram_id,
+        # One unit of work: the user's profile upsert and the new transaction share a session and a commit.
+        # The date comes from the text ("ontem", "15/03") when the user wrote one.
+        transaction = await transactions_service.create_for_user_async(
+            telegram_user,
             description=data["description"],
             amount=data["amount"],
             category=data["category"],
             type=data["type"],
-            date=datetime.now(),
+            date=data.get("date") or datetime.now().date(),
             detected_by=data["detected_by"],
         )
 
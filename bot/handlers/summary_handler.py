@@ -3,7 +3,6 @@ from telegram import Update
 from telegram.ext import ContextTypes
 import logging
 from services.finance_calculator import finance_calculator
-from services.users_service import UsersService # ✅ importar UsersService
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +10,9 @@ async def summary_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the /resumo command and send a monthly financial summary."""
     
     try:
-        # Ensure the Telegram user exists in the database and get the model instance.
-        user = UsersService.get_or_create_user(update.effective_user)
-
-        # Use the Telegram ID consistently (all services filter by telegram_id).
-        resumo = finance_calculator.get_monthly_summary(user.telegram_id) 
+        # All services filter by telegram_id, so the summary needs no user lookup;
+        # the user's row is created with their first transaction.
+        resumo = await finance_calculator.get_monthly_summary_async(update.effective_user["id"])
         
         if resumo['transacoes_count'] == 0:
             await update.message.reply_text(
@@ -0,0 +1,59 @@
+# bot/update_processor.py
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates from different users concurrently, and each user's
+    updates one after the other, in the order they arrived.
+
+    The edit and delete conversations keep their state in
+    `context.user_data`, so two updates of the same user must never run at
+    the same time (a reply could be handled before the button press that
+    started the step). Up to `max_concurrent_updates` updates run at once;
+    a user's queued updates hold a slot while they wait for the previous one.
+    """
+
+    __slots__ = ("_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # key -> [lock, updates holding or waiting for it]; dropped when no update needs it.
+        self._locks = {}
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        key = self._key(update)
+        if key is None:
+            await coroutine
+            return
+
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes its waiters first in, first out.
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _key(update: object):
+        """The sender's id (the chat's for updates without a user); None for anything else."""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return ("user", update.effective_user.id)
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+        return None
@@ -9,6 +9,9 @@ class Config:
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
     # Bot username (without "@"). Used by the login widget/link.
     TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME")
+    # How many updates the bot handles at the same time (1 = one after the other).
+    # One user's updates always run in order, whatever the value.
+    BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
 
     # --- Service URLs (API and Streamlit) ---
     # URL where the authentication API (FastAPI) is running.
@@ -19,10 +22,97 @@ class Config:
     # --- Database configuration ---
     # If DATABASE_URL is not set, use a local SQLite file for personal use.
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///chat_crown.db")
+    # Optional read replica for dashboards, reports and summaries (unset = read from DATABASE_URL).
+    DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+    # After a user writes, their reads go to the primary for this long, so they
+    # see their own change even when the replica lags behind.
+    READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+    # Extra databases for user data, "name=url,name=url". DATABASE_URL is the
+    # "default" shard and holds the directory of which shard each user is on.
+    DATABASE_SHARDS = os.getenv("DATABASE_SHARDS", "")
+    SHARD_DIRECTORY_CACHE_SECONDS = float(os.getenv("SHARD_DIRECTORY_CACHE_SECONDS", "5"))
+
+    # SQLite engine profile. WAL lets the dashboards read while the bot writes;
+    # readers use query_only connections so they never take the write lock.
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # Server database (PostgreSQL) profile: connection pool of each process.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    # Recycle connections before the server or a proxy (e.g. Supabase's pooler) drops them.
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    # Liveness check on checkout: "always" (one extra round trip per checkout),
+    # "idle" (only connections unused for DB_PRE_PING_IDLE_SECONDS) or "never".
+    DB_PRE_PING = os.getenv("DB_PRE_PING", "idle")
+    DB_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_PRE_PING_IDLE_SECONDS", "60"))
+    # How often each process logs its pool gauges (0 disables).
+    DB_POOL_STATS_LOG_SECONDS = float(os.getenv("DB_POOL_STATS_LOG_SECONDS", "300"))
 
     # --- External processing configuration ---
     # Optional key for external text processing features
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    # Optional override of the API base URL (e.g. a local Groq-compatible server for tests).
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+    GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    # Guards for the async path used by the bot.
+    GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "5"))
+    GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+    # Circuit breaker: open after N consecutive failures (calls slower than
+    # GROQ_BREAKER_SLOW_SECONDS count as failures), retry after the reset period.
+    GROQ_BREAKER_FAILURES = int(os.getenv("GROQ_BREAKER_FAILURES", "5"))
+    GROQ_BREAKER_SLOW_SECONDS = float(os.getenv("GROQ_BREAKER_SLOW_SECONDS", "3"))
+    GROQ_BREAKER_RESET_SECONDS = float(os.getenv("GROQ_BREAKER_RESET_SECONDS", "30"))
+    # How many messages `detect_expenses` packs into a single external prompt.
+    AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "25"))
+    # Async micro-batching of ambiguous bot messages: wait up to the window
+    # (or until the batch is full) and send them in one prompt.
+    AI_MICROBATCH_ENABLED = os.getenv("AI_MICROBATCH_ENABLED", "true").lower() == "true"
+    AI_MICROBATCH_WINDOW_MS = float(os.getenv("AI_MICROBATCH_WINDOW_MS", "50"))
+    AI_MICROBATCH_MAX_SIZE = int(os.getenv("AI_MICROBATCH_MAX_SIZE", "16"))
+
+    # --- Cache of external categorization results ---
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    # SQLite file for the persistent tier; leave empty to keep the cache in memory only.
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "50000"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # --- Per-user categorization memory (learned from past transactions) ---
+    CATEGORY_MEMORY_MAX_PER_USER = int(os.getenv("CATEGORY_MEMORY_MAX_PER_USER", "500"))
+    CATEGORY_MEMORY_MAX_USERS = int(os.getenv("CATEGORY_MEMORY_MAX_USERS", "5000"))
+    # Minimum rapidfuzz score (0-100) for a fuzzy match to be trusted.
+    CATEGORY_MEMORY_SCORE_CUTOFF = float(os.getenv("CATEGORY_MEMORY_SCORE_CUTOFF", "88"))
+    # How often a loaded user's memory re-reads rows confirmed in other processes (e.g. the Streamlit app).
+    CATEGORY_MEMORY_REFRESH_SECONDS = float(os.getenv("CATEGORY_MEMORY_REFRESH_SECONDS", "30"))
+
+    # --- Offline local classifier (trained with `python -m scripts.train_classifier`) ---
+    LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "local_model.npy")
+    # Minimum predicted probability for the local model to override the "Diversos" fallback.
+    LOCAL_MODEL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MODEL_MIN_CONFIDENCE", "0.8"))
+    # How often the bot checks for a retrained model file.
+    LOCAL_MODEL_RELOAD_SECONDS = float(os.getenv("LOCAL_MODEL_RELOAD_SECONDS", "60"))
+
+    # --- Write-behind batching of bot-created transactions ---
+    # Off by default. When on, transactions from free-text messages are queued and
+    # committed together every WRITE_BEHIND_FLUSH_MS or WRITE_BEHIND_MAX_ROWS rows,
+    # whichever comes first; each reply is sent only after its row is committed.
+    WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "10"))
+    WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "100"))
+
+    # --- Bank statement import (CSV / OFX) ---
+    # Rows read, categorized and inserted per transaction; memory use is bounded by this.
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+
+    # --- Transaction export (CSV / Parquet) ---
+    # Rows fetched from the server-side cursor and written per chunk (one Parquet row group each).
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
 
     # --- General configuration ---
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -12,7 +12,8 @@ This script prepares the database and then starts listening for bot updates.
 
 import logging
 from services.database import db_manager
-import models  # Import all models to ensure mappings are registered before creating tables.
+from services.shard_router import shard_router
+import models  # Import all models to ensure mappings are registered before the first query.
 from bot.bot import bot
 
 # Basic logging configuration for the whole application.
@@ -21,17 +22,19 @@ logger = logging.getLogger(__name__)
 
 
 def setup_database():
-    """Create all tables (if needed) and verify the database connection."""
+    """Verify the database connection and that its schema is up to date."""
     try:
         db_manager.test_connection()
         logger.info("✅ Conexão com o banco de dados OK!")
-        
-        models.Base.metadata.create_all(bind=db_manager.engine)
-        logger.info("✅ Todas as tabelas foram verificadas/criadas com sucesso!")
     except Exception as e:
         logger.error(f"❌ Falha ao inicializar banco de dados: {e}")
         raise
 
+    # Only a version check: tables are created and changed by `python -m scripts.migrate`.
+    if not all([manager.check_schema() for manager in shard_router.managers.values()]):
+        raise RuntimeError("Esquema do banco desatualizado. Rode: python -m scripts.migrate")
+
+
 def setup():
     """High-level setup hook before actually starting the bot."""
     print("🚀 Inicializando Sistema Financeiro Pessoal...")
@@ -0,0 +1,66 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+
+# Same environment as the bot, so DATABASE_URL matches.
+load_dotenv()
+
+from config.config import config  # noqa: E402
+import models  # noqa: E402
+
+alembic_config = context.config
+if alembic_config.config_file_name is not None:
+    # Keep the loggers the application already created: scripts.migrate runs
+    # in-process, and the default would silence them for the rest of the run.
+    fileConfig(alembic_config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+
+
+def database_url() -> str:
+    # `alembic -x url=...` overrides the configured database.
+    return context.get_x_argument(as_dictionary=True).get("url") or config.DATABASE_URL
+
+
+def run_migrations_offline():
+    """Emit the SQL to stdout instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # A caller may hand over an open connection (see scripts/migrate.py).
+    connection = alembic_config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER constraints in place; batch mode rebuilds the table.
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
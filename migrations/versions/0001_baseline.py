@@ -0,0 +1,113 @@
+"""baseline: schema as created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases that were created before migrations existed already have these
+tables; mark them with `alembic stamp 0001` and upgrade from there.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(100)),
+        sa.Column("first_name", sa.String(100)),
+        sa.Column("last_name", sa.String(100)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column(
+            "type",
+            sa.Enum("renda", "despesa_fixa", "despesa_variavel", "economia", name="transaction_type"),
+            nullable=False,
+        ),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("description", sa.String(200)),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("detected_by", sa.String(50)),
+        sa.Column("original_message", sa.String(500)),
+    )
+    op.create_index("ix_transactions_telegram_id", "transactions", ["telegram_id"])
+
+    op.create_table(
+        "budgets",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("monthly_limit", sa.Float(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_budgets_telegram_id", "budgets", ["telegram_id"])
+
+    op.create_table(
+        "financial_goals",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("target_amount", sa.Float(), nullable=False),
+        sa.Column("current_amount", sa.Float()),
+        sa.Column("deadline", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(100)),
+        sa.Column("priority", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_financial_goals_telegram_id", "financial_goals", ["telegram_id"])
+
+    op.create_table(
+        "daily_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("type", sa.String(20), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("telegram_id", "date", "type", "category", name="uq_daily_rollups_key"),
+    )
+
+    op.create_table(
+        "monthly_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(20), nullable=False),
+        sa.Column("category", sa.String(100), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("telegram_id", "year", "month", "type", "category", name="uq_monthly_rollups_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("monthly_rollups")
+    op.drop_table("daily_rollups")
+    op.drop_table("financial_goals")
+    op.drop_table("budgets")
+    op.drop_table("transactions")
+    op.drop_table("users")
+    sa.Enum(name="transaction_type").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,57 @@
+"""composite indexes for the service queries and a unique budget key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+- transactions: (telegram_id, date), (telegram_id, type, date) and
+  (telegram_id, updated_at) replace the single-column telegram_id index.
+- financial_goals: (telegram_id, priority, deadline) replaces telegram_id.
+- budgets: unique (telegram_id, year, month, category) replaces telegram_id;
+  duplicates left by the old select-then-insert are removed first, keeping
+  the most recent row of each key.
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_transactions_user_date", "transactions", ["telegram_id", "date"])
+    op.create_index("ix_transactions_user_type_date", "transactions", ["telegram_id", "type", "date"])
+    op.create_index("ix_transactions_user_updated", "transactions", ["telegram_id", "updated_at"])
+    op.drop_index("ix_transactions_telegram_id", table_name="transactions")
+
+    op.create_index(
+        "ix_financial_goals_user_priority_deadline", "financial_goals", ["telegram_id", "priority", "deadline"]
+    )
+    op.drop_index("ix_financial_goals_telegram_id", table_name="financial_goals")
+
+    op.execute(
+        "DELETE FROM budgets WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM budgets "
+        "GROUP BY telegram_id, year, month, category) AS latest)"
+    )
+    with op.batch_alter_table("budgets") as batch:
+        batch.create_unique_constraint(
+            "uq_budgets_user_month_category", ["telegram_id", "year", "month", "category"]
+        )
+    op.drop_index("ix_budgets_telegram_id", table_name="budgets")
+
+
+def downgrade():
+    op.create_index("ix_budgets_telegram_id", "budgets", ["telegram_id"])
+    with op.batch_alter_table("budgets") as batch:
+        batch.drop_constraint("uq_budgets_user_month_category", type_="unique")
+
+    op.create_index("ix_financial_goals_telegram_id", "financial_goals", ["telegram_id"])
+    op.drop_index("ix_financial_goals_user_priority_deadline", table_name="financial_goals")
+
+    op.create_index("ix_transactions_telegram_id", "transactions", ["telegram_id"])
+    op.drop_index("ix_transactions_user_updated", table_name="transactions")
+    op.drop_index("ix_transactions_user_type_date", table_name="transactions")
+    op.drop_index("ix_transactions_user_date", table_name="transactions")
@@ -0,0 +1,33 @@
+"""shard directory
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+user_shards maps a telegram_id to the database that holds the user's rows
+(services/shard_router.py). Created on every shard so all databases share
+one schema revision; only the directory database (DATABASE_URL) fills it.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_shards",
+        sa.Column("telegram_id", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("shard", sa.String(length=50), nullable=False),
+        sa.Column("moving", sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("telegram_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_shards")
@@ -0,0 +1,93 @@
+"""amounts in integer cents, categories in a lookup table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+- categories: one row per category name, SMALLINT id.
+- transactions.amount, budgets.monthly_limit and the rollup totals become
+  BIGINT cents (amount_cents, monthly_limit_cents, total_cents), rounded
+  from the FLOAT values.
+- transactions, budgets and the rollups reference categories by
+  category_id instead of repeating the name; the unique keys of budgets
+  and rollups are rebuilt on category_id.
+
+The backfill runs as one UPDATE per table before the old columns are
+dropped; on SQLite each table is copied once by batch mode.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+CategoryId = sa.SmallInteger().with_variant(sa.Integer(), "sqlite")
+
+# table: (float column, cents column, unique key columns or None)
+MONEY_TABLES = {
+    "transactions": ("amount", "amount_cents", None),
+    "budgets": ("monthly_limit", "monthly_limit_cents", ("telegram_id", "year", "month")),
+    "daily_rollups": ("total", "total_cents", ("telegram_id", "date", "type")),
+    "monthly_rollups": ("total", "total_cents", ("telegram_id", "year", "month", "type")),
+}
+
+UNIQUE_KEYS = {
+    "budgets": "uq_budgets_user_month_category",
+    "daily_rollups": "uq_daily_rollups_key",
+    "monthly_rollups": "uq_monthly_rollups_key",
+}
+
+
+def upgrade():
+    op.create_table(
+        "categories",
+        sa.Column("id", CategoryId, primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.UniqueConstraint("name", name="uq_categories_name"),
+    )
+    names = " UNION ".join(f"SELECT category AS name FROM {table}" for table in MONEY_TABLES)
+    op.execute(f"INSERT INTO categories (name) SELECT name FROM ({names}) AS names ORDER BY name")
+
+    for table, (old, cents, key) in MONEY_TABLES.items():
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column(cents, sa.BigInteger(), nullable=True))
+            batch.add_column(sa.Column("category_id", CategoryId, nullable=True))
+        op.execute(
+            f"UPDATE {table} SET {cents} = CAST(ROUND({old} * 100) AS BIGINT), "
+            f"category_id = (SELECT id FROM categories WHERE categories.name = {table}.category)"
+        )
+        with op.batch_alter_table(table) as batch:
+            if key:
+                batch.drop_constraint(UNIQUE_KEYS[table], type_="unique")
+            batch.drop_column(old)
+            batch.drop_column("category")
+            batch.alter_column(cents, existing_type=sa.BigInteger(), nullable=False)
+            batch.alter_column("category_id", existing_type=CategoryId, nullable=False)
+            batch.create_foreign_key(f"fk_{table}_category_id", "categories", ["category_id"], ["id"])
+            if key:
+                batch.create_unique_constraint(UNIQUE_KEYS[table], [*key, "category_id"])
+
+
+def downgrade():
+    for table, (old, cents, key) in MONEY_TABLES.items():
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column(old, sa.Float(), nullable=True))
+            batch.add_column(sa.Column("category", sa.String(100), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET {old} = {cents} / 100.0, "
+            f"category = (SELECT name FROM categories WHERE categories.id = {table}.category_id)"
+        )
+        with op.batch_alter_table(table) as batch:
+            if key:
+                batch.drop_constraint(UNIQUE_KEYS[table], type_="unique")
+            batch.drop_constraint(f"fk_{table}_category_id", type_="foreignkey")
+            batch.drop_column(cents)
+            batch.drop_column("category_id")
+            batch.alter_column(old, existing_type=sa.Float(), nullable=False)
+            batch.alter_column("category", existing_type=sa.String(100), nullable=False)
+            if key:
+                batch.create_unique_constraint(UNIQUE_KEYS[table], [*key, "category"])
+    op.drop_table("categories")
@@ -0,0 +1,84 @@
+"""full-text search index on transaction descriptions
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+- SQLite: `transactions_fts`, an FTS5 index over transactions (description
+  and telegram_id, external content, unicode61 tokenizer without
+  diacritics, prefix indexes for 2 and 3 characters), kept in sync by
+  AFTER INSERT/UPDATE/DELETE triggers and filled from the existing rows.
+- PostgreSQL: the unaccent extension, an IMMUTABLE `f_unaccent` wrapper
+  (unaccent itself is only STABLE, so it cannot be indexed) and a GIN index
+  on to_tsvector('simple', f_unaccent(description)).
+
+See services/transaction_search.py for the queries. SQLite drops the
+triggers when a batch migration recreates `transactions`: such migrations
+must create the SQLITE_TRIGGERS below again.
+"""
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+SQLITE_TRIGGERS = {
+    "transactions_fts_insert": (
+        "AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts (rowid, description, telegram_id) "
+        "VALUES (new.id, new.description, new.telegram_id); END"
+    ),
+    "transactions_fts_delete": (
+        "AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description, telegram_id) "
+        "VALUES ('delete', old.id, old.description, old.telegram_id); END"
+    ),
+    "transactions_fts_update": (
+        "AFTER UPDATE OF description, telegram_id ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description, telegram_id) "
+        "VALUES ('delete', old.id, old.description, old.telegram_id); "
+        "INSERT INTO transactions_fts (rowid, description, telegram_id) "
+        "VALUES (new.id, new.description, new.telegram_id); END"
+    ),
+}
+
+
+def create_sqlite_triggers():
+    for name, body in SQLITE_TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+            "description, telegram_id, content='transactions', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        create_sqlite_triggers()
+        op.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute(
+            "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+            "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+        )
+        op.execute(
+            "CREATE INDEX ix_transactions_description_fts ON transactions USING gin "
+            "(to_tsvector('simple'::regconfig, f_unaccent(coalesce(description, ''))))"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS transactions_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_transactions_description_fts")
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -5,6 +5,9 @@ SQLAlchemy models for the Chat Crown project.
 # models/__init__.py
 from .base import Base
 from .user import User
+from .category import Category
 from .transaction import Transaction
 from .budget import Budget
 from .financial_goal import FinancialGoal
+from .rollup import DailyRollup, MonthlyRollup
+from .user_shard import UserShard
@@ -1,22 +1,28 @@
 # models/budget.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey, UniqueConstraint
 from datetime import datetime, timezone
 from .base import Base
+from .category import CategorizedMixin
+from .money import reais
 
 
 def current_utc_time():
     return datetime.now(timezone.utc)
 
 
-class Budget(Base):
+class Budget(CategorizedMixin, Base):
     __tablename__ = "budgets"
+    __table_args__ = (
+        # One limit per user, month and category; lets `set_budget` upsert.
+        UniqueConstraint("telegram_id", "year", "month", "category_id", name="uq_budgets_user_month_category"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     
-    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False, index=True)
+    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
     
-    category = Column(String(100), nullable=False)
-    monthly_limit = Column(Float, nullable=False)
+    monthly_limit_cents = Column(BigInteger, nullable=False)
+    monthly_limit = reais("monthly_limit_cents")
     month = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=current_utc_time)
@@ -0,0 +1,133 @@
+# models/category.py
+import itertools
+import threading
+
+from sqlalchemy import Column, ForeignKey, Integer, SmallInteger, String, UniqueConstraint, event, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, declared_attr, relationship
+
+from .base import Base
+
+# SMALLINT on PostgreSQL; SQLite only numbers INTEGER PRIMARY KEY columns automatically
+# (and stores every integer in as few bytes as the value needs anyway).
+CategoryId = SmallInteger().with_variant(Integer(), "sqlite")
+
+
+class Category(Base):
+    """
+    Category names, stored once per database.
+
+    Transactions, budgets and rollups reference a category by its small id
+    instead of repeating the name on every row. Rows are never renamed or
+    deleted, so ids can be cached; ids differ between shards.
+    """
+    __tablename__ = "categories"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_categories_name"),
+    )
+
+    id = Column(CategoryId, primary_key=True, autoincrement=True)
+    name = Column(String(100), nullable=False)
+
+    def __repr__(self):
+        return f"<Category(id={self.id}, name={self.name})>"
+
+
+# (database URL, name) -> id, for categories known to be committed.
+_category_ids = {}
+_category_ids_lock = threading.Lock()
+
+
+def resolve_category_id(session, name: str) -> int:
+    """Id of the category called `name` in the session's database, adding it the first time it is used."""
+    key = (str(session.get_bind().url), name)
+    with _category_ids_lock:
+        cached = _category_ids.get(key)
+    if cached is not None:
+        return cached
+    # Added by this transaction and not committed yet: only cached after the commit.
+    pending = session.info.setdefault("new_category_ids", {})
+    if key in pending:
+        return pending[key]
+
+    with session.no_autoflush:
+        found = session.execute(select(Category.id).where(Category.name == name)).scalar()
+        if found is not None:
+            with _category_ids_lock:
+                _category_ids[key] = found
+            return found
+
+        dialect = session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            insert_fn = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            # Another process may add the same name at the same time.
+            session.execute(insert_fn(Category.__table__).values(name=name).on_conflict_do_nothing())
+        else:
+            session.execute(insert(Category.__table__).values(name=name))
+        pending[key] = session.execute(select(Category.id).where(Category.name == name)).scalar_one()
+    return pending[key]
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_new_categories(session):
+    pending = session.info.pop("new_category_ids", None)
+    if pending:
+        with _category_ids_lock:
+            _category_ids.update(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_new_categories(session):
+    session.info.pop("new_category_ids", None)
+
+
+class CategorizedMixin:
+    """
+    `category_id` column plus a `category` attribute that reads and writes the name.
+
+    Assigning `row.category = "Alimentação"` keeps the name on the instance
+    and leaves `category_id` empty until the next flush, which resolves it
+    (adding the category if needed). Loaded rows get the name from the
+    categories table in the same query (joined eager load).
+    """
+
+    @declared_attr
+    def category_id(cls):
+        return Column(
+            CategoryId, ForeignKey("categories.id", name=f"fk_{cls.__tablename__}_category_id"), nullable=False
+        )
+
+    @declared_attr
+    def category_ref(cls):
+        return relationship(Category, lazy="joined", innerjoin=True)
+
+    @hybrid_property
+    def category(self):
+        name = self.__dict__.get("_category_name")
+        if name is None and self.category_ref is not None:
+            return self.category_ref.name
+        return name
+
+    @category.inplace.setter
+    def _category_setter(self, name):
+        if name == self.category:
+            return
+        self._category_name = name
+        # Marks the row as changed; `_resolve_category_names` sets the real id at flush.
+        self.category_id = None
+
+    @category.inplace.expression
+    @classmethod
+    def _category_expression(cls):
+        return select(Category.name).where(Category.id == cls.category_id).scalar_subquery()
+
+
+@event.listens_for(Session, "before_flush")
+def _resolve_category_names(session, flush_context, instances):
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, CategorizedMixin) and obj.category_id is None:
+            name = obj.__dict__.get("_category_name")
+            if name is not None:
+                obj.category_id = resolve_category_id(session, name)
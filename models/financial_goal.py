@@ -1,5 +1,5 @@
 # models/financial_goal.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Index
 from datetime import datetime, timezone
 from .base import Base
 
@@ -10,10 +10,14 @@ def current_utc_time():
 
 class FinancialGoal(Base):
     __tablename__ = "financial_goals"
+    __table_args__ = (
+        # Matches the ordering of `GoalService.get_user_goals`.
+        Index("ix_financial_goals_user_priority_deadline", "telegram_id", "priority", "deadline"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     
-    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False, index=True)
+    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
     
     name = Column(String(200), nullable=False)
     target_amount = Column(Float, nullable=False)
@@ -0,0 +1,44 @@
+# models/money.py
+"""
+Amounts are stored as integer cents (BIGINT); the services keep working in reais.
+
+Integer sums are exact, where summing FLOAT columns drifts by fractions of a
+cent, and an 8-byte integer is the narrowest type that covers any amount.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy.ext.hybrid import hybrid_property
+
+
+def to_cents(value):
+    """Reais (float, Decimal or str) to integer cents, rounding half up; None stays None."""
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Integer cents (or a SUM of them) to reais."""
+    if cents is None:
+        return None
+    return int(cents) / 100
+
+
+def reais(cents_attribute: str):
+    """
+    Attribute in reais backed by an integer cents column, e.g. `amount = reais("amount_cents")`.
+
+    Reading converts to float, assigning converts back to cents, and in SQL
+    it is `cents / 100.0`. Filter, sort and sum on the cents column itself,
+    so indexes apply and totals stay exact.
+    """
+    def fget(self):
+        return from_cents(getattr(self, cents_attribute))
+
+    def fset(self, value):
+        setattr(self, cents_attribute, to_cents(value))
+
+    def expr(cls):
+        return getattr(cls, cents_attribute) / 100.0
+
+    return hybrid_property(fget, fset, expr=expr)
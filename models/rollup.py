@@ -0,0 +1,49 @@
+# models/rollup.py
+from sqlalchemy import BigInteger, Column, Integer, String, Date, ForeignKey, UniqueConstraint
+from .base import Base
+from .category import CategoryId
+
+
+class DailyRollup(Base):
+    """Total (in cents) and count of a user's transactions per day, type and category (kept by services/rollup_service.py)."""
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("telegram_id", "date", "type", "category_id", name="uq_daily_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
+    date = Column(Date, nullable=False)
+    type = Column(String(20), nullable=False)
+    category_id = Column(CategoryId, ForeignKey("categories.id", name="fk_daily_rollups_category_id"), nullable=False)
+    total_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<DailyRollup(telegram_id={self.telegram_id}, date={self.date}, type={self.type}, "
+            f"category_id={self.category_id}, total_cents={self.total_cents}, count={self.count})>"
+        )
+
+
+class MonthlyRollup(Base):
+    """Same as `DailyRollup`, one row per month; `year`/`month` follow the `Budget` convention."""
+    __tablename__ = "monthly_rollups"
+    __table_args__ = (
+        UniqueConstraint("telegram_id", "year", "month", "type", "category_id", name="uq_monthly_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    type = Column(String(20), nullable=False)
+    category_id = Column(CategoryId, ForeignKey("categories.id", name="fk_monthly_rollups_category_id"), nullable=False)
+    total_cents = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<MonthlyRollup(telegram_id={self.telegram_id}, {self.month:02d}/{self.year}, type={self.type}, "
+            f"category_id={self.category_id}, total_cents={self.total_cents}, count={self.count})>"
+        )
@@ -1,19 +1,29 @@
 # models/transaction.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Enum, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Date, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .base import Base
+from .category import CategorizedMixin
+from .money import reais
 
 def current_utc_time():
     return datetime.now(timezone.utc)
 def current_utc_date():
     return datetime.now(timezone.utc).date()
 
-class Transaction(Base):
+class Transaction(CategorizedMixin, Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Listing, paging and rollup rebuilds filter by user and date range.
+        Index("ix_transactions_user_date", "telegram_id", "date"),
+        # Same, restricted to one type (type filter of the Transações page, expense scans).
+        Index("ix_transactions_user_type_date", "telegram_id", "type", "date"),
+        # Latest edits first, for the per-user category memory.
+        Index("ix_transactions_user_updated", "telegram_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False, index=True)
+    telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
     user = relationship("User", back_populates="transactions")
 
     # Allowed transaction types.
@@ -21,8 +31,10 @@ class Transaction(Base):
         Enum("renda", "despesa_fixa", "despesa_variavel", "economia", name="transaction_type"),
         nullable=False
     )
-    amount = Column(Float, nullable=False)
-    category = Column(String(100), nullable=False)
+    # Stored in cents; `amount` reads and writes reais. `category` is the name
+    # behind `category_id` (see models/category.py).
+    amount_cents = Column(BigInteger, nullable=False)
+    amount = reais("amount_cents")
     description = Column(String(200))
     date = Column(Date, nullable=False, default=current_utc_date)
     created_at = Column(DateTime, default=current_utc_time)
@@ -0,0 +1,22 @@
+# models/user_shard.py
+from sqlalchemy import Column, BigInteger, Boolean, DateTime, String, false
+from .base import Base
+from .user import current_utc_time
+
+
+class UserShard(Base):
+    """
+    Shard directory entry: which database holds a user's rows (see services/shard_router.py).
+
+    Only the directory database (DATABASE_URL) uses this table. `moving` is
+    set while `scripts.shards move` copies the user, and blocks their writes.
+    """
+    __tablename__ = "user_shards"
+
+    telegram_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    shard = Column(String(50), nullable=False)
+    moving = Column(Boolean, nullable=False, default=False, server_default=false())
+    updated_at = Column(DateTime, default=current_utc_time, onupdate=current_utc_time)
+
+    def __repr__(self):
+        return f"<UserShard(telegram_id={self.telegram_id}, shard={self.shard}, moving={self.moving})>"
@@ -0,0 +1,5 @@
+"""
+Maintenance commands for the Chat Crown project.
+
+Each module can be run directly, e.g. `python -m scripts.train_classifier`.
+"""
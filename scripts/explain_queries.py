@@ -0,0 +1,113 @@
+"""
+Print the query plan of every read query the services run.
+
+    python -m scripts.explain_queries [--url URL ...] [--user TELEGRAM_ID] [--no-seqscan]
+
+The service methods are called for real and the SQL they send is captured,
+then explained with EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL).
+Pass --url once per database to compare, e.g. a SQLite file and a Postgres
+URL. Postgres prefers sequential scans on tiny tables; --no-seqscan disables
+them so the plan shows which index it would use. Queries that depend on data
+(e.g. budget spending only runs when the user has budgets) are skipped when
+the user has none.
+"""
+import argparse
+import logging
+from datetime import date
+
+from sqlalchemy import event
+
+from config.config import config
+from services.budget_service import budget_service
+from services.category_memory import CategoryMemory
+from services.database import db_manager
+from services.finance_calculator import finance_calculator
+from services.goal_service import goal_service
+from services.rollup_service import rollup_service
+from services.transactions_service import transactions_service
+
+
+def service_calls(telegram_id: int):
+    today = date.today()
+    return [
+        ("transactions: current month page",
+         lambda: transactions_service.get_transactions(telegram_id, {"date_range": "current_month"})),
+        ("transactions: type + period filter",
+         lambda: transactions_service.get_transactions(telegram_id, {"type": "renda", "date_range": "90_days"})),
+        ("transactions: keyset next page",
+         lambda: transactions_service.get_transactions(telegram_id, {}, page=1, after=(today, 2 ** 31 - 1))),
+        ("transactions: search", lambda: transactions_service.get_transactions(telegram_id, {"search_term": "almoco"})),
+        ("transactions: search by relevance",
+         lambda: transactions_service.get_transactions(telegram_id, {"search_term": "almoco", "sort_by": "relevance"})),
+        ("transactions: recent", lambda: transactions_service.get_recent_transactions(telegram_id)),
+        ("category memory: history", lambda: CategoryMemory()._load_history(telegram_id)),
+        ("finance: monthly aggregates", lambda: finance_calculator.get_daily_budget_status(telegram_id)),
+        ("budgets: status", lambda: budget_service.get_budgets_with_status(telegram_id)),
+        ("goals: list", lambda: goal_service.get_user_goals(telegram_id)),
+        ("reports: monthly totals", lambda: rollup_service.get_monthly_totals(telegram_id, today.month, today.year)),
+    ]
+
+
+def capture(engines, call):
+    """Run `call` and return the (statement, parameters) of the SELECTs it sent on any of `engines`."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def explain(engine, statement, parameters, no_seqscan: bool):
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            return [row[-1] for row in rows]
+        if dialect == "postgresql" and no_seqscan:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+        return [row[0] for row in rows]
+
+
+def run(url: str, telegram_id: int, no_seqscan: bool):
+    # Point the shared manager (and so every service) at this database.
+    db_manager.configure(url)
+    engine = db_manager.engine
+    print(f"\n🗄️  {engine.url.render_as_string(hide_password=True)} ({engine.dialect.name})")
+
+    for label, call in service_calls(telegram_id):
+        # Dashboard reads may go through the read-only engine (see DatabaseManager.get_read_session).
+        statements = capture({engine, db_manager.read_engine}, call)
+        print(f"\n▶ {label}")
+        if not statements:
+            print("   (no query ran — no data for this user)")
+        for statement, parameters in statements:
+            print("   " + " ".join(statement.split())[:160])
+            for line in explain(engine, statement, parameters, no_seqscan):
+                print(f"      {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", help="database URL (repeatable); default: DATABASE_URL")
+    parser.add_argument("--user", type=int, default=1, help="telegram_id used in the queries")
+    parser.add_argument("--no-seqscan", action="store_true", help="PostgreSQL: disable sequential scans")
+    args = parser.parse_args()
+    # Service errors are logged, not raised; keep them visible.
+    logging.basicConfig(level=logging.ERROR)
+
+    for url in args.url or [config.DATABASE_URL]:
+        run(url, args.user, args.no_seqscan)
+
+
+if __name__ == "__main__":
+    main()
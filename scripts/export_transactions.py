@@ -0,0 +1,50 @@
+"""
+Export a user's full transaction history to CSV or Parquet.
+
+    python -m scripts.export_transactions TELEGRAM_ID FILE [--format parquet] [--chunk-size 5000]
+
+The format comes from the file extension (.parquet, otherwise CSV) unless
+--format is given; use "-" as FILE to write CSV to stdout. Parquet needs
+the optional pyarrow package.
+"""
+import argparse
+import logging
+import sys
+
+from services.transaction_export import EXPORT_FORMATS, export_format, transaction_exporter
+from services.users_service import UsersService
+
+
+def print_progress(stats: dict):
+    print(f"   {stats['rows']} rows ({stats['rows_per_second']:.0f} rows/s)", end="\r", flush=True, file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("telegram_id", type=int)
+    parser.add_argument("file", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, help="rows per fetch (default: EXPORT_CHUNK_SIZE)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if not UsersService.get_user_by_telegram_id(args.telegram_id):
+        sys.exit(f"❌ User {args.telegram_id} not found")
+
+    if args.file == "-":
+        stats = transaction_exporter.export_file(
+            args.telegram_id, sys.stdout.buffer, args.format or "csv", args.chunk_size, print_progress
+        )
+    else:
+        stats = transaction_exporter.export_path(
+            args.telegram_id, args.file, args.format or export_format(args.file), args.chunk_size, print_progress
+        )
+    print(file=sys.stderr)
+    if stats["error"]:
+        sys.exit(f"❌ Export stopped after {stats['rows']} rows: {stats['error']}")
+    print(f"✅ {stats['rows']} transactions exported in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Import a bank statement (CSV or OFX) into a user's transactions.
+
+    python -m scripts.import_statement TELEGRAM_ID FILE [--encoding cp1252] [--chunk-size 500]
+
+Rows the user already has (same date, amount and description) are skipped,
+so the same statement can be imported again safely. The user must have
+talked to the bot at least once.
+"""
+import argparse
+import logging
+import sys
+
+from services.statement_import import statement_importer
+from services.users_service import UsersService
+
+
+def print_progress(stats: dict):
+    print(f"   {stats['read']} rows read, {stats['imported']} new, {stats['duplicates']} duplicates "
+          f"({stats['rows_per_second']:.0f} rows/s)", end="\r", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("telegram_id", type=int)
+    parser.add_argument("file", help="statement file (.csv or .ofx)")
+    parser.add_argument("--encoding", help="file encoding (default: UTF-8, or cp1252 when the file is not UTF-8)")
+    parser.add_argument("--chunk-size", type=int, help="rows per transaction (default: IMPORT_CHUNK_SIZE)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if not UsersService.get_user_by_telegram_id(args.telegram_id):
+        sys.exit(f"❌ User {args.telegram_id} not found")
+
+    stats = statement_importer.import_path(
+        args.telegram_id, args.file, encoding=args.encoding, chunk_size=args.chunk_size, progress=print_progress
+    )
+    print()
+    if stats["error"]:
+        sys.exit(f"❌ Import stopped after {stats['read']} rows: {stats['error']}")
+    print(f"✅ {stats['imported']} transactions imported, {stats['duplicates']} duplicates and "
+          f"{stats['invalid']} invalid lines skipped: {stats['read']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Create or upgrade the database schema.
+
+    python -m scripts.migrate [--url URL] [--revision head]
+
+Runs the Alembic migrations in migrations/ against DATABASE_URL and every
+shard in DATABASE_SHARDS (or only --url when given). Databases
+created before migrations existed (tables made by `create_all`, no
+`alembic_version`) are stamped with the revision their tables match first,
+so nothing is created twice. Afterwards the rollup tables are filled once
+if the database has transactions but no rollups yet.
+"""
+import argparse
+import logging
+import os
+import time
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import (
+    Column, Date, Float, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint, inspect,
+)
+
+from services.database import db_manager
+from services.shard_router import shard_router
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def baseline_rollup_tables(connection):
+    """daily_rollups and monthly_rollups as revision 0001 creates them (category name, FLOAT total)."""
+    metadata = MetaData()
+    # Reflected so the foreign keys below resolve.
+    Table("users", metadata, autoload_with=connection)
+    daily = Table(
+        "daily_rollups", metadata,
+        Column("id", Integer(), primary_key=True, autoincrement=True),
+        Column("telegram_id", Integer(), ForeignKey("users.telegram_id"), nullable=False),
+        Column("date", Date(), nullable=False),
+        Column("type", String(20), nullable=False),
+        Column("category", String(100), nullable=False),
+        Column("total", Float(), nullable=False),
+        Column("count", Integer(), nullable=False),
+        UniqueConstraint("telegram_id", "date", "type", "category", name="uq_daily_rollups_key"),
+    )
+    monthly = Table(
+        "monthly_rollups", metadata,
+        Column("id", Integer(), primary_key=True, autoincrement=True),
+        Column("telegram_id", Integer(), ForeignKey("users.telegram_id"), nullable=False),
+        Column("year", Integer(), nullable=False),
+        Column("month", Integer(), nullable=False),
+        Column("type", String(20), nullable=False),
+        Column("category", String(100), nullable=False),
+        Column("total", Float(), nullable=False),
+        Column("count", Integer(), nullable=False),
+        UniqueConstraint("telegram_id", "year", "month", "type", "category", name="uq_monthly_rollups_key"),
+    )
+    return daily, monthly
+
+
+def legacy_revision(connection):
+    """Revision matching a database built by `create_all`, or None for an empty database."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    if "transactions" not in tables:
+        return None
+
+    # Tables added to the baseline after the first releases; create_all-era
+    # databases may predate them. Created as revision 0001 defines them (not
+    # from the current models), so the later migrations find what they expect.
+    for table in baseline_rollup_tables(connection):
+        if table.name not in tables:
+            table.create(connection)
+
+    indexes = {index["name"] for index in inspector.get_indexes("transactions")}
+    return "0002" if "ix_transactions_user_date" in indexes else "0001"
+
+
+def backfill_rollups(manager=db_manager):
+    """Fill the rollup tables once for databases that had transactions before they existed."""
+    from models.rollup import DailyRollup
+    from models.transaction import Transaction
+    from services.rollup_service import rollup_service
+
+    with manager.get_session() as session:
+        has_transactions = session.query(Transaction.id).first() is not None
+        has_rollups = session.query(DailyRollup.id).first() is not None
+        if has_transactions and not has_rollups:
+            rows = rollup_service.rebuild_in(session)
+            print(f"✅ Rollups filled from transactions ({rows} daily rows)")
+
+
+def migrate(revision: str = "head", manager=db_manager):
+    alembic_config = Config(ALEMBIC_INI)
+    with manager.engine.begin() as connection:
+        alembic_config.attributes["connection"] = connection
+        current = MigrationContext.configure(connection).get_current_revision()
+        if current is None:
+            stamp = legacy_revision(connection)
+            if stamp:
+                print(f"🏷️  Existing tables without a schema version, stamping revision {stamp}")
+                command.stamp(alembic_config, stamp)
+        command.upgrade(alembic_config, revision)
+        current = MigrationContext.configure(connection).get_current_revision()
+    print(f"✅ Database schema at revision {current}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--revision", default="head")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    started = time.perf_counter()
+    if args.url:
+        db_manager.configure(args.url)
+        managers = {"default": db_manager}
+    else:
+        managers = shard_router.managers
+    for name, manager in managers.items():
+        if len(managers) > 1:
+            print(f"🗄️  Shard {name}")
+        migrate(args.revision, manager)
+        backfill_rollups(manager)
+    print(f"⏱️  {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Rebuild the daily/monthly rollup tables from the transactions table.
+
+    python -m scripts.rebuild_rollups [--user TELEGRAM_ID]
+
+The rollups are kept up to date on every create/update/delete; run this once
+after upgrading an existing database, or whenever the totals look wrong.
+"""
+import argparse
+import logging
+import time
+
+from services.rollup_service import rollup_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", type=int, help="only rebuild this telegram_id")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    started = time.perf_counter()
+    rows = rollup_service.rebuild(args.user)
+    scope = f"user {args.user}" if args.user is not None else "all users"
+    print(f"✅ Rollups rebuilt for {scope}: {rows} daily rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Inspect the user shards and move users between them.
+
+    python -m scripts.shards status
+    python -m scripts.shards move TELEGRAM_ID TARGET_SHARD
+
+`status` counts users, transactions and their total on every shard, queried
+in parallel. `move` relocates one user online, while the bot keeps running:
+
+1. the directory marks the user as moving: their reads still go to the old
+   shard, their writes fail until the move ends (waits one directory cache
+   period so every process sees it)
+2. the user's users/transactions/budgets/goals/rollups rows are copied to
+   the target in one transaction, and the copy is checked against the
+   source (row counts and the transaction total)
+3. the directory points at the target shard
+4. after another cache period, the rows are deleted from the old shard
+
+If the copy fails or does not match, the directory goes back to the old
+shard and nothing is deleted. Shards are configured with DATABASE_SHARDS;
+every shard must be migrated (`python -m scripts.migrate` does all of them).
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import delete, func, insert, select
+
+from config.config import config
+from models.budget import Budget
+from models.category import Category, resolve_category_id
+from models.financial_goal import FinancialGoal
+from models.money import from_cents
+from models.rollup import DailyRollup, MonthlyRollup
+from models.transaction import Transaction
+from models.user import User
+from services.shard_router import shard_router
+
+logger = logging.getLogger(__name__)
+
+# Parents before children, so foreign keys hold while copying (reversed for deletes).
+USER_TABLES = [User, Transaction, Budget, FinancialGoal, DailyRollup, MonthlyRollup]
+
+
+def shard_stats(session) -> dict:
+    users = session.query(func.count(User.id)).scalar()
+    transactions, total = session.query(func.count(Transaction.id), func.coalesce(func.sum(Transaction.amount_cents), 0)).one()
+    return {"users": users, "transactions": transactions, "total": from_cents(total)}
+
+
+def user_fingerprint(session, telegram_id: int) -> dict:
+    """Row counts per table and the transaction total, to compare a copy with its source."""
+    counts = {
+        model.__tablename__: session.query(func.count()).select_from(model).filter(model.telegram_id == telegram_id).scalar()
+        for model in USER_TABLES
+    }
+    total = session.query(func.coalesce(func.sum(Transaction.amount_cents), 0)).filter(Transaction.telegram_id == telegram_id).scalar()
+    counts["amount_cents"] = total
+    return counts
+
+
+def delete_user_rows(session, telegram_id: int):
+    for model in reversed(USER_TABLES):
+        session.execute(delete(model).where(model.telegram_id == telegram_id))
+
+
+def copy_user(source, target, telegram_id: int, batch_size: int = 1000) -> int:
+    """
+    Copy the user's rows from source to target and return the row count.
+
+    Row ids are reassigned by the target, and category ids are translated by
+    name, since every shard numbers its own categories.
+    """
+    # Leftovers of an earlier, interrupted move would be duplicated otherwise.
+    delete_user_rows(target, telegram_id)
+    source_names = dict(source.execute(select(Category.id, Category.name)).all())
+    target_ids = {}
+    copied = 0
+    for model in USER_TABLES:
+        table = model.__table__
+        columns = [column for column in table.columns if column.name != "id"]
+        rows = source.execute(
+            select(*columns).where(table.c.telegram_id == telegram_id).order_by(table.c.id)
+        ).mappings()
+        while batch := rows.fetchmany(batch_size):
+            batch = [dict(row) for row in batch]
+            for row in batch:
+                if "category_id" in row:
+                    source_id = row["category_id"]
+                    if source_id not in target_ids:
+                        target_ids[source_id] = resolve_category_id(target, source_names[source_id])
+                    row["category_id"] = target_ids[source_id]
+            target.execute(insert(table), batch)
+            copied += len(batch)
+    return copied
+
+
+def move(telegram_id: int, target_name: str):
+    if target_name not in shard_router.managers:
+        raise SystemExit(f"Unknown shard '{target_name}', configured: {', '.join(shard_router.names)}")
+    source_name = shard_router.shard_for(telegram_id)
+    if source_name == target_name:
+        print(f"ℹ️  User {telegram_id} is already on shard {target_name}")
+        return
+
+    source_manager, target_manager = shard_router.managers[source_name], shard_router.managers[target_name]
+    wait = config.SHARD_DIRECTORY_CACHE_SECONDS
+
+    print(f"🚚 Moving user {telegram_id}: {source_name} -> {target_name}")
+    shard_router.set_placement(telegram_id, source_name, moving=True)
+    try:
+        # Writes already started before the flag was seen finish within the cache period.
+        time.sleep(wait)
+        with source_manager.get_session() as source, target_manager.get_session() as target:
+            expected = user_fingerprint(source, telegram_id)
+            rows = copy_user(source, target, telegram_id)
+            copied = user_fingerprint(target, telegram_id)
+            if copied != expected:
+                raise RuntimeError(f"Copy does not match the source: {copied} != {expected}")
+            target.commit()
+    except BaseException:
+        shard_router.set_placement(telegram_id, source_name, moving=False)
+        print(f"❌ Move aborted, user {telegram_id} stays on shard {source_name}")
+        raise
+
+    shard_router.set_placement(telegram_id, target_name, moving=False)
+    print(f"   ✅ {rows} rows copied and verified: {expected}")
+
+    # Readers that still had the old placement cached finish before the source rows go.
+    time.sleep(wait)
+    with source_manager.get_session() as source:
+        delete_user_rows(source, telegram_id)
+        source.commit()
+    print(f"   🧹 Rows removed from shard {source_name}")
+
+
+def status():
+    started = time.perf_counter()
+    stats = shard_router.fan_out(shard_stats)
+    print(f"🗄️  {len(stats)} shard(s), queried in {(time.perf_counter() - started) * 1000:.0f} ms")
+    for name, shard in stats.items():
+        print(f"   {name:15} {shard['users']:8} users  {shard['transactions']:10} transactions  "
+              f"R$ {shard['total']:,.2f}")
+    totals = {key: sum(shard[key] for shard in stats.values()) for key in ("users", "transactions", "total")}
+    print(f"   {'all':15} {totals['users']:8} users  {totals['transactions']:10} transactions  "
+          f"R$ {totals['total']:,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="users and transactions per shard")
+    move_parser = commands.add_parser("move", help="move one user to another shard")
+    move_parser.add_argument("telegram_id", type=int)
+    move_parser.add_argument("target")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == "status":
+        status()
+    else:
+        move(args.telegram_id, args.target)
+
+
+if __name__ == "__main__":
+    main()
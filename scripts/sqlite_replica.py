@@ -0,0 +1,73 @@
+"""
+Keep a SQLite copy of the database as a lagging read replica, for local testing.
+
+    python -m scripts.sqlite_replica [--primary URL] --replica sqlite:///replica.db [--interval 2] [--once]
+
+SQLite has no replication, so this copies the primary into the replica file
+with SQLite's online backup API every --interval seconds: reads from the
+replica are up to that many seconds behind, like a real replica under load.
+Run the bot and the dashboard with
+
+    DATABASE_URL=sqlite:///chat_crown.db DATABASE_READ_URL=sqlite:///replica.db
+
+to see reads served by the replica and, within READ_YOUR_WRITES_SECONDS of a
+user's own write, by the primary. With two PostgreSQL instances, use
+streaming replication instead and point DATABASE_READ_URL at the standby.
+"""
+import argparse
+import sqlite3
+import time
+
+from sqlalchemy.engine import make_url
+
+from config.config import config
+
+
+def sqlite_path(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database:
+        raise SystemExit(f"Not a SQLite file URL: {url}")
+    return parsed.database
+
+
+def copy(primary: str, replica: str) -> float:
+    """Copy primary into replica in one consistent snapshot; return the seconds it took."""
+    started = time.perf_counter()
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--primary", help="primary URL (default: DATABASE_URL)")
+    parser.add_argument("--replica", help="replica URL (default: DATABASE_READ_URL)")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between copies (the replica lag)")
+    parser.add_argument("--once", action="store_true", help="copy once and exit")
+    args = parser.parse_args()
+
+    primary = sqlite_path(args.primary or config.DATABASE_URL)
+    replica_url = args.replica or config.DATABASE_READ_URL
+    if not replica_url:
+        raise SystemExit("Pass --replica or set DATABASE_READ_URL")
+    replica = sqlite_path(replica_url)
+
+    print(f"🔁 {primary} -> {replica} every {args.interval:g}s")
+    while True:
+        elapsed = copy(primary, replica)
+        print(f"   {time.strftime('%H:%M:%S')} copied in {elapsed * 1000:.1f} ms")
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
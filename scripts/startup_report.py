@@ -0,0 +1,116 @@
+"""
+Cold-start timing of the bot, the API and each Streamlit script.
+
+    python -m scripts.startup_report [--runs 5] [--url URL]
+
+Each entry point's imports are timed in a fresh interpreter (median of
+--runs). The database work done at startup is timed separately: the schema
+version check the bot runs now, against `Base.metadata.create_all`, which
+every process used to run when importing `services` (and the bot ran a
+second time in `setup_database`).
+"""
+import argparse
+import ast
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOT_MODULES = [
+    "services.database",
+    "bot.handlers.start_handler",
+    "bot.handlers.message_handler",
+    "bot.handlers.summary_handler",
+    "bot.handlers.list_handler",
+    "bot.handlers.edit_handler",
+    "bot.handlers.delete_handler",
+]
+
+TIMER = (
+    "import importlib, sys, time\n"
+    "t = time.perf_counter()\n"
+    "for m in sys.argv[1:]: importlib.import_module(m)\n"
+    "print(time.perf_counter() - t)\n"
+)
+
+
+def streamlit_targets():
+    """The project modules each Streamlit script imports (Streamlit itself is the same before and after)."""
+    targets = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, "streamlit_app", "**", "*.py"), recursive=True)):
+        modules = []
+        for node in ast.walk(ast.parse(open(path, encoding="utf-8").read())):
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] in ("services", "models"):
+                modules.append(node.module)
+        if modules:
+            targets[f"streamlit: {os.path.relpath(path, ROOT)}"] = modules
+    return targets
+
+
+def time_imports(modules, runs: int, env):
+    """Median import time in seconds, or the error line if the imports fail (e.g. a missing dependency)."""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", TIMER, *modules], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return result.stderr.strip().splitlines()[-1]
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def time_db_step(url: str, step, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        engine = create_engine(url, future=True)
+        started = time.perf_counter()
+        step(engine)
+        samples.append(time.perf_counter() - started)
+        engine.dispose()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--url", help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    from config.config import config
+    from models.base import Base
+    from services.database import DatabaseManager
+
+    url = args.url or config.DATABASE_URL
+    env = dict(os.environ, DATABASE_URL=url)
+
+    targets = {"bot": BOT_MODULES, "api": ["api.main"], **streamlit_targets()}
+    print(f"📏 Cold import time, median of {args.runs} fresh interpreters")
+    for name, modules in targets.items():
+        elapsed = time_imports(modules, args.runs, env)
+        if isinstance(elapsed, str):
+            print(f"   {name:55} skipped: {elapsed}")
+        else:
+            print(f"   {name:55} {elapsed * 1000:8.1f} ms")
+
+    def schema_check(engine):
+        manager = DatabaseManager(url)
+        manager._engine = engine
+        manager.get_schema_revision()
+
+    check = time_db_step(url, schema_check, args.runs)
+    create_all = time_db_step(url, lambda engine: Base.metadata.create_all(engine), args.runs)
+    print(f"\n🗄️  Startup database work on {url}")
+    print(f"   schema version check (now):               {check * 1000:8.1f} ms, once in the bot")
+    print(f"   create_all (before, per process import):  {create_all * 1000:8.1f} ms")
+    print(f"   bot startup saves ~{(2 * create_all - check) * 1000:.1f} ms (create_all ran twice), "
+          f"every API/Streamlit process ~{create_all * 1000:.1f} ms plus the engine setup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class AIMicroBatcher:
+    """
+    Collects concurrent external categorization requests and sends them in one prompt.
+
+    A batch is flushed when `window_ms` has passed since its first request or
+    when it reaches `max_batch_size`, whichever comes first. Requests with the
+    same key (the normalized message template) are coalesced: they share a
+    single slot in the prompt, and callers arriving while that slot is still
+    queued or in flight wait for the same result.
+
+    `processor` must provide `_detect_batch_with_ai_async(messages)`, returning
+    a list aligned with `messages` (items may be None), or None on failure.
+    """
+
+    def __init__(self, processor, window_ms: float = 50, max_batch_size: int = 16):
+        self.processor = processor
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        # key -> (message, future, enqueued_at) for requests not sent yet.
+        self._queued = {}
+        # key -> future for every request not resolved yet (queued or in flight).
+        self._futures = {}
+        self._timer = None
+        # Batches in flight; the loop only keeps weak references to tasks.
+        self._tasks = set()
+        self.coalesced = 0
+        self.batch_size = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 5, 10, 25, 50, 100, 250, 500, 1000])
+
+    async def submit(self, message: str, key: str):
+        """Queue a message and wait for its result (a copy per caller, or None on failure)."""
+        future = self._futures.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._queued[key] = (message, future, time.perf_counter())
+            if len(self._queued) >= self.max_batch_size:
+                self._flush_now()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush_now)
+
+        # Shielded, so a cancelled caller does not cancel the result other callers share.
+        result = await asyncio.shield(future)
+        return dict(result) if result else None
+
+    async def close(self):
+        """Send the queued requests and wait for the batches in flight (on bot shutdown)."""
+        self._flush_now()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": len(self._queued),
+            "coalesced": self.coalesced,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._queued:
+            return
+        batch, self._queued = self._queued, {}
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # A task cancelled before it starts never runs `_send`, so release its batch here too.
+        task.add_done_callback(lambda _: self._resolve(batch, None))
+
+    async def _send(self, batch: dict):
+        now = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, enqueued_at in batch.values():
+            self.queue_wait_ms.observe((now - enqueued_at) * 1000)
+
+        keys = list(batch)
+        results = None
+        try:
+            results = await self.processor._detect_batch_with_ai_async([batch[k][0] for k in keys])
+        except Exception as e:
+            logger.error(f"❌ Micro-batch failed: {e}")
+        finally:
+            self._resolve(batch, results)
+
+    def _resolve(self, batch: dict, results):
+        """
+        Answer every request of `batch` not answered yet (None when `results`
+        is None) and release its keys. Also runs when the batch is cancelled:
+        a key left in `_futures` would make later requests with the same
+        template wait on a result that never comes.
+        """
+        results = results or [None] * len(batch)
+        for key, result in zip(batch, results):
+            future = batch[key][1]
+            if self._futures.get(key) is future:
+                del self._futures[key]
+            if not future.done():
+                future.set_result(result)
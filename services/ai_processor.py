@@ -1,8 +1,25 @@
-import re
+import asyncio
 import json
-from groq import Groq
+import logging
+import os
+import time
+from groq import Groq, AsyncGroq
 from config.config import config
 from datetime import datetime
+from services.ai_batcher import AIMicroBatcher
+from services.ai_prompt import build_system_prompt, extract_json, validate_result
+from services.category_memory import CategoryMemory
+from services.circuit_breaker import CircuitBreaker
+from services.llm_cache import LLMCache, message_template
+from services.local_classifier import LocalClassifier
+from services.keyword_matcher import KeywordMatcher
+from services.message_lexer import ParsedMessage, parse_message
+
+
+logger = logging.getLogger(__name__)
+
+# Confidence of a regex result when no keyword matched (category fell back to "Diversos").
+NO_KEYWORD_CONFIDENCE = 0.6
 
 
 class AIProcessor:
@@ -10,7 +27,44 @@ class AIProcessor:
 
     def __init__(self):
         # If an external key is configured, we can optionally enhance detection.
-        self.client = Groq(api_key=config.GROQ_API_KEY) if config.GROQ_API_KEY else None
+        self.client = Groq(api_key=config.GROQ_API_KEY, base_url=config.GROQ_BASE_URL) if config.GROQ_API_KEY else None
+        # Async client for the bot; retries are disabled because the breaker decides when to try again.
+        self.async_client = (
+            AsyncGroq(api_key=config.GROQ_API_KEY, base_url=config.GROQ_BASE_URL, max_retries=0)
+            if config.GROQ_API_KEY else None
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.GROQ_BREAKER_FAILURES,
+            reset_timeout=config.GROQ_BREAKER_RESET_SECONDS,
+            slow_call_threshold=config.GROQ_BREAKER_SLOW_SECONDS,
+        )
+        self._semaphore = None
+        # Groups concurrent async requests into one prompt (see services/ai_batcher.py).
+        self.batcher = AIMicroBatcher(
+            self,
+            window_ms=config.AI_MICROBATCH_WINDOW_MS,
+            max_batch_size=config.AI_MICROBATCH_MAX_SIZE,
+        ) if config.AI_MICROBATCH_ENABLED else None
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0, "breaker_skips": 0, "batched_messages": 0}
+        # Results are cached by message template, so repeated phrasings skip the external call.
+        self.ai_cache = LLMCache(
+            path=config.LLM_CACHE_PATH,
+            max_entries=config.LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+            disk_max_entries=config.LLM_CACHE_DISK_MAX_ENTRIES,
+        ) if config.LLM_CACHE_ENABLED else None
+        # What each user categorized before; checked before keywords and the external call.
+        self.category_memory = CategoryMemory(
+            max_entries_per_user=config.CATEGORY_MEMORY_MAX_PER_USER,
+            max_users=config.CATEGORY_MEMORY_MAX_USERS,
+            score_cutoff=config.CATEGORY_MEMORY_SCORE_CUTOFF,
+            refresh_seconds=config.CATEGORY_MEMORY_REFRESH_SECONDS,
+        )
+        # Offline classifier trained by scripts/train_classifier.py; memory-mapped and hot-reloaded.
+        self._local_model = None
+        self._local_model_mtime = None
+        self._local_model_checked_at = 0.0
+        self._reload_local_model()
         self.setup_categories()
     
     def setup_categories(self):
@@ -43,135 +97,406 @@ class AIProcessor:
                 'Previdência': ['previdência', 'privada', 'aposentadoria']
             }
         }
+        # Compile all keyword groups once, so each message is scanned a single time.
+        self.keyword_matcher = KeywordMatcher(self.categories)
+        # Fixed system prompts: built once, identical on every external call.
+        self.system_prompt = build_system_prompt(self.categories)
+        self.batch_system_prompt = build_system_prompt(self.categories, batch=True)
     
-    def detect_expense(self, message: str) -> dict:
+    def detect_expense(self, message: str, telegram_id: int = None) -> dict:
         """
         Try to extract a structured expense from a free text message.
 
-        The primary strategy is based on regular expressions and keyword groups.
-        If that cannot find an amount and an external client is available,
-        we optionally try to refine the detection, but always fall back to regex.
+        When `telegram_id` is given, the user's own past categorizations are
+        checked first. The primary strategy is based on the message lexer and
+        keyword groups, refined by the offline local model when no keyword
+        matched. If that cannot find an amount and an external client is
+        available, we optionally try to refine the detection, but always fall
+        back to regex.
         """
-        regex_result = self._detect_with_regex(message)
+        # Lex the message once; every stage reuses the tokens.
+        parsed = parse_message(message)
+        regex_result = self._detect_locally(message, parsed, telegram_id)
 
         if regex_result["amount"] is None and self.client:
             try:
-                ai_result = self._detect_with_ai(message)
+                ai_result = self._ai_cache_get(parsed)
+                if ai_result is None:
+                    ai_result = self._detect_with_ai(message)
+                    self._ai_cache_set(parsed, ai_result)
                 if ai_result["confidence"] > 0.7:
+                    # The external client does not read dates, so keep the one found in the text.
+                    ai_result["date"] = parsed.date
                     return ai_result
             except Exception as e:
-                print(f"❌ Error while calling external client: {e}. Falling back to regex...")
+                logger.error(f"❌ Error while calling external client: {e}. Falling back to regex...")
 
         return regex_result
     
-    def _detect_with_regex(self, message: str) -> dict:
-        """Extract amount, category and type using only regular expressions and keywords."""
-
-        amount_patterns = [
-            r'R\$\s*(\d+[.,]\d{2})',
-            r'R\$\s*(\d+)',
-            r'(\d+[.,]\d{2})',
-            r'(\d+)'
-        ]
-        
-        amount = None
-        for pattern in amount_patterns:
-            match = re.search(pattern, message)
-            if match:
-                amount_str = match.group(1).replace(',', '.')
-                try:
-                    amount = float(amount_str)
-                    break
-                except ValueError:
-                    continue
-        
-        message_lower = message.lower()
+    def _detect_locally(self, message: str, parsed: ParsedMessage, telegram_id: int = None) -> dict:
+        """Run the in-process stages in order: user memory, keywords, then the offline local model."""
+        remembered = self._detect_with_memory(telegram_id, parsed)
+        if remembered:
+            return remembered
+        return self._detect_with_local_model(self._detect_with_regex(message, parsed), parsed)
+
+    def _detect_with_local_model(self, regex_result: dict, parsed: ParsedMessage) -> dict:
+        """Let the local classifier pick the category when no keyword matched."""
+        if regex_result["confidence"] > NO_KEYWORD_CONFIDENCE or not parsed.description:
+            return regex_result
+        model = self._get_local_model()
+        if model is None:
+            return regex_result
+        prediction = model.predict(parsed.description)
+        if prediction is None or prediction[2] < config.LOCAL_MODEL_MIN_CONFIDENCE:
+            return regex_result
+        type_, category, probability = prediction
+        return {
+            **regex_result,
+            "category": category,
+            "type": type_,
+            "confidence": round(probability, 2),
+            "detected_by": "local_model",
+        }
+
+    def _get_local_model(self):
+        """Return the current local model, picking up a retrained file at most every LOCAL_MODEL_RELOAD_SECONDS."""
+        if time.monotonic() - self._local_model_checked_at >= config.LOCAL_MODEL_RELOAD_SECONDS:
+            self._reload_local_model()
+        return self._local_model
+
+    def _reload_local_model(self):
+        self._local_model_checked_at = time.monotonic()
+        try:
+            # The .json sidecar is replaced last by the trainer, so its mtime marks a complete model.
+            mtime = os.stat(config.LOCAL_MODEL_PATH + ".json").st_mtime
+        except OSError:
+            return
+        if mtime == self._local_model_mtime:
+            return
+        model = LocalClassifier.load(config.LOCAL_MODEL_PATH)
+        if model is not None:
+            self._local_model = model
+            self._local_model_mtime = mtime
+            logger.info(f"🧠 Local classifier loaded ({len(model.labels)} labels)")
+
+    def _detect_with_memory(self, telegram_id: int, parsed: ParsedMessage):
+        """Reuse the category the user gave a similar description before (needs an amount in the text)."""
+        if telegram_id is None or parsed.amount is None or not parsed.description:
+            return None
+        remembered = self.category_memory.lookup(telegram_id, parsed.description)
+        if not remembered:
+            return None
+        return {
+            "amount": parsed.amount,
+            "category": remembered["category"],
+            "type": remembered["type"],
+            "description": parsed.description,
+            "confidence": round(remembered["score"] / 100, 2),
+            "date": parsed.date,
+            "detected_by": "memory"
+        }
+
+    def _detect_with_regex(self, message: str, parsed: ParsedMessage = None) -> dict:
+        """Extract amount, date, category and type using the message lexer and keyword groups."""
+        parsed = parsed or parse_message(message)
+
         category = "Diversos"
         type_ = "despesa_variavel"
-        confidence = 0.6
-        
-        for cat_name, keywords in self.categories['rendas'].items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    category = cat_name
-                    type_ = "renda"
-                    confidence = 0.9
-                    break
-        
-        if type_ != "renda":
-            for cat_name, keywords in self.categories['economia'].items():
-                for keyword in keywords:
-                    if keyword in message_lower:
-                        category = cat_name
-                        type_ = "economia"
-                        confidence = 0.9
-                        break
-        
-        if type_ not in ['renda', 'economia']:
-            for cat_name, keywords in self.categories['despesas_fixas'].items():
-                for keyword in keywords:
-                    if keyword in message_lower:
-                        category = cat_name
-                        type_ = "despesa_fixa"
-                        confidence = 0.8
-                        break
-            
-            if type_ == "despesa_variavel":
-                for cat_name, keywords in self.categories['despesas_variaveis'].items():
-                    for keyword in keywords:
-                        if keyword in message_lower:
-                            category = cat_name
-                            confidence = 0.7
-                            break
-        
-        # Remove numeric parts from the original message to get a short description.
-        description = re.sub(r'R\$\s*\d+[.,]?\d*', '', message).strip()
-        description = re.sub(r'\d+[.,]?\d*', '', description).strip()
+        confidence = NO_KEYWORD_CONFIDENCE
+
+        # Single pass over the compiled keyword tables (see KeywordMatcher for the priority rules).
+        hit = self.keyword_matcher.match(message)
+        if hit:
+            category = hit["category"]
+            type_ = hit["type"]
+            confidence = hit["confidence"]
+
+        description = parsed.description
         
         return {
-            "amount": amount,
+            "amount": parsed.amount,
             "category": category,
             "type": type_,
             "description": description if description else "Despesa",
             "confidence": confidence,
+            "date": parsed.date,
             "detected_by": "regex"
         }
     
-    def _detect_with_ai(self, message: str) -> dict:
-        prompt = f"""
-        Analise esta mensagem financeira e retorne APENAS JSON:
+    def _ai_request(self, message: str) -> dict:
+        """Build the keyword arguments for a chat completion call (shared by sync and async paths)."""
+        return {
+            "model": config.GROQ_MODEL,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": message},
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.1,
+            "max_tokens": 120,
+        }
 
-        Mensagem: "{message}"
+    def _parse_ai_response(self, response) -> dict:
+        """Validate the answer strictly; raise if it is not a usable result."""
+        answer = extract_json(response.choices[0].message.content)
+        if isinstance(answer, list) and answer:
+            # Truncated answer salvaged as a list of objects; the first one is ours.
+            answer = answer[0]
+        result = validate_result(answer, self.categories)
+        if result is None:
+            raise ValueError("invalid JSON answer")
+        return result
 
-        Categorias FIXAS: {list(self.categories['despesas_fixas'].keys())}
-        Categorias VARIÁVEIS: {list(self.categories['despesas_variaveis'].keys())}
-        Categorias RENDA: {list(self.categories['rendas'].keys())}
-        Categorias ECONOMIA: {list(self.categories['economia'].keys())}
+    def _call_ai(self, request: dict):
+        """Run one blocking chat completion through the circuit breaker and return the raw response."""
+        if not self.breaker.allow():
+            self.stats["breaker_skips"] += 1
+            raise Exception("circuit breaker is open")
 
-        Regras:
-        - Se for aluguel, conta de casa, parcela fixa → FIXA
-        - Se for comida, transporte, compras do dia → VARIÁVEL  
-        - Se for salário, recebimento → RENDA
-        - Se for investimento, poupança, guardar dinheiro → ECONOMIA
-        - Extraia o valor numérico (pode ter R$, pontos, vírgulas)
-        - Descrição resumida em 2-3 palavras
+        self.stats["calls"] += 1
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.client.chat.completions.create(**request)
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            # Also on KeyboardInterrupt and the like: a half-open trial must always report back.
+            if response is None:
+                self.breaker.record_failure()
 
-        Retorne JSON: {{"amount": float, "category": string, "type": "fixa"|"variavel"|"renda"|"economia", "description": string, "confidence": float}}
-        """
+        self.breaker.record_success(time.perf_counter() - start)
+        return response
 
+    def _detect_with_ai(self, message: str) -> dict:
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=200
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            result['detected_by'] = 'groq'
-            return result
-            
+            return self._parse_ai_response(self._call_ai(self._ai_request(message)))
         except Exception as e:
             raise Exception(f"Erro Groq AI: {e}")
 
+    # ---------------- Batch path (imports and backfills) ----------------
+    def detect_expenses(self, messages, telegram_id: int = None) -> list:
+        """
+        Detect many messages at once; returns one result dict per message, in order.
+
+        The local stages (memory, regex, local model) run over every message first. Only the
+        messages still missing an amount go to the external client, packed
+        AI_BATCH_SIZE at a time into one prompt that answers with a JSON array,
+        and identical message templates are sent only once.
+        """
+        messages = list(messages)
+        parsed_messages = [parse_message(m) for m in messages]
+        results = []
+        # template -> indexes of the messages that still need the external client
+        pending = {}
+
+        for index, (message, parsed) in enumerate(zip(messages, parsed_messages)):
+            regex_result = self._detect_locally(message, parsed, telegram_id)
+            results.append(regex_result)
+            if regex_result["amount"] is not None or not self.client:
+                continue
+
+            cached = self._ai_cache_get(parsed)
+            if cached is not None:
+                if cached["confidence"] > 0.7:
+                    cached["date"] = parsed.date
+                    results[index] = cached
+                continue
+            pending.setdefault(message_template(parsed), []).append(index)
+
+        groups = list(pending.values())
+        for start in range(0, len(groups), config.AI_BATCH_SIZE):
+            chunk = groups[start:start + config.AI_BATCH_SIZE]
+            try:
+                ai_results = self._detect_batch_with_ai([messages[indexes[0]] for indexes in chunk])
+            except Exception as e:
+                logger.warning(f"❌ Error while calling external client for a batch: {e}. Falling back to regex...")
+                continue
+
+            for indexes, ai_result in zip(chunk, ai_results):
+                if ai_result is None:
+                    continue
+                self._ai_cache_set(parsed_messages[indexes[0]], ai_result)
+                if ai_result["confidence"] <= 0.7:
+                    continue
+                for index in indexes:
+                    results[index] = {**ai_result, "date": parsed_messages[index].date}
+
+        return results
+
+    def _ai_batch_request(self, messages: list) -> dict:
+        """Build one chat completion call that categorizes several messages."""
+        return {
+            "model": config.GROQ_MODEL,
+            "messages": [
+                {"role": "system", "content": self.batch_system_prompt},
+                {"role": "user", "content": json.dumps(messages, ensure_ascii=False)},
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.1,
+            "max_tokens": 60 * len(messages) + 20,
+        }
+
+    def _parse_ai_batch_response(self, response, size: int) -> list:
+        """Map the results back to message positions; missing or invalid items become None."""
+        items = extract_json(response.choices[0].message.content)
+        if isinstance(items, dict):
+            items = items.get("results", [])
+        if not isinstance(items, list):
+            raise ValueError("invalid JSON answer")
+        results = [None] * size
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index")
+            if not isinstance(index, int) or not 0 <= index < size:
+                continue
+            results[index] = validate_result(item, self.categories)
+        return results
+
+    def _detect_batch_with_ai(self, messages: list) -> list:
+        self.stats["batched_messages"] += len(messages)
+        response = self._call_ai(self._ai_batch_request(messages))
+        return self._parse_ai_batch_response(response, len(messages))
+
+    def _ai_cache_get(self, parsed: ParsedMessage):
+        """Look up a cached external result for this message template."""
+        if self.ai_cache is None:
+            return None
+        return self._cached_result(self.ai_cache.get(message_template(parsed)))
+
+    async def _ai_cache_get_async(self, parsed: ParsedMessage):
+        if self.ai_cache is None:
+            return None
+        return self._cached_result(await self.ai_cache.get_async(message_template(parsed)))
+
+    def _cached_result(self, value):
+        # Validated again, so entries written by older versions cannot leak a bad type or category.
+        result = validate_result(value, self.categories)
+        if result is None:
+            return None
+        result["detected_by"] = "groq_cache"
+        return result
+
+    def _ai_cache_set(self, parsed: ParsedMessage, result: dict):
+        if self.ai_cache is None:
+            return
+        try:
+            self.ai_cache.set(message_template(parsed), self._cache_value(result))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not cache external result: {e}")
+
+    async def _ai_cache_set_async(self, parsed: ParsedMessage, result: dict):
+        if self.ai_cache is None:
+            return
+        try:
+            await self.ai_cache.set_async(message_template(parsed), self._cache_value(result))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not cache external result: {e}")
+
+    def _cache_value(self, result: dict) -> dict:
+        # Only amount-less messages reach the external client, so its amount
+        # comes from the words of the text and is cached with them.
+        return {k: v for k, v in result.items() if k not in ("date", "detected_by")}
+
+    # ---------------- Async path (used by the bot) ----------------
+    async def detect_expense_async(self, message: str, telegram_id: int = None) -> dict:
+        """
+        Async version of `detect_expense` for the Telegram handlers.
+
+        The external call never blocks the event loop: it is awaited with a
+        timeout, bounded by a semaphore, and skipped entirely while the circuit
+        breaker is open. When micro-batching is enabled, concurrent ambiguous
+        messages share a single prompt. Any failure falls back to the regex result.
+        """
+        parsed = parse_message(message)
+        if telegram_id is not None and self.category_memory.is_stale(telegram_id):
+            # Loading or refreshing the user's history reads the database; keep it off the event loop.
+            await asyncio.to_thread(self.category_memory.preload, telegram_id)
+        regex_result = self._detect_locally(message, parsed, telegram_id)
+
+        if regex_result["amount"] is None and self.async_client:
+            # The disk tier of the cache is SQLite; these run it in a worker thread.
+            ai_result = await self._ai_cache_get_async(parsed)
+            if ai_result is None:
+                if self.batcher is not None:
+                    # Shares one prompt with other users' messages arriving in the same window.
+                    ai_result = await self.batcher.submit(message, message_template(parsed))
+                else:
+                    ai_result = await self._detect_with_ai_async(message)
+                if ai_result:
+                    await self._ai_cache_set_async(parsed, ai_result)
+            if ai_result and ai_result["confidence"] > 0.7:
+                ai_result["date"] = parsed.date
+                return ai_result
+
+        return regex_result
+
+    async def _detect_with_ai_async(self, message: str):
+        """Return the parsed external result, or None if it was skipped or failed."""
+        return await self._call_ai_async(self._ai_request(message), self._parse_ai_response)
+
+    async def _detect_batch_with_ai_async(self, messages: list):
+        """Async batch call used by the micro-batcher; returns a list aligned with `messages`, or None."""
+        self.stats["batched_messages"] += len(messages)
+        return await self._call_ai_async(
+            self._ai_batch_request(messages),
+            lambda response: self._parse_ai_batch_response(response, len(messages)),
+        )
+
+    async def _call_ai_async(self, request: dict, parse):
+        """Await one chat completion with timeout, concurrency cap and circuit breaker; None on skip/failure."""
+        # Cheap check first, so callers do not queue on the semaphore while the breaker is open.
+        if self.breaker.state == "open":
+            self.stats["breaker_skips"] += 1
+            return None
+
+        # Created lazily so it binds to the running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(config.GROQ_MAX_CONCURRENCY)
+
+        async with self._semaphore:
+            # Checked again: the breaker may have opened while this call was waiting for a slot.
+            if not self.breaker.allow():
+                self.stats["breaker_skips"] += 1
+                return None
+            self.stats["calls"] += 1
+            start = time.perf_counter()
+            succeeded = False
+            try:
+                response = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(**request),
+                    timeout=config.GROQ_TIMEOUT_SECONDS,
+                )
+                result = parse(response)
+                succeeded = True
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.warning("⏱️ Groq call timed out after %.1fs, falling back to regex", config.GROQ_TIMEOUT_SECONDS)
+                return None
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.warning(f"❌ Error while calling external client: {e}. Falling back to regex...")
+                return None
+            finally:
+                # Also when the call is cancelled (CancelledError is not an Exception): a half-open
+                # trial that never reported back would keep the breaker rejecting every call.
+                if not succeeded:
+                    self.breaker.record_failure()
+
+        self.breaker.record_success(time.perf_counter() - start)
+        return result
+
+    def get_stats(self) -> dict:
+        """Counters for the external calls: breaker state/trips, cache hits and micro-batch histograms."""
+        return {
+            **self.stats,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "cache": self.ai_cache.get_stats() if self.ai_cache else None,
+            "microbatch": self.batcher.get_stats() if self.batcher else None,
+        }
+
 ai_processor = AIProcessor()
\ No newline at end of file
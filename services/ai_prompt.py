@@ -0,0 +1,143 @@
+import json
+import re
+
+from services.message_lexer import parse_money
+
+
+# Accepted spellings of the transaction type in model answers.
+TYPE_ALIASES = {
+    "despesa_fixa": "despesa_fixa",
+    "fixa": "despesa_fixa",
+    "despesa_variavel": "despesa_variavel",
+    "variavel": "despesa_variavel",
+    "variável": "despesa_variavel",
+    "renda": "renda",
+    "economia": "economia",
+}
+
+# Section of `AIProcessor.categories` that holds the categories of each type.
+TYPE_SECTIONS = {
+    "despesa_fixa": "despesas_fixas",
+    "despesa_variavel": "despesas_variaveis",
+    "renda": "rendas",
+    "economia": "economia",
+}
+
+# Used when the model answers with a category that does not exist for the type.
+FALLBACK_CATEGORY = {
+    "despesa_fixa": "Diversos",
+    "despesa_variavel": "Diversos",
+    "renda": "Outros",
+    "economia": "Investimentos",
+}
+
+_RESULT_FIELDS = '"amount": número ou null, "category": string, "type": string, "description": string, "confidence": 0 a 1'
+
+# Flat JSON objects, used to salvage items from a truncated or chatty answer.
+_FLAT_OBJECT = re.compile(r"\{[^{}]*\}")
+
+
+def build_system_prompt(categories: dict, batch: bool = False) -> str:
+    """
+    Build the fixed system prompt from the category tables.
+
+    It only depends on `categories`, so it is built once and sent unchanged on
+    every call; the user turn carries nothing but the message(s).
+    """
+    lines = [
+        "Classifique mensagens financeiras em português. Responda apenas com JSON.",
+        "Tipos e categorias:",
+    ]
+    for type_, section in TYPE_SECTIONS.items():
+        lines.append(f"{type_}: {', '.join(categories.get(section, {}))}")
+    lines += [
+        "Regras: aluguel, contas da casa, parcelas -> despesa_fixa; comida, transporte, compras do dia -> "
+        "despesa_variavel; salário, recebimentos -> renda; investimento, poupança -> economia.",
+        "amount: valor numérico da mensagem (pode ter R$, pontos, vírgulas). description: 2-3 palavras.",
+    ]
+    if batch:
+        lines.append(
+            "A mensagem do usuário é uma lista JSON de textos. Responda "
+            f'{{"results": [{{"index": posição na lista, {_RESULT_FIELDS}}}]}}, um item por texto.'
+        )
+    else:
+        lines.append(f"Formato: {{{_RESULT_FIELDS}}}")
+    return "\n".join(lines)
+
+
+def extract_json(content: str):
+    """
+    Parse a model answer as JSON, tolerating extra text around it.
+
+    Falls back to the JSON value starting at the first bracket, and finally to
+    the list of complete flat objects in the text (for truncated answers).
+    Returns None if nothing usable is found.
+    """
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    start = re.search(r"[{\[]", content)
+    if start is None:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(content, start.start())
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    items = []
+    for match in _FLAT_OBJECT.finditer(content):
+        try:
+            items.append(json.loads(match.group(0)))
+        except json.JSONDecodeError:
+            continue
+    return items or None
+
+
+def validate_result(item, categories: dict):
+    """
+    Check and normalize one model result; return None if it cannot be used.
+
+    - `type` must map to a known transaction type.
+    - `category` must exist for that type, otherwise the type's fallback is used.
+    - `amount` becomes a positive float or None; `confidence` is clamped to 0..1.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    type_ = TYPE_ALIASES.get(str(item.get("type", "")).strip().lower())
+    if type_ is None:
+        return None
+
+    category = item.get("category")
+    if category not in categories.get(TYPE_SECTIONS[type_], {}):
+        category = FALLBACK_CATEGORY[type_]
+
+    amount = item.get("amount")
+    if isinstance(amount, str):
+        amount = parse_money(amount)
+    elif isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        amount = None
+    if amount is not None:
+        amount = abs(float(amount))
+
+    try:
+        confidence = min(1.0, max(0.0, float(item.get("confidence", 0))))
+    except (TypeError, ValueError):
+        confidence = 0.0
+
+    description = item.get("description")
+    description = str(description).strip()[:200] if description else "Despesa"
+
+    return {
+        "amount": amount,
+        "category": category,
+        "type": type_,
+        "description": description,
+        "confidence": confidence,
+        "detected_by": "groq",
+    }
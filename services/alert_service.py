@@ -1,4 +1,4 @@
-from services.database import db_manager
+from services.shard_router import shard_router
 from services.budget_service import budget_service
 from services.finance_calculator import FinanceCalculator
 
@@ -6,7 +6,7 @@ from services.finance_calculator import FinanceCalculator
 class AlertService:
     def __init__(self):
         # Use shared database manager and calculator to derive alerts.
-        self.db = db_manager
+        self.db = shard_router
         self.finance_calc = FinanceCalculator()
     
     def get_daily_budget_alerts(self, telegram_id: int):
@@ -0,0 +1,160 @@
+# services/async_database.py
+import logging
+import threading
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from config.config import config
+from services.database import (
+    engine_options,
+    is_sqlite_file,
+    pool_stats,
+    recent_writes,
+    tune_engine,
+    use_primary_for_reads,
+)
+
+logger = logging.getLogger(__name__)
+
+# Async driver used for each backend of DATABASE_URL.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def async_database_url(database_url: str):
+    """
+    Turn a sync DATABASE_URL into its async equivalent.
+
+    `sqlite:///chat_crown.db` -> `sqlite+aiosqlite:///chat_crown.db` and
+    `postgresql://...` (or `postgresql+psycopg2://...`) -> `postgresql+asyncpg://...`.
+    asyncpg does not understand libpq's `sslmode`, so it is passed as `ssl`.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if url.get_backend_name() == "postgresql" and "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+class AsyncDatabaseManager:
+    """
+    Async counterpart of `DatabaseManager`, used by the Telegram bot.
+
+    Points at the same database (DATABASE_URL, and DATABASE_READ_URL for
+    `get_read_session`) through aiosqlite or asyncpg, so a slow query awaits
+    instead of blocking every other user's update. Like the sync manager, the
+    engines are only created on first use, with the same backend profile
+    (see `engine_options` and `tune_engine`) and the same read routing.
+    """
+
+    def __init__(self, database_url: str = None, read_url: str = None):
+        self.database_url = database_url or config.DATABASE_URL
+        self.read_url = read_url if database_url else config.DATABASE_READ_URL
+        self._engine = None
+        self._read_engine = None
+        self._session_factory = None
+        self._read_session_factory = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._setup_engine()
+        return self._engine
+
+    @property
+    def read_engine(self):
+        if self._read_engine is None:
+            self._setup_engine()
+        return self._read_engine
+
+    @property
+    def SessionLocal(self):
+        if self._session_factory is None:
+            self._setup_engine()
+        return self._session_factory
+
+    def _setup_engine(self):
+        """Create the async engines and session factories (once, even with concurrent first calls)."""
+        with self._lock:
+            if self._engine is not None:
+                return
+            engine = self._create_engine(self.database_url)
+            read_engine = engine
+            if self.read_url:
+                read_engine = self._create_engine(self.read_url, read_only=True)
+            elif is_sqlite_file(self.database_url):
+                read_engine = self._create_engine(self.database_url, read_only=True)
+
+            self._session_factory = self._sessionmaker(engine)
+            self._read_session_factory = self._sessionmaker(read_engine)
+            self._read_engine = read_engine
+            self._engine = engine
+
+        logger.info("✅ Async database engine created successfully")
+
+    def _create_engine(self, database_url, read_only: bool = False):
+        url = async_database_url(database_url)
+        engine = create_async_engine(url, **engine_options(url, async_engine=True))
+        tune_engine(engine.sync_engine, read_only=read_only)
+        return engine
+
+    def _sessionmaker(self, engine):
+        return async_sessionmaker(
+            bind=engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    def configure(self, database_url: str, read_url: str = None):
+        """Point the manager at another database; call `dispose` first if the old engines were used."""
+        with self._lock:
+            self.database_url = database_url
+            self.read_url = read_url
+            self._engine = None
+            self._read_engine = None
+            self._session_factory = None
+            self._read_session_factory = None
+
+    def get_session(self):
+        """Return a new AsyncSession, to be used as `async with async_db_manager.get_session() as session`."""
+        return self.SessionLocal()
+
+    def get_read_session(self, telegram_id: int = None):
+        """Async version of `DatabaseManager.get_read_session` (same read-your-writes rules)."""
+        if use_primary_for_reads(telegram_id):
+            return self.get_session()
+        if self._read_session_factory is None:
+            self._setup_engine()
+        return self._read_session_factory()
+
+    def mark_write(self, telegram_id: int):
+        if telegram_id is not None:
+            recent_writes.mark(telegram_id)
+
+    def pool_stats(self) -> dict:
+        stats = {"primary": pool_stats(self.engine.pool)}
+        if self.read_engine is not self.engine:
+            stats["read"] = pool_stats(self.read_engine.pool)
+        return stats
+
+    async def test_connection(self):
+        async with self.get_session() as session:
+            await session.execute(text("SELECT 1"))
+        logger.info("✅ Async database connection test passed")
+
+    async def dispose(self):
+        """Close the pooled connections (on bot shutdown)."""
+        for engine in {self._engine, self._read_engine} - {None}:
+            await engine.dispose()
+
+
+async_db_manager = AsyncDatabaseManager()
@@ -1,16 +1,20 @@
 import logging
 from datetime import datetime
-from sqlalchemy import and_
-from services.database import db_manager
+from sqlalchemy import and_, func
+from services.database import upsert
+from services.shard_router import shard_router
+from services.rollup_service import EXPENSE_TYPES
 from models.budget import Budget
-from models.transaction import Transaction
+from models.category import resolve_category_id
+from models.money import from_cents, to_cents
+from models.rollup import MonthlyRollup
 
 logger = logging.getLogger(__name__)
 
 
 class BudgetService:
     def __init__(self):
-        self.db = db_manager
+        self.db = shard_router
     
     def set_budget(self, telegram_id: int, category: str, monthly_limit: float, month: int = None, year: int = None):
         """Create or update a monthly budget for a specific category."""
@@ -18,38 +22,48 @@ class BudgetService:
         year = year or datetime.now().year
         
         try:
-            with self.db.get_session() as session:
-
-                # Check if there is already a budget for this user/category/month.
-                budget = (
-                    session.query(Budget)
-                    .filter(
-                        Budget.telegram_id == telegram_id,
-                        Budget.category == category,
-                        Budget.month == month,
-                        Budget.year == year,
-                    )
-                    .first()
-                )
-                
-                if budget:
-                    budget.monthly_limit = monthly_limit
-                else:
-                    budget = Budget(
-                        telegram_id=telegram_id,
-                        category=category,
-                        monthly_limit=monthly_limit,
-                        month=month,
-                        year=year,
-                    )
-                    session.add(budget)
-                
+            with self.db.get_session(telegram_id) as session:
+                self._upsert_budget(session, telegram_id, category, monthly_limit, month, year)
                 session.commit()
+                self.db.mark_write(telegram_id)
                 return True
                 
         except Exception as e:
             logger.error(f"Erro ao definir orçamento: {e}")
             return False
+
+    async def set_budget_async(self, telegram_id: int, category: str, monthly_limit: float, month: int = None,
+                               year: int = None):
+        """Async version of `set_budget` for the bot."""
+        month = month or datetime.now().month
+        year = year or datetime.now().year
+
+        try:
+            async with self.db.get_async_session(telegram_id) as session:
+                await session.run_sync(self._upsert_budget, telegram_id, category, monthly_limit, month, year)
+                await session.commit()
+                self.db.mark_write(telegram_id)
+                return True
+        except Exception as e:
+            logger.error(f"Erro ao definir orçamento: {e}")
+            return False
+
+    def _upsert_budget(self, session, telegram_id: int, category: str, monthly_limit: float, month: int, year: int):
+        # Single INSERT ... ON CONFLICT on the (user, year, month, category) key,
+        # so two concurrent calls cannot create duplicate budgets.
+        upsert(
+            session,
+            Budget,
+            {
+                "telegram_id": telegram_id,
+                "category_id": resolve_category_id(session, category),
+                "monthly_limit_cents": to_cents(monthly_limit),
+                "month": month,
+                "year": year,
+            },
+            key_columns=("telegram_id", "year", "month", "category_id"),
+            replace=("monthly_limit_cents",),
+        )
     
     def get_budgets_with_status(self, telegram_id: int, month: int = None, year: int = None):
         """Return all budgets for a user with calculated usage status."""
@@ -57,84 +71,85 @@ class BudgetService:
         year = year or datetime.now().year
         
         try:
-            with self.db.get_session() as session:
+            with self.db.get_read_session(telegram_id) as session:
+                return self._budgets_with_status(session, telegram_id, month, year)
+        except Exception as e:
+            logger.error(f"Erro ao buscar orçamentos: {e}")
+            return {'budgets': [], 'alerts': []}
 
-                # Load all budgets for the user and the given month.
-                budgets = (
-                    session.query(Budget)
-                    .filter(
-                        Budget.telegram_id == telegram_id,
-                        Budget.month == month,
-                        Budget.year == year,
-                    )
-                    .all()
-                )
-                
-                if not budgets:
-                    return {'budgets': [], 'alerts': []}
-                
-                # Load all expense transactions for the selected month.
-                start_date = f"{year}-{month:02d}-01"
-                if month == 12:
-                    end_date = f"{year+1}-01-01"
-                else:
-                    end_date = f"{year}-{month+1:02d}-01"
-                
-                transactions = (
-                    session.query(Transaction)
-                    .filter(
-                        Transaction.telegram_id == telegram_id,
-                        Transaction.date >= start_date,
-                        Transaction.date < end_date,
-                        Transaction.type.in_(["despesa_fixa", "despesa_variavel"]),
-                    )
-                    .all()
-                )
-                
-                # Aggregate how much was spent per category, so we can compare it to the budget limit.
-                category_spending = {}
-                for transaction in transactions:
-                    if transaction.category not in category_spending:
-                        category_spending[transaction.category] = 0
-                    category_spending[transaction.category] += transaction.amount
-                
-                # Combine budget limits and real spending into a UI-friendly list.
-                result = []
-                alerts = []
-                
-                for budget in budgets:
-                    spent = category_spending.get(budget.category, 0)
-                    remaining = budget.monthly_limit - spent
-                    usage_percentage = (spent / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
-                    
-                    budget_data = {
-                        'id': budget.id,
-                        'category': budget.category,
-                        'monthly_limit': budget.monthly_limit,
-                        'spent': spent,
-                        'remaining': remaining,
-                        'usage_percentage': usage_percentage,
-                        'alert_level': 'safe'
-                    }
-                    
-                    # Build alert messages based on usage percentage.
-                    if usage_percentage >= 100:
-                        budget_data['alert_level'] = 'exceeded'
-                        alerts.append(f"🚨 {budget.category}: Orçamento estourado!")
-                    elif usage_percentage >= 80:
-                        budget_data['alert_level'] = 'warning'
-                        alerts.append(f"⚠️ {budget.category}: {usage_percentage:.0f}% usado")
-                    
-                    result.append(budget_data)
-                
-                return {
-                    'budgets': result,
-                    'alerts': alerts
-                }
-                
+    async def get_budgets_with_status_async(self, telegram_id: int, month: int = None, year: int = None):
+        """Async version of `get_budgets_with_status` for the bot."""
+        month = month or datetime.now().month
+        year = year or datetime.now().year
+
+        try:
+            async with self.db.get_async_read_session(telegram_id) as session:
+                return await session.run_sync(self._budgets_with_status, telegram_id, month, year)
         except Exception as e:
             logger.error(f"Erro ao buscar orçamentos: {e}")
             return {'budgets': [], 'alerts': []}
 
+    def _budgets_with_status(self, session, telegram_id: int, month: int, year: int):
+        # Load all budgets for the user and the given month.
+        budgets = (
+            session.query(Budget)
+            .filter(
+                Budget.telegram_id == telegram_id,
+                Budget.month == month,
+                Budget.year == year,
+            )
+            .all()
+        )
+        
+        if not budgets:
+            return {'budgets': [], 'alerts': []}
+        
+        # Spending per category for the month, read from the monthly rollups.
+        category_spending = dict(
+            session.query(MonthlyRollup.category_id, func.sum(MonthlyRollup.total_cents))
+            .filter(
+                MonthlyRollup.telegram_id == telegram_id,
+                MonthlyRollup.year == year,
+                MonthlyRollup.month == month,
+                MonthlyRollup.type.in_(EXPENSE_TYPES),
+            )
+            .group_by(MonthlyRollup.category_id)
+            .all()
+        )
+        
+        # Combine budget limits and real spending into a UI-friendly list.
+        result = []
+        alerts = []
+        
+        for budget in budgets:
+            spent = from_cents(category_spending.get(budget.category_id, 0))
+            remaining = budget.monthly_limit - spent
+            usage_percentage = (spent / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
+            
+            budget_data = {
+                'id': budget.id,
+                'category': budget.category,
+                'monthly_limit': budget.monthly_limit,
+                'spent': spent,
+                'remaining': remaining,
+                'usage_percentage': usage_percentage,
+                'alert_level': 'safe'
+            }
+            
+            # Build alert messages based on usage percentage.
+            if usage_percentage >= 100:
+                budget_data['alert_level'] = 'exceeded'
+                alerts.append(f"🚨 {budget.category}: Orçamento estourado!")
+            elif usage_percentage >= 80:
+                budget_data['alert_level'] = 'warning'
+                alerts.append(f"⚠️ {budget.category}: {usage_percentage:.0f}% usado")
+            
+            result.append(budget_data)
+        
+        return {
+            'budgets': result,
+            'alerts': alerts
+        }
+
 # Global instance so other modules can import `budget_service` directly.
 budget_service = BudgetService()
\ No newline at end of file
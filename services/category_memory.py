@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+
+from rapidfuzz import fuzz, process
+
+logger = logging.getLogger(__name__)
+
+# A row edited later than this after creation counts as confirmed by the user.
+EDIT_GRACE = timedelta(seconds=1)
+# What detection falls back to when nothing matched; remembering them would
+# hide the keyword tables and the local model behind a guess.
+CATCH_ALL_CATEGORIES = ("Diversos", "Outros")
+
+
+def is_confirmed(detected_by: str, created_at, updated_at) -> bool:
+    """Typed in by the user, or edited by them after automatic detection."""
+    if detected_by in (None, "manual"):
+        return True
+    return bool(created_at and updated_at and updated_at - created_at > EDIT_GRACE)
+
+
+def normalize_description(description: str) -> str:
+    """Lowercase, strip accents and collapse spaces ("Almoço  Bar" -> "almoco bar")."""
+    if not description:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", description.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+class CategoryMemory:
+    """
+    Per-user memory of how the user categorized past descriptions.
+
+    Each user gets a bounded LRU map of normalized description -> (category, type),
+    loaded lazily from their latest confirmed transactions (see `is_confirmed`)
+    on first use. Automatic guesses and catch-all categories are never
+    remembered, so a wrong guess cannot override the keyword tables. Rows
+    confirmed in other processes (e.g. edits on the Transações page) are read
+    again by `updated_at` at most every `refresh_seconds`. Lookups try an
+    exact match first and then a fuzzy match with rapidfuzz.
+    """
+
+    def __init__(self, max_entries_per_user: int = 500, max_users: int = 5000, score_cutoff: float = 88,
+                 refresh_seconds: float = 30):
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        self.score_cutoff = score_cutoff
+        self.refresh_seconds = refresh_seconds
+        self._users = OrderedDict()
+        # telegram_id -> (latest updated_at read from the database, monotonic time of that read).
+        self._synced = {}
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "fuzzy_hits": 0, "misses": 0, "loads": 0, "refreshes": 0}
+
+    def lookup(self, telegram_id: int, description: str):
+        """Return {"category", "type", "score"} for the closest remembered description, or None."""
+        key = normalize_description(description)
+        if not key:
+            return None
+
+        entries = self._entries(telegram_id)
+        with self._lock:
+            if key in entries:
+                entries.move_to_end(key)
+                category, type_ = entries[key]
+                self.stats["exact_hits"] += 1
+                return {"category": category, "type": type_, "score": 100.0}
+
+            match = process.extractOne(key, list(entries.keys()), scorer=fuzz.token_sort_ratio,
+                                       score_cutoff=self.score_cutoff)
+            if match is None:
+                self.stats["misses"] += 1
+                return None
+            category, type_ = entries[match[0]]
+            self.stats["fuzzy_hits"] += 1
+            return {"category": category, "type": type_, "score": match[1]}
+
+    def learn(self, telegram_id: int, description: str, category: str, type_: str, detected_by: str = "manual"):
+        """
+        Remember the category of a transaction the user typed in or corrected.
+
+        Automatic detections (`detected_by` other than "manual") are ignored; a
+        catch-all category forgets the description instead. Users that were
+        not loaded yet are skipped: their first lookup will read this row from
+        the database anyway.
+        """
+        key = normalize_description(description)
+        if not key or not category or not type_ or detected_by not in (None, "manual"):
+            return
+        with self._lock:
+            entries = self._users.get(telegram_id)
+            if entries is not None:
+                self._remember(entries, key, category, type_)
+
+    def is_loaded(self, telegram_id: int) -> bool:
+        with self._lock:
+            return telegram_id in self._users
+
+    def is_stale(self, telegram_id: int) -> bool:
+        """True when the next lookup would query the database (not loaded yet, or due for a refresh)."""
+        with self._lock:
+            if telegram_id not in self._users:
+                return True
+            return time.monotonic() - self._synced[telegram_id][1] >= self.refresh_seconds
+
+    def preload(self, telegram_id: int):
+        """Load or refresh the user's history now (e.g. from a worker thread) so the next lookup does not query."""
+        self._entries(telegram_id)
+
+    def forget_user(self, telegram_id: int):
+        with self._lock:
+            self._users.pop(telegram_id, None)
+            self._synced.pop(telegram_id, None)
+
+    def _entries(self, telegram_id: int):
+        with self._lock:
+            entries = self._users.get(telegram_id)
+            if entries is not None:
+                self._users.move_to_end(telegram_id)
+                synced_until, checked_at = self._synced[telegram_id]
+                if time.monotonic() - checked_at < self.refresh_seconds:
+                    return entries
+
+        if entries is not None:
+            return self._refresh(telegram_id, entries, synced_until)
+
+        # Load outside the lock, the query may take a while.
+        checked_at = time.monotonic()
+        rows = self._load_history(telegram_id)
+        entries = OrderedDict()
+        if rows is None:
+            # Do not cache a failed load; the next lookup tries again.
+            return entries
+        for description, category, type_, _ in rows:
+            self._remember(entries, normalize_description(description), category, type_)
+
+        with self._lock:
+            # Another thread may have loaded the same user in the meantime.
+            if telegram_id not in self._users:
+                self._users[telegram_id] = entries
+                self._synced[telegram_id] = (self._latest(rows, None), checked_at)
+            entries = self._users[telegram_id]
+            self._users.move_to_end(telegram_id)
+            while len(self._users) > self.max_users:
+                evicted, _ = self._users.popitem(last=False)
+                self._synced.pop(evicted, None)
+            self.stats["loads"] += 1
+        return entries
+
+    def _refresh(self, telegram_id: int, entries, synced_until):
+        """Apply the rows confirmed since the last read (possibly by another process)."""
+        checked_at = time.monotonic()
+        rows = self._load_history(telegram_id, since=synced_until)
+        with self._lock:
+            if rows is None:
+                # Keep serving what we have; try again after the next interval.
+                self._synced[telegram_id] = (synced_until, checked_at)
+                return entries
+            for description, category, type_, _ in rows:
+                self._remember(entries, normalize_description(description), category, type_)
+            if telegram_id in self._users:
+                self._synced[telegram_id] = (self._latest(rows, synced_until), checked_at)
+            self.stats["refreshes"] += 1
+        return entries
+
+    def _latest(self, rows, synced_until):
+        return max((updated_at for *_, updated_at in rows if updated_at is not None), default=synced_until)
+
+    def _remember(self, entries, key, category, type_):
+        if not key:
+            return
+        if category in CATCH_ALL_CATEGORIES:
+            # The user's latest word on this description is "no particular category".
+            entries.pop(key, None)
+            return
+        entries[key] = (category, type_)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+
+    def _load_history(self, telegram_id: int, since=None):
+        """
+        Return the user's latest confirmed (description, category, type, updated_at)
+        rows, oldest first, or None on error. With `since`, only rows updated
+        at or after it (re-reading the last one is harmless).
+        """
+        # Imported here so the text parser does not need a database to be importable.
+        from sqlalchemy import func, or_
+        from services.shard_router import shard_router
+        from models.category import Category
+        from models.transaction import Transaction
+
+        try:
+            with shard_router.get_read_session(telegram_id) as session:
+                if session.get_bind().dialect.name == "sqlite":
+                    # SQLite stores DATETIME as text; compare as Julian days.
+                    edited = (func.julianday(Transaction.updated_at) - func.julianday(Transaction.created_at)
+                              > EDIT_GRACE.total_seconds() / 86400)
+                else:
+                    edited = Transaction.updated_at - Transaction.created_at > EDIT_GRACE
+                query = (
+                    session.query(Transaction.description, Category.name, Transaction.type, Transaction.updated_at)
+                    .join(Category, Category.id == Transaction.category_id)
+                    .filter(
+                        Transaction.telegram_id == telegram_id,
+                        Transaction.description.isnot(None),
+                        or_(Transaction.detected_by.is_(None), Transaction.detected_by == "manual", edited),
+                    )
+                )
+                if since is not None:
+                    query = query.filter(Transaction.updated_at >= since)
+                rows = (
+                    query.order_by(Transaction.updated_at.desc(), Transaction.id.desc())
+                    .limit(self.max_entries_per_user)
+                    .all()
+                )
+            return list(reversed(rows))
+        except Exception as e:
+            logger.error(f"Error while loading category history: {e}")
+            return None
@@ -0,0 +1,87 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Small circuit breaker used to stop calling a flaky external service.
+
+    States:
+    - "closed": calls go through; consecutive failures are counted.
+    - "open": calls are skipped until `reset_timeout` seconds have passed.
+    - "half_open": a single trial call is let through; success closes the
+      breaker again, failure re-opens it.
+
+    A call slower than `slow_call_threshold` seconds counts as a failure, so
+    the breaker also trips when the service is up but too slow to be useful.
+
+    Every call `allow` let through must end in `record_success` or
+    `record_failure`, even when it is cancelled: until then a half-open
+    breaker keeps its single trial slot taken and rejects every other call.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_threshold: float = None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # How many times the breaker went from closed/half-open to open.
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted right now."""
+        with self._lock:
+            self._refresh()
+            if self._state == "closed":
+                return True
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency: float = None):
+        """Record a finished call; slow calls are treated as failures."""
+        if self.slow_call_threshold is not None and latency is not None and latency > self.slow_call_threshold:
+            self.record_failure()
+            return
+        with self._lock:
+            self._trial_in_flight = False
+            if self._state == "open":
+                # Late success of a call started before the breaker opened; keep waiting for the cool-down.
+                return
+            self._failures = 0
+            self._state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "open":
+                # Late failure of a call started before the breaker opened.
+                return
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = "open"
+        self._opened_at = self._clock()
+        self._failures = 0
+        self.trips += 1
+
+    def _refresh(self):
+        # Move from open to half-open once the cool-down period is over.
+        if self._state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_in_flight = False
@@ -1,52 +1,340 @@
 # services/database.py
+import contextvars
 import logging
-from sqlalchemy import create_engine, text
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, insert, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, DisconnectionError, TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config.config import config
+from services.metrics import Histogram
 
 logger = logging.getLogger(__name__)
 
 
-class DatabaseManager:
-    """Central place to manage the SQLAlchemy engine and sessions."""
+# ---------------- Engine profiles ----------------
+class PoolMetrics:
+    """Checkout wait times and in-use gauges of one connection pool, for sizing it from data."""
 
     def __init__(self):
+        self.checkout_wait_ms = Histogram([0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000])
+        self.peak_in_use = 0
+        self.timeouts = 0
+        self.logged_at = time.monotonic()
+
+
+class InstrumentedPoolMixin:
+    """
+    Times every checkout (waiting for a free connection, or opening a new one)
+    and tracks the peak number of connections in use.
+
+    SQLAlchemy has no event that fires before a checkout starts, so the
+    pool's `_do_get` is wrapped instead. `recreate` (on dispose or after a
+    disconnect) hands the metrics over to the new pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.checkout_wait_ms.observe((time.perf_counter() - started) * 1000)
+        self.metrics.peak_in_use = max(self.metrics.peak_in_use, self.checkedout())
+        self._maybe_log_stats()
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _maybe_log_stats(self):
+        interval = config.DB_POOL_STATS_LOG_SECONDS
+        if interval and time.monotonic() - self.metrics.logged_at >= interval:
+            self.metrics.logged_at = time.monotonic()
+            stats = pool_stats(self)
+            logger.info(
+                f"📊 Pool: {stats['in_use']} in use (peak {stats['peak_in_use']}), {stats['idle']} idle, "
+                f"checkout wait p50 {stats['checkout_wait_p50_ms']} ms / p99 {stats['checkout_wait_p99_ms']} ms, "
+                f"{stats['timeouts']} timeouts"
+            )
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(pool) -> dict:
+    """Gauges of a pool; only instrumented pools have the wait-time and peak figures."""
+    stats = {"pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), in_use=pool.checkedout(), idle=pool.checkedin(), overflow=pool.overflow())
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            peak_in_use=metrics.peak_in_use,
+            timeouts=metrics.timeouts,
+            checkout_wait_p50_ms=metrics.checkout_wait_ms.percentile(50),
+            checkout_wait_p99_ms=metrics.checkout_wait_ms.percentile(99),
+            checkout_wait_ms=metrics.checkout_wait_ms.snapshot(),
+        )
+    return stats
+
+
+def is_sqlite_file(database_url) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def engine_options(database_url, async_engine: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine by backend.
+
+    SQLite files keep SQLAlchemy's pool defaults (no network, so no pre-ping);
+    in-memory SQLite keeps its single-connection pool. Server databases get
+    the DB_POOL_* sizing, recycling and the "always" pre-ping policy (the
+    "idle" policy is an event, see `tune_engine`).
+    """
+    url = make_url(database_url)
+    pool_class = InstrumentedAsyncQueuePool if async_engine else InstrumentedQueuePool
+    if url.get_backend_name() == "sqlite":
+        return {"poolclass": pool_class} if is_sqlite_file(url) else {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": config.DB_PRE_PING == "always",
+    }
+
+
+def tune_engine(engine, read_only: bool = False):
+    """
+    Register the per-connection settings of the engine's backend.
+
+    `engine` is a sync Engine (for async engines pass `engine.sync_engine`).
+    SQLite connections get the journal, sync, mmap and busy-timeout pragmas;
+    `read_only` ones are query_only, so a dashboard can never hold the write
+    lock. Server connections get the "idle" pre-ping policy.
+    """
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}")
+            if read_only:
+                cursor.execute("PRAGMA query_only = ON")
+            else:
+                cursor.execute(f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}")
+                cursor.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+            cursor.close()
+        return
+
+    if config.DB_PRE_PING == "idle":
+        @event.listens_for(engine, "checkin")
+        def remember_checkin(dbapi_connection, connection_record):
+            connection_record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(engine, "checkout")
+        def ping_idle(dbapi_connection, connection_record, connection_proxy):
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < config.DB_PRE_PING_IDLE_SECONDS:
+                return
+            try:
+                engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                # The pool discards this connection and checks out another one.
+                raise DisconnectionError(f"Idle connection failed the ping: {e}") from e
+
+
+class RecentWrites:
+    """
+    Users who wrote in the last `window` seconds, so their reads can skip the replica.
+
+    Shared by the sync and async managers of a process. Other processes (the
+    bot vs the dashboard) do not see each other's marks; the window only
+    covers a user reading right after their own write in the same process.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._written_at = {}
+        self._lock = threading.Lock()
+
+    def mark(self, telegram_id: int):
+        now = time.monotonic()
+        with self._lock:
+            self._written_at[telegram_id] = now
+            if len(self._written_at) > 10000:
+                # Drop expired marks so the dict does not grow with every user ever seen.
+                self._written_at = {k: t for k, t in self._written_at.items() if now - t < self.window}
+
+    def is_recent(self, telegram_id: int) -> bool:
+        written_at = self._written_at.get(telegram_id)
+        return written_at is not None and time.monotonic() - written_at < self.window
+
+
+recent_writes = RecentWrites(config.READ_YOUR_WRITES_SECONDS)
+
+# Set by `read_from_primary()`; checked by every `get_read_session`.
+_force_primary = contextvars.ContextVar("force_primary_reads", default=False)
+
+
+@contextmanager
+def read_from_primary():
+    """Send every read session opened inside the block to the primary (escape hatch for read-your-writes)."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def use_primary_for_reads(telegram_id: int = None) -> bool:
+    """True when a read must not go to the replica: inside `read_from_primary`, or right after the user wrote."""
+    return _force_primary.get() or (telegram_id is not None and recent_writes.is_recent(telegram_id))
+
+
+# Alembic revision this code expects (latest file in migrations/versions).
+# Bump it together with every new migration.
+EXPECTED_SCHEMA_REVISION = "0005"
+
+
+class DatabaseManager:
+    """
+    Central place to manage the SQLAlchemy engine and sessions.
+
+    Nothing touches the database at import time: the engine is created on
+    first use, and the schema is managed by migrations (`python -m
+    scripts.migrate`) instead of `create_all`. Startup only compares the
+    stored schema revision with `EXPECTED_SCHEMA_REVISION`.
+
+    Read-only work (dashboards, reports, summaries) uses `get_read_session`,
+    which goes to the read replica (DATABASE_READ_URL) when one is set.
+    Without a replica, a SQLite file gets a second engine whose connections
+    are query_only; other databases share the main engine. Write methods
+    call `mark_write(telegram_id)` so that user's next reads hit the primary.
+    """
+
+    def __init__(self, database_url: str = None, read_url: str = None):
         # Use the URL from config, which falls back to a local SQLite file.
-        self.database_url = config.DATABASE_URL
-        self._setup_engine()
-        self._create_tables()
+        self.database_url = database_url or config.DATABASE_URL
+        self.read_url = read_url if database_url else config.DATABASE_READ_URL
+        self._engine = None
+        self._read_engine = None
+        self._session_factory = None
+        self._read_session_factory = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._setup_engine()
+        return self._engine
+
+    @property
+    def read_engine(self):
+        if self._read_engine is None:
+            self._setup_engine()
+        return self._read_engine
+
+    @property
+    def SessionLocal(self):
+        if self._session_factory is None:
+            self._setup_engine()
+        return self._session_factory
 
     def _setup_engine(self):
-        """Create the SQLAlchemy engine and session factory."""
-        self.engine = create_engine(
-            self.database_url,
-            pool_pre_ping=True,
-            future=True,
-        )
+        """Create the SQLAlchemy engines and session factories (once, even with concurrent first calls)."""
+        with self._lock:
+            if self._engine is not None:
+                return
+            engine = self._create_engine(self.database_url)
+            read_engine = engine
+            if self.read_url:
+                read_engine = self._create_engine(self.read_url, read_only=True)
+            elif is_sqlite_file(self.database_url):
+                read_engine = self._create_engine(self.database_url, read_only=True)
+
+            self._session_factory = self._sessionmaker(engine)
+            self._read_session_factory = self._sessionmaker(read_engine)
+            self._read_engine = read_engine
+            self._engine = engine
 
-        self.SessionLocal = sessionmaker(
-            bind=self.engine,
+        logger.info("✅ Database engine created successfully")
+
+    def _create_engine(self, database_url, read_only: bool = False):
+        engine = create_engine(database_url, future=True, **engine_options(database_url))
+        tune_engine(engine, read_only=read_only)
+        return engine
+
+    def _sessionmaker(self, engine):
+        return sessionmaker(
+            bind=engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
             future=True,
         )
 
-        logger.info("✅ Database engine created successfully")
+    def configure(self, database_url: str, read_url: str = None):
+        """Point the manager at another database (and replica); the new engines are created on next use."""
+        with self._lock:
+            for engine in {self._engine, self._read_engine} - {None}:
+                engine.dispose()
+            self.database_url = database_url
+            self.read_url = read_url
+            self._engine = None
+            self._read_engine = None
+            self._session_factory = None
+            self._read_session_factory = None
 
     def get_session(self):
         """Return a new database session. Caller is responsible for closing it."""
         return self.SessionLocal()
 
-    def _create_tables(self):
-        """Create all tables defined in SQLAlchemy models, if they do not exist."""
-        try:
-            from models.base import Base
+    def get_read_session(self, telegram_id: int = None):
+        """
+        Return a session for queries that never write.
+
+        Pass the user's `telegram_id` so reads right after their own write
+        (see `mark_write`) are served by the primary instead of a lagging replica.
+        """
+        if use_primary_for_reads(telegram_id):
+            return self.get_session()
+        if self._read_session_factory is None:
+            self._setup_engine()
+        return self._read_session_factory()
+
+    def mark_write(self, telegram_id: int):
+        """Record that the user just wrote, for the read-your-writes window."""
+        if telegram_id is not None:
+            recent_writes.mark(telegram_id)
 
-            Base.metadata.create_all(bind=self.engine)
-            logger.info("🗃️ Database tables checked/created successfully")
-        except Exception as e:
-            logger.error(f"❌ Error while creating tables: {e}")
+    def pool_stats(self) -> dict:
+        """Pool gauges per engine ("primary", plus "read" when reads have their own engine)."""
+        stats = {"primary": pool_stats(self.engine.pool)}
+        if self.read_engine is not self.engine:
+            stats["read"] = pool_stats(self.read_engine.pool)
+        return stats
 
     def test_connection(self):
         """Run a very small query just to confirm the database is reachable."""
@@ -54,5 +342,89 @@ class DatabaseManager:
             session.execute(text("SELECT 1"))
         logger.info("✅ Database connection test passed")
 
+    def get_schema_revision(self):
+        """Return the Alembic revision stored in the database, or None if it was never migrated."""
+        with self.engine.connect() as conn:
+            try:
+                return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            except DBAPIError:
+                return None
+
+    def check_schema(self) -> bool:
+        """True when the database is at `EXPECTED_SCHEMA_REVISION`; logs what to run otherwise."""
+        revision = self.get_schema_revision()
+        if revision == EXPECTED_SCHEMA_REVISION:
+            logger.info(f"✅ Database schema at revision {revision}")
+            return True
+        logger.error(
+            f"❌ Database schema at revision {revision or 'none'}, expected {EXPECTED_SCHEMA_REVISION}. "
+            "Run: python -m scripts.migrate"
+        )
+        return False
+
+
+def upsert_statement(dialect: str, model, key_columns, values: dict = None, increment=(), replace=()):
+    """
+    The INSERT ... ON CONFLICT statement `upsert` runs on SQLite and PostgreSQL.
+
+    Without `values` it is meant for an executemany (see `upsert_many`).
+    """
+    table = model.__table__
+    insert_fn = sqlite_insert if dialect == "sqlite" else postgresql_insert
+    stmt = insert_fn(table)
+    if values is not None:
+        stmt = stmt.values(**values)
+    set_ = {col: table.c[col] + stmt.excluded[col] for col in increment}
+    set_.update({col: stmt.excluded[col] for col in replace})
+    if set_:
+        return stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_)
+    return stmt.on_conflict_do_nothing(index_elements=list(key_columns))
+
+
+def upsert(session, model, values: dict, key_columns, increment=(), replace=()):
+    """
+    Insert a row, or update the existing row with the same `key_columns`.
+
+    On conflict, the `increment` columns are added to (row.col + value) and the
+    `replace` columns are overwritten. SQLite and PostgreSQL do it in one
+    INSERT ... ON CONFLICT statement (the key needs a unique constraint); other
+    databases get an UPDATE followed by an INSERT when no row matched. Runs in
+    the caller's session and transaction; nothing is committed here.
+    """
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        session.execute(upsert_statement(dialect, model, key_columns, values, increment, replace))
+        return
+
+    set_ = {col: table.c[col] + values[col] for col in increment}
+    set_.update({col: values[col] for col in replace})
+    where = [table.c[col] == values[col] for col in key_columns]
+    if set_ and session.execute(update(table).where(*where).values(**set_)).rowcount:
+        return
+    if not set_ and session.execute(table.select().where(*where).limit(1)).first():
+        return
+    session.execute(insert(table).values(**values))
+
+
+def upsert_many(session, model, rows: list, key_columns, increment=(), replace=()):
+    """
+    `upsert` for a list of rows with the same columns.
+
+    On SQLite and PostgreSQL the statement is built once and run for every
+    row in one executemany call; other databases fall back to row by row.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        session.execute(upsert_statement(dialect, model, key_columns, None, increment, replace), rows)
+        return
+
+    for values in rows:
+        upsert(session, model, values, key_columns, increment, replace)
+
 
 db_manager = DatabaseManager()
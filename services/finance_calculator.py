@@ -1,14 +1,17 @@
 import logging
 from datetime import datetime, timedelta
-from services.database import db_manager
-from models.transaction import Transaction
+from sqlalchemy import func
+from services.shard_router import shard_router
+from services.rollup_service import month_bounds
+from models.money import from_cents
+from models.rollup import DailyRollup
 
 logger = logging.getLogger(__name__)
 
 
 class FinanceCalculator:
     def __init__(self):
-        self.db = db_manager
+        self.db = shard_router
     
     def get_monthly_summary(self, telegram_id: int, month: int = None, year: int = None):
         if month is None:
@@ -16,13 +19,15 @@ class FinanceCalculator:
         if year is None:
             year = datetime.now().year
         
-        # Load only the transactions for the requested month and user.
-        transactions = self._get_monthly_transactions(telegram_id, month, year)
-        
-        total_renda = sum(t.amount for t in transactions if t.type == 'renda')
-        total_despesas_fixas = sum(t.amount for t in transactions if t.type == 'despesa_fixa')
-        total_despesas_variaveis = sum(t.amount for t in transactions if t.type == 'despesa_variavel')
-        total_economia = sum(t.amount for t in transactions if t.type == 'economia')
+        totals, count, _ = self._get_monthly_aggregates(telegram_id, month, year)
+        return self._build_summary(month, year, totals, count)
+
+    def _build_summary(self, month: int, year: int, totals: dict, transacoes_count: int):
+        """Build the monthly summary dict from the per-type totals."""
+        total_renda = totals.get('renda', 0)
+        total_despesas_fixas = totals.get('despesa_fixa', 0)
+        total_despesas_variaveis = totals.get('despesa_variavel', 0)
+        total_economia = totals.get('economia', 0)
         
         total_despesas = total_despesas_fixas + total_despesas_variaveis
         
@@ -66,27 +71,68 @@ class FinanceCalculator:
             'media_diaria_sugerida': media_diaria_sugerida,
             'dias_no_mes': dias_no_mes,
             'alertas': alertas,
-            'transacoes_count': len(transactions)
+            'transacoes_count': transacoes_count
         }
     
-    def _get_monthly_transactions(self, telegram_id: int, month: int, year: int):
+    async def get_monthly_summary_async(self, telegram_id: int, month: int = None, year: int = None):
+        """Async version of `get_monthly_summary` for the bot (/resumo)."""
+        if month is None:
+            month = datetime.now().month
+        if year is None:
+            year = datetime.now().year
+
         try:
-            with self.db.get_session() as session:
+            async with self.db.get_async_read_session(telegram_id) as session:
+                rows = await session.run_sync(self._query_monthly_rows, telegram_id, month, year)
+        except Exception as e:
+            logger.error(f"Erro ao buscar transações: {e}")
+            rows = []
+        totals, count, _ = self._aggregate_monthly_rows(rows)
+        return self._build_summary(month, year, totals, count)
+
+    def _get_monthly_aggregates(self, telegram_id: int, month: int, year: int):
+        """
+        Return ({type: total}, transaction count, {day: variable expenses}) for the month.
 
-                # Filter by the user's Telegram ID and the month range.
-                transactions = (
-                    session.query(Transaction)
-                    .filter(
-                        Transaction.telegram_id == telegram_id,
-                        Transaction.date >= f"{year}-{month:02d}-01",
-                        Transaction.date <= f"{year}-{month:02d}-{self._dias_no_mes(month, year)}",
-                    )
-                    .all()
-                )
-                return transactions
+        Read from the daily rollups (see services/rollup_service.py): at most a
+        few rows per day, whatever the size of the user's history, and enough
+        for both the summary and the day-by-day view.
+        """
+        try:
+            with self.db.get_read_session(telegram_id) as session:
+                rows = self._query_monthly_rows(session, telegram_id, month, year)
         except Exception as e:
             logger.error(f"Erro ao buscar transações: {e}")
-            return []
+            rows = []
+        return self._aggregate_monthly_rows(rows)
+
+    def _query_monthly_rows(self, session, telegram_id: int, month: int, year: int):
+        primeiro_dia, proximo_mes = month_bounds(month, year)
+        return (
+            session.query(
+                DailyRollup.type,
+                DailyRollup.date,
+                func.sum(DailyRollup.total_cents),
+                func.sum(DailyRollup.count),
+            )
+            .filter(
+                DailyRollup.telegram_id == telegram_id,
+                DailyRollup.date >= primeiro_dia,
+                DailyRollup.date < proximo_mes,
+            )
+            .group_by(DailyRollup.type, DailyRollup.date)
+            .all()
+        )
+
+    def _aggregate_monthly_rows(self, rows):
+        totals, count, gastos_por_dia = {}, 0, {}
+        for type_, dia, total_cents, quantidade in rows:
+            total = from_cents(total_cents)
+            totals[type_] = totals.get(type_, 0) + total
+            count += quantidade
+            if type_ == 'despesa_variavel':
+                gastos_por_dia[dia.day] = gastos_por_dia.get(dia.day, 0) + total
+        return totals, count, gastos_por_dia
     
     def _dias_no_mes(self, month: int, year: int):
         if month == 12:
@@ -101,26 +147,15 @@ class FinanceCalculator:
         if year is None:
             year = datetime.now().year
         
-        resumo = self.get_monthly_summary(telegram_id, month, year)
+        # Summary and per-day variable expenses come from the same grouped query.
+        totals, count, gastos_por_dia = self._get_monthly_aggregates(telegram_id, month, year)
+        resumo = self._build_summary(month, year, totals, count)
         
         # Current date and basic month info.
         hoje = datetime.now().date()
-        primeiro_dia = datetime(year, month, 1).date()
         dias_no_mes = resumo['dias_no_mes']
         dia_do_mes = hoje.day
         
-        # Load only variable expenses for the month. We use those to build a day-by-day view.
-        transacoes = self._get_monthly_transactions(telegram_id, month, year)
-        gastos_variaveis = [t for t in transacoes if t.type == 'despesa_variavel']
-        
-        # Group variable expenses by day-of-month.
-        gastos_por_dia = {}
-        for transacao in gastos_variaveis:
-            dia = transacao.date.day
-            if dia not in gastos_por_dia:
-                gastos_por_dia[dia] = 0
-            gastos_por_dia[dia] += transacao.amount
-        
         # Build a list that the UI can render (one entry per day).
         saldo_disponivel = resumo['saldo_disponivel']
         media_diaria = resumo['media_diaria_sugerida']
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from sqlalchemy import and_
-from services.database import db_manager
+from services.shard_router import shard_router
 from models.financial_goal import FinancialGoal
 
 logger = logging.getLogger(__name__)
@@ -9,13 +9,13 @@ logger = logging.getLogger(__name__)
 
 class GoalService:
     def __init__(self):
-        self.db = db_manager
+        self.db = shard_router
     
     def create_goal(self, telegram_id: int, name: str, target_amount: float, 
                    deadline: str, category: str = "Outros", priority: int = 1):
         """Create a new financial goal for the given Telegram user."""
         try:
-            with self.db.get_session() as session:
+            with self.db.get_session(telegram_id) as session:
 
                 # Goals are linked to the user using the Telegram ID.
                 goal = FinancialGoal(
@@ -30,6 +30,7 @@ class GoalService:
                 
                 session.add(goal)
                 session.commit()
+                self.db.mark_write(telegram_id)
                 logger.info(f"Meta criada: {name} - R$ {target_amount:.2f}")
                 return True
                 
@@ -37,35 +38,37 @@ class GoalService:
             logger.error(f"Erro ao criar meta: {e}")
             return False
     
-    def update_goal_progress(self, goal_id: int, current_amount: float):
-        """Update the saved progress of a specific goal."""
+    def update_goal_progress(self, goal_id: int, current_amount: float, telegram_id: int):
+        """Update the saved progress of a goal of `telegram_id` (looked up on their shard)."""
         try:
-            with self.db.get_session() as session:
+            with self.db.get_session(telegram_id) as session:
 
                 
-                goal = session.query(FinancialGoal).filter(FinancialGoal.id == goal_id).first()
+                goal = self._find(session, goal_id, telegram_id)
                 if not goal:
                     return False
                 
                 goal.current_amount = current_amount
                 goal.updated_at = datetime.utcnow()
                 session.commit()
+                self.db.mark_write(goal.telegram_id)
                 return True
                 
         except Exception as e:
             logger.error(f"Erro ao atualizar meta: {e}")
             return False
     
-    def delete_goal(self, goal_id: int):
-        """Delete a goal by its ID."""
+    def delete_goal(self, goal_id: int, telegram_id: int):
+        """Delete a goal of `telegram_id` by its ID."""
         try:
-            with self.db.get_session() as session:
+            with self.db.get_session(telegram_id) as session:
 
                 
-                goal = session.query(FinancialGoal).filter(FinancialGoal.id == goal_id).first()
+                goal = self._find(session, goal_id, telegram_id)
                 if goal:
                     session.delete(goal)
                     session.commit()
+                    self.db.mark_write(goal.telegram_id)
                     return True
                 return False
         except Exception as e:
@@ -75,7 +78,7 @@ class GoalService:
     def get_user_goals(self, telegram_id: int, include_completed: bool = True):
         """Return all goals for a user, optionally skipping completed ones."""
         try:
-            with self.db.get_session() as session:
+            with self.db.get_read_session(telegram_id) as session:
 
 
                 query = session.query(FinancialGoal).filter(FinancialGoal.telegram_id == telegram_id)
@@ -95,16 +98,23 @@ class GoalService:
             logger.error(f"Erro ao buscar metas: {e}")
             return []
     
-    def get_goal_by_id(self, goal_id: int):
-        """Fetch a single goal by its database ID."""
+    def get_goal_by_id(self, goal_id: int, telegram_id: int):
+        """Fetch a single goal of `telegram_id` by its database ID."""
         try:
-            with self.db.get_session() as session:
-                from models.financial_goal import FinancialGoal
-                goal = session.query(FinancialGoal).filter(FinancialGoal.id == goal_id).first()
+            with self.db.get_session(telegram_id, for_write=False) as session:
+                goal = self._find(session, goal_id, telegram_id)
                 return goal.to_dict() if goal else None
         except Exception as e:
             logger.error(f"Erro ao buscar meta: {e}")
             return None
 
+    def _find(self, session, goal_id: int, telegram_id: int):
+        # Ids are only unique within one shard, so always restrict to the owner.
+        return (
+            session.query(FinancialGoal)
+            .filter(FinancialGoal.id == goal_id, FinancialGoal.telegram_id == telegram_id)
+            .first()
+        )
+
 # Global instance so other modules can import `goal_service` directly.
 goal_service = GoalService()
\ No newline at end of file
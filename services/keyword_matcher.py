@@ -0,0 +1,123 @@
+import re
+
+
+# Section priority used to resolve conflicts when a message hits keywords from
+# several sections (e.g. "presente" is both an income and a variable expense).
+# Lower index wins, mirroring the order the old nested loops were checked in.
+SECTION_PRIORITY = ('rendas', 'economia', 'despesas_fixas', 'despesas_variaveis')
+
+# Transaction type and confidence reported for a hit in each section.
+SECTION_RESULTS = {
+    'rendas': ("renda", 0.9),
+    'economia': ("economia", 0.9),
+    'despesas_fixas': ("despesa_fixa", 0.8),
+    'despesas_variaveis': ("despesa_variavel", 0.7),
+}
+
+
+def _trie_pattern(words) -> str:
+    """
+    Build a regex from a character trie of `words`.
+
+    Shared prefixes are factored out ("mercado|metro" -> "me(?:rcado|tro)"), so
+    the regex engine does not retry every keyword at each position, and the
+    cost stays flat as the tables grow. Optional groups are greedy, so the
+    longest keyword wins on overlaps.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        terminal = "" in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            branches.append(re.escape(char) + build(node[char]))
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+
+    return build(trie)
+
+
+def _word_pattern(words) -> str:
+    """
+    The trie regex of `words`, matching whole words only.
+
+    A keyword must start and end on a word boundary, so "bar" does not match
+    inside "barbearia" nor "etf" inside "netflix". A plural "s"/"es" is allowed
+    ("mercados", "bares"). The lookarounds use Unicode `\\w`, so accented pt-BR
+    letters count as part of a word ("água" is not matched inside "deságua").
+    """
+    return r"(?<!\w)(?P<keyword>" + _trie_pattern(words) + r")(?:e?s)?(?!\w)"
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher for the category keyword tables.
+
+    All keywords are folded into a single trie-shaped regex, so a message is
+    scanned once no matter how many keywords or categories exist. Every hit is
+    collected and the winner is chosen with explicit rules:
+
+    1. Section priority (`SECTION_PRIORITY`).
+    2. Inside a section, the keyword that appears first in the message.
+    3. Overlapping keywords resolve to the longest one ("fundo de investimento"
+       beats "investimento"), because the regex is greedy.
+
+    Only whole words (or their plural) match, see `_word_pattern`.
+    """
+
+    def __init__(self, categories: dict):
+        self.categories = categories
+        # keyword -> list of (section, category) pairs that declare it.
+        self._owners = {}
+        for section in SECTION_PRIORITY:
+            for category, keywords in categories.get(section, {}).items():
+                for keyword in keywords:
+                    owners = self._owners.setdefault(keyword.lower(), [])
+                    if (section, category) not in owners:
+                        owners.append((section, category))
+
+        self._pattern = re.compile(_word_pattern(self._owners)) if self._owners else None
+
+    def find_all(self, message: str):
+        """Return every (position, keyword, section, category) hit in a single pass."""
+        if self._pattern is None:
+            return []
+        hits = []
+        for match in self._pattern.finditer(message.lower()):
+            keyword = match.group("keyword")
+            for section, category in self._owners[keyword]:
+                hits.append((match.start(), keyword, section, category))
+        return hits
+
+    def match(self, message: str):
+        """
+        Return the winning hit as a dict with category, type and confidence,
+        or None when no keyword is present in the message.
+        """
+        best = None
+        best_rank = None
+        for position, keyword, section, category in self.find_all(message):
+            rank = (SECTION_PRIORITY.index(section), position)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (keyword, section, category), rank
+
+        if best is None:
+            return None
+
+        keyword, section, category = best
+        type_, confidence = SECTION_RESULTS[section]
+        return {
+            "category": category,
+            "type": type_,
+            "confidence": confidence,
+            "keyword": keyword,
+        }
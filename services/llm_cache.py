@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from services.message_lexer import ParsedMessage
+
+logger = logging.getLogger(__name__)
+
+
+def message_template(parsed: ParsedMessage) -> str:
+    """
+    Normalize a lexed message into a cache key.
+
+    Dates are replaced by a placeholder and words are lowercased, so
+    "Uber ontem" and "uber 12/03" share the key "uber <data>". Only messages
+    in which the lexer found no amount reach the external client, so the key
+    keeps every other word: an amount written out ("cinquenta") stays part of
+    it, and the cached amount is the one for that text.
+    """
+    parts = []
+    for token in parsed.tokens:
+        if token.kind == "date":
+            parts.append("<data>")
+        else:
+            parts.append(token.text.lower())
+    return " ".join(parts)
+
+
+class LLMCache:
+    """
+    Two-tier cache for external categorization results.
+
+    - Memory tier: an LRU (`OrderedDict`) bounded by `max_entries`.
+    - Disk tier: a small SQLite file bounded by `disk_max_entries`, so warm
+      entries survive restarts. Disk hits are promoted to memory and keep
+      their original expiry.
+
+    Both tiers expire entries `ttl_seconds` after they were stored. Values must
+    be JSON-serializable. Pass `path=None` to keep the cache in memory only.
+    `get_async`/`set_async` run the disk tier in a worker thread, for callers
+    on an event loop.
+    """
+
+    # How many writes happen between two disk trims (expired rows + size bound).
+    TRIM_EVERY = 100
+
+    def __init__(self, path: str = None, max_entries: int = 2000, ttl_seconds: float = 7 * 24 * 3600,
+                 disk_max_entries: int = 50000, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._clock = clock
+        self._memory = OrderedDict()
+        # Memory tier and stats; never held during disk I/O, so the event loop does not wait on SQLite.
+        self._lock = threading.Lock()
+        # The SQLite connection, shared by worker threads.
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        self._writes_since_trim = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    # ---------------- Public API ----------------
+    def get(self, key: str):
+        now = self._clock()
+        found, value = self._memory_get(key, now)
+        if found:
+            return value
+        return self._promote(key, self._disk_get(key, now))
+
+    async def get_async(self, key: str):
+        """Same as `get`; a memory miss reads the disk tier in a worker thread."""
+        now = self._clock()
+        found, value = self._memory_get(key, now)
+        if found:
+            return value
+        entry = await asyncio.to_thread(self._disk_get, key, now) if self.path else None
+        return self._promote(key, entry)
+
+    def set(self, key: str, value):
+        now = self._clock()
+        self._store(key, value, now)
+        self._disk_set(key, value, now)
+
+    async def set_async(self, key: str, value):
+        """Same as `set`; the disk write runs in a worker thread."""
+        now = self._clock()
+        self._store(key, value, now)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, value, now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters plus the hit ratio, i.e. the share of external calls saved."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    # ---------------- Memory tier ----------------
+    def _memory_get(self, key, now):
+        """(True, value) on a memory hit, else (False, None)."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return True, value
+            del self._memory[key]
+            self.stats["expired"] += 1
+            return False, None
+
+    def _promote(self, key, entry):
+        """Count a disk hit or miss; a hit goes to memory with the expiry it had on disk."""
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            self._memory_set(key, value, expires_at)
+            self.stats["disk_hits"] += 1
+            return value
+
+    def _store(self, key, value, now):
+        with self._lock:
+            self._memory_set(key, value, now + self.ttl_seconds)
+            self.stats["stores"] += 1
+
+    def _memory_set(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ---------------- Disk tier ----------------
+    def _connection(self):
+        """Open the SQLite file on first use, so importing the module does no I/O."""
+        if not self.path:
+            return None
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_stored_at ON llm_cache (stored_at)")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Could not open LLM cache file {self.path}: {e}. Using memory only.")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _disk_get(self, key, now):
+        """(value, expires_at) of a live disk entry, or None."""
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error while reading LLM cache: {e}")
+                return None
+        if row is None:
+            return None
+        if row[1] <= now:
+            with self._lock:
+                self.stats["expired"] += 1
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _disk_set(self, key, value, now):
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now + self.ttl_seconds, now),
+                )
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= self.TRIM_EVERY:
+                    self._trim_disk(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error while writing LLM cache: {e}")
+
+    def _trim_disk(self, conn, now):
+        self._writes_since_trim = 0
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.disk_max_entries
+        if overflow > 0:
+            # Oldest entries go first.
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY stored_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            with self._lock:
+                self.stats["evictions"] += overflow
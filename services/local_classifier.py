@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import zlib
+
+import numpy as np
+
+from services.category_memory import normalize_description
+
+logger = logging.getLogger(__name__)
+
+# Labels are stored as "type|category" so one model predicts both fields.
+LABEL_SEPARATOR = "|"
+
+
+def feature_indices(text: str, n_features: int, n_min: int = 3, n_max: int = 4) -> np.ndarray:
+    """
+    Hash the character n-grams of each word (plus the word itself) into column indices.
+
+    crc32 is used instead of `hash()` because it is stable across processes,
+    so the training script and the bot agree on the columns.
+    """
+    grams = []
+    for word in normalize_description(text).split():
+        padded = f" {word} "
+        grams.append(word)
+        for n in range(n_min, n_max + 1):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return np.fromiter((zlib.crc32(g.encode()) % n_features for g in grams), dtype=np.int64, count=len(grams))
+
+
+class NaiveBayesTrainer:
+    """
+    Accumulates hashed n-gram counts per label, one row at a time, so training
+    streams over the transactions table without holding it in memory.
+    """
+
+    def __init__(self, n_features: int = 2 ** 17, alpha: float = 0.5):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.labels = []
+        self._label_index = {}
+        self._counts = []
+        self._docs = []
+
+    def add(self, description: str, type_: str, category: str, weight: float = 1.0):
+        indices = feature_indices(description, self.n_features)
+        if not indices.size:
+            return
+        label = f"{type_}{LABEL_SEPARATOR}{category}"
+        row = self._label_index.get(label)
+        if row is None:
+            row = self._label_index[label] = len(self.labels)
+            self.labels.append(label)
+            self._counts.append(np.zeros(self.n_features, dtype=np.float64))
+            self._docs.append(0.0)
+        np.add.at(self._counts[row], indices, weight)
+        self._docs[row] += weight
+
+    def save(self, path: str) -> int:
+        """
+        Write the model and return the number of labels.
+
+        The float32 matrix goes to `path` as .npy, so it can be memory-mapped.
+        Row 0 holds the log-priors and row 1 + i the log-likelihoods of feature
+        i for every label, so a prediction reads one short row per n-gram.
+        Labels and settings go to `path + ".json"`. Both are written to temporary
+        files and swapped in with os.replace, so a running bot never reads a
+        half-written model.
+        """
+        if not self.labels:
+            raise ValueError("no training rows")
+
+        counts = np.vstack(self._counts) + self.alpha
+        log_likelihood = np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))
+        docs = np.asarray(self._docs)
+        log_prior = np.log(docs / docs.sum())
+
+        matrix = np.empty((self.n_features + 1, len(self.labels)), dtype=np.float32)
+        matrix[0] = log_prior
+        matrix[1:] = log_likelihood.T
+
+        meta = {"labels": self.labels, "n_features": self.n_features, "rows": float(docs.sum())}
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, matrix)
+        with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+        os.replace(path + ".json.tmp", path + ".json")
+        return len(self.labels)
+
+
+class LocalClassifier:
+    """Memory-mapped naive Bayes model used between the regex stage and the external client."""
+
+    def __init__(self, matrix, labels: list, n_features: int):
+        self.labels = labels
+        self.n_features = n_features
+        self._log_prior = np.asarray(matrix[0], dtype=np.float64)
+        self._log_likelihood = matrix[1:]
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a model written by `NaiveBayesTrainer.save`, or return None if it is missing or invalid."""
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Local classifier not loaded from {path}: {e}")
+            return None
+        if matrix.shape != (meta["n_features"] + 1, len(meta["labels"])):
+            # Caught between the two os.replace calls of a retrain; the next check reloads it.
+            logger.warning("Local classifier files do not match, skipping this version")
+            return None
+        return cls(matrix, meta["labels"], meta["n_features"])
+
+    def predict(self, description: str):
+        """Return (type, category, probability) for the best label, or None if the text has no features."""
+        indices = feature_indices(description, self.n_features)
+        if not indices.size:
+            return None
+        scores = self._log_prior + self._log_likelihood[indices].sum(axis=0)
+        best = int(scores.argmax())
+        # Softmax of the winner only: 1 / sum(exp(s - s_best)).
+        probability = 1.0 / float(np.exp(scores - scores[best]).sum())
+        type_, category = self.labels[best].split(LABEL_SEPARATOR, 1)
+        return type_, category, probability
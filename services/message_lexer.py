@@ -0,0 +1,144 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+
+# One master pattern, tried left to right at each position. Order matters:
+# dates come before money so "15/03" is never read as an amount, and the
+# decimal-dot money form comes before the thousands form so "45.50" stays 45.5
+# while "2.500" becomes 2500.
+_TOKEN_PATTERN = re.compile(
+    r"""
+      (?P<date_rel>\b(?:anteontem|ontem|hoje)\b)
+    | (?P<date_abs>\b\d{1,2}/\d{1,2}(?:/\d{2}(?:\d{2})?)?\b)
+    | (?P<money>
+          (?:R\$\s*)?
+          (?:
+              \d+\.\d{1,2}(?![\d.,])              # 45.50 (decimal dot)
+            | \d{1,3}(?:\.\d{3})+(?:,\d{1,2})?    # 1.234,56 / 2.500
+            | \d+(?:,\d{1,2})?                    # 45,50 / 1500
+          )
+          (?!\d)
+      )
+    | (?P<currency>R\$)
+    | (?P<word>[^\s\d]+)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_RELATIVE_DAYS = {"hoje": 0, "ontem": 1, "anteontem": 2}
+
+
+@dataclass
+class Token:
+    """A typed piece of a message: "money", "date" or "word"."""
+
+    kind: str
+    text: str
+    value: object = None
+
+
+@dataclass
+class ParsedMessage:
+    """Result of lexing a message once: every token plus the fields the parser needs."""
+
+    tokens: list = field(default_factory=list)
+    amount: float = None
+    date: date = None
+    description: str = ""
+
+
+def parse_money(text: str):
+    """Convert a pt-BR money string ("R$ 1.234,56", "2.500", "45.50") into a float."""
+    number = re.sub(r"^R\$\s*", "", text.strip(), flags=re.IGNORECASE)
+    if "," in number:
+        # Comma is the decimal separator, any dot is a thousands separator.
+        number = number.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"\d{1,3}(?:\.\d{3})+", number):
+        number = number.replace(".", "")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_date(text: str, today: date = None):
+    """Convert "hoje"/"ontem"/"anteontem" or "DD/MM[/AA[AA]]" into a date, or None if invalid."""
+    today = today or date.today()
+    lowered = text.lower()
+    if lowered in _RELATIVE_DAYS:
+        return today - timedelta(days=_RELATIVE_DAYS[lowered])
+
+    parts = lowered.split("/")
+    try:
+        day, month = int(parts[0]), int(parts[1])
+        if len(parts) == 3:
+            year = int(parts[2])
+            if year < 100:
+                year += 2000
+            return date(year, month, day)
+        parsed = date(today.year, month, day)
+    except (ValueError, IndexError):
+        return None
+
+    # Without a year, a date in the future most likely refers to last year ("28/12" typed in January).
+    if parsed > today:
+        try:
+            parsed = parsed.replace(year=today.year - 1)
+        except ValueError:
+            return None
+    return parsed
+
+
+def tokenize(message: str, today: date = None):
+    """Scan the message once and return its list of typed tokens."""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(message):
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == "money":
+            tokens.append(Token("money", text, parse_money(text)))
+        elif kind in ("date_rel", "date_abs"):
+            value = parse_date(text, today)
+            # Impossible dates such as "31/02" are kept as plain words.
+            tokens.append(Token("date", text, value) if value else Token("word", text))
+        elif kind == "word":
+            tokens.append(Token("word", text))
+        # A lone "R$" carries no information once amounts are tokenized.
+    return tokens
+
+
+def _money_rank(token: Token):
+    """Preference for picking the amount: "R$ ..." first, then values with cents, then anything."""
+    has_currency = token.text.upper().startswith("R$")
+    has_cents = re.search(r"[.,]\d{1,2}$", token.text) is not None
+    return (not has_currency, not has_cents)
+
+
+def parse_message(message: str, today: date = None) -> ParsedMessage:
+    """
+    Lex a free text message and pick the amount, the first date and the
+    remaining words as the description.
+
+    The amount follows the same preference the old regex cascade had: an
+    explicit "R$" value, then a value with cents, then the first number.
+    Other numbers stay in the description ("2 camisas 99,90").
+    """
+    tokens = tokenize(message, today)
+    parsed = ParsedMessage(tokens=tokens)
+
+    money = [t for t in tokens if t.kind == "money" and t.value is not None]
+    chosen = min(money, key=_money_rank) if money else None
+    if chosen is not None:
+        parsed.amount = chosen.value
+
+    words = []
+    for token in tokens:
+        if token is chosen:
+            continue
+        if token.kind == "date" and parsed.date is None:
+            parsed.date = token.value
+            continue
+        words.append(token.text)
+    parsed.description = " ".join(words)
+    return parsed
@@ -0,0 +1,51 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, cheap enough to update on every request.
+
+    `buckets` are the upper bounds (inclusive) of each bucket; values above the
+    last bound fall into an implicit "+Inf" bucket.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+            if self._max is None or value > self._max:
+                self._max = value
+
+    def percentile(self, p: float):
+        """Approximate percentile (0-100): the upper bound of the bucket that contains it."""
+        with self._lock:
+            if not self._count:
+                return None
+            target = self._count * p / 100
+            seen = 0
+            for bound, count in zip(self.buckets + [self._max], self._counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return self._max
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [str(b) for b in self.buckets] + ["+Inf"]
+            return {
+                "buckets": dict(zip(labels, self._counts)),
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "max": self._max,
+            }
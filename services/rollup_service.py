@@ -0,0 +1,211 @@
+import logging
+from datetime import date
+
+from sqlalchemy import Integer, cast, delete, func, insert, select
+
+from models.category import Category
+from models.money import from_cents
+from models.rollup import DailyRollup, MonthlyRollup
+from models.transaction import Transaction
+from services.database import upsert, upsert_many, upsert_statement
+from services.shard_router import shard_router
+
+logger = logging.getLogger(__name__)
+
+# Fields of a transaction that decide which rollup rows it counts in.
+ROLLUP_FIELDS = ("telegram_id", "date", "type", "category_id", "amount_cents")
+
+EXPENSE_TYPES = ("despesa_fixa", "despesa_variavel")
+
+# Unique keys of the rollup tables and the columns added up on conflict.
+DAILY_KEY = ("telegram_id", "date", "type", "category_id")
+MONTHLY_KEY = ("telegram_id", "year", "month", "type", "category_id")
+ROLLUP_TOTALS = ("total_cents", "count")
+
+
+def rollup_key(transaction) -> tuple:
+    """Snapshot of the fields the rollups depend on, taken before an edit."""
+    return tuple(getattr(transaction, field) for field in ROLLUP_FIELDS)
+
+
+def month_bounds(month: int, year: int):
+    """First day of the month and first day of the next month."""
+    return date(year, month, 1), date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+
+class RollupService:
+    """
+    Keeps `daily_rollups` and `monthly_rollups` in step with `transactions`.
+
+    The `record_*` methods run inside the caller's session, so the rollup
+    deltas are committed (or rolled back) together with the transaction row.
+    `rebuild` recomputes everything from scratch for repairs and backfills.
+    """
+
+    def __init__(self):
+        self.db = shard_router
+
+    # ---------------- Incremental updates ----------------
+    def record_create(self, session, transaction):
+        self._apply(session, rollup_key(transaction), 1)
+
+    def record_delete(self, session, transaction):
+        self._apply(session, rollup_key(transaction), -1)
+
+    def create_statements(self, dialect: str, key: tuple) -> list:
+        """
+        The upserts `record_create` runs for a transaction with this `rollup_key`, as statements (SQLite and
+        PostgreSQL), for callers that send them as part of a larger statement.
+        """
+        telegram_id, day, type_, category_id, amount_cents = key
+        group = {"telegram_id": telegram_id, "type": type_, "category_id": category_id,
+                 "total_cents": amount_cents, "count": 1}
+        return [
+            upsert_statement(dialect, DailyRollup, DAILY_KEY, {**group, "date": day}, increment=ROLLUP_TOTALS),
+            upsert_statement(dialect, MonthlyRollup, MONTHLY_KEY, {**group, "year": day.year, "month": day.month},
+                             increment=ROLLUP_TOTALS),
+        ]
+
+    def record_update(self, session, old_key: tuple, transaction):
+        """Move an edited transaction between rollup rows (day, category, type or amount changed)."""
+        new_key = rollup_key(transaction)
+        if new_key == old_key:
+            return
+        self._apply(session, old_key, -1)
+        self._apply(session, new_key, 1)
+
+    def record_many(self, session, rows):
+        """
+        Count many new transactions (dicts with the ROLLUP_FIELDS) at once.
+
+        The rows are summed per day and per month first, then each table gets
+        a single upsert statement run for all the groups (see `upsert_many`).
+        """
+        daily, monthly = {}, {}
+        for row in rows:
+            day = row["date"]
+            for groups, key in (
+                (daily, (row["telegram_id"], day, row["type"], row["category_id"])),
+                (monthly, (row["telegram_id"], day.year, day.month, row["type"], row["category_id"])),
+            ):
+                total_cents, count = groups.get(key, (0, 0))
+                groups[key] = (total_cents + row["amount_cents"], count + 1)
+
+        upsert_many(session, DailyRollup, [
+            {"telegram_id": telegram_id, "date": day, "type": type_, "category_id": category_id,
+             "total_cents": total_cents, "count": count}
+            for (telegram_id, day, type_, category_id), (total_cents, count) in daily.items()
+        ], DAILY_KEY, increment=ROLLUP_TOTALS)
+        upsert_many(session, MonthlyRollup, [
+            {"telegram_id": telegram_id, "year": year, "month": month, "type": type_, "category_id": category_id,
+             "total_cents": total_cents, "count": count}
+            for (telegram_id, year, month, type_, category_id), (total_cents, count) in monthly.items()
+        ], MONTHLY_KEY, increment=ROLLUP_TOTALS)
+
+    def _apply(self, session, key: tuple, sign: int):
+        telegram_id, day, type_, category_id, amount_cents = key
+        delta = {"total_cents": sign * amount_cents, "count": sign}
+        daily = {"telegram_id": telegram_id, "date": day, "type": type_, "category_id": category_id}
+        monthly = {"telegram_id": telegram_id, "year": day.year, "month": day.month, "type": type_,
+                   "category_id": category_id}
+
+        upsert(session, DailyRollup, {**daily, **delta}, daily.keys(), increment=delta.keys())
+        upsert(session, MonthlyRollup, {**monthly, **delta}, monthly.keys(), increment=delta.keys())
+        if sign < 0:
+            # Drop rows whose last transaction went away, so reads never see empty groups.
+            session.execute(delete(DailyRollup).filter_by(**daily).where(DailyRollup.count <= 0))
+            session.execute(delete(MonthlyRollup).filter_by(**monthly).where(MonthlyRollup.count <= 0))
+
+    # ---------------- Reads ----------------
+    def get_monthly_totals(self, telegram_id: int, month: int, year: int, types=None):
+        """Return [{"type", "category", "total", "count"}] for the month, one entry per type/category."""
+        try:
+            with self.db.get_read_session(telegram_id) as session:
+                query = session.query(
+                    MonthlyRollup.type, Category.name, MonthlyRollup.total_cents, MonthlyRollup.count
+                ).join(Category, Category.id == MonthlyRollup.category_id).filter(
+                    MonthlyRollup.telegram_id == telegram_id,
+                    MonthlyRollup.year == year,
+                    MonthlyRollup.month == month,
+                )
+                if types:
+                    query = query.filter(MonthlyRollup.type.in_(types))
+                return [
+                    {"type": type_, "category": category, "total": from_cents(total), "count": count}
+                    for type_, category, total, count in query.all()
+                ]
+        except Exception as e:
+            logger.error(f"Erro ao buscar totais mensais: {e}")
+            return []
+
+    # ---------------- Repair ----------------
+    def rebuild(self, telegram_id: int = None) -> int:
+        """
+        Recompute the rollups from `transactions` (all users, or one) and return the daily row count.
+
+        Runs as DELETE + INSERT ... SELECT in a single transaction per shard, so
+        readers see either the old or the new rollups. All users means every
+        shard, rebuilt in parallel.
+        """
+        if telegram_id is not None:
+            with self.db.get_session(telegram_id) as session:
+                return self.rebuild_in(session, telegram_id)
+        return sum(self.db.fan_out(self.rebuild_in, read=False).values())
+
+    def rebuild_in(self, session, telegram_id: int = None) -> int:
+        """`rebuild` on one database, in the given session (committed here)."""
+        daily_delete, monthly_delete = delete(DailyRollup), delete(MonthlyRollup)
+        source = select(
+            Transaction.telegram_id,
+            Transaction.date,
+            Transaction.type,
+            Transaction.category_id,
+            func.sum(Transaction.amount_cents),
+            func.count(Transaction.id),
+        )
+        if telegram_id is not None:
+            daily_delete = daily_delete.where(DailyRollup.telegram_id == telegram_id)
+            monthly_delete = monthly_delete.where(MonthlyRollup.telegram_id == telegram_id)
+            source = source.where(Transaction.telegram_id == telegram_id)
+        source = source.group_by(Transaction.telegram_id, Transaction.date, Transaction.type, Transaction.category_id)
+
+        session.execute(daily_delete)
+        session.execute(monthly_delete)
+        session.execute(
+            insert(DailyRollup).from_select(
+                ["telegram_id", "date", "type", "category_id", "total_cents", "count"], source
+            )
+        )
+
+        # Months are summed from the fresh daily rows, so both tables always agree.
+        year = func.extract("year", DailyRollup.date)
+        month = func.extract("month", DailyRollup.date)
+        monthly_source = select(
+            DailyRollup.telegram_id,
+            cast(year, Integer),
+            cast(month, Integer),
+            DailyRollup.type,
+            DailyRollup.category_id,
+            func.sum(DailyRollup.total_cents),
+            func.sum(DailyRollup.count),
+        )
+        if telegram_id is not None:
+            monthly_source = monthly_source.where(DailyRollup.telegram_id == telegram_id)
+        monthly_source = monthly_source.group_by(
+            DailyRollup.telegram_id, year, month, DailyRollup.type, DailyRollup.category_id
+        )
+        session.execute(
+            insert(MonthlyRollup).from_select(
+                ["telegram_id", "year", "month", "type", "category_id", "total_cents", "count"], monthly_source
+            )
+        )
+
+        query = session.query(func.count(DailyRollup.id))
+        if telegram_id is not None:
+            query = query.filter(DailyRollup.telegram_id == telegram_id)
+        rows = query.scalar()
+        session.commit()
+        return rows
+
+
+rollup_service = RollupService()
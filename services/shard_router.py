@@ -0,0 +1,222 @@
+# services/shard_router.py
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+
+from config.config import config
+from models.user import User
+from models.user_shard import UserShard
+from services.async_database import AsyncDatabaseManager, async_db_manager
+from services.database import DatabaseManager, db_manager, recent_writes, upsert
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD = "default"
+
+
+class ShardMovingError(RuntimeError):
+    """The user's rows are being moved to another shard; their writes must wait until it finishes."""
+
+
+def parse_shards(spec: str) -> dict:
+    """Parse DATABASE_SHARDS ("name=url,name=url") into {name: url}."""
+    shards = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise ValueError(f"Invalid shard '{item}', expected name=url")
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+class HashRing:
+    """Consistent hash ring: adding a shard only remaps about 1/N of the keys."""
+
+    def __init__(self, names, replicas: int = 100):
+        points = sorted(
+            (self._hash(f"{name}#{i}"), name) for name in names for i in range(replicas)
+        )
+        self._keys = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        # md5 only spreads the keys; Python's hash() changes between processes.
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def lookup(self, key) -> str:
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._keys)
+        return self._names[index]
+
+
+class ShardRouter:
+    """
+    Routes each user's sessions to the database that holds their rows.
+
+    DATABASE_URL is the "default" shard and also holds the shard directory
+    (`user_shards`). Extra shards come from DATABASE_SHARDS. The first time a
+    user is seen, the directory records where they live: users that already
+    exist on the default shard stay there, new users are placed by a
+    consistent hash ring. Directory entries are cached for
+    SHARD_DIRECTORY_CACHE_SECONDS; while a user is being moved
+    (`scripts.shards move`), reads keep going to the old shard and writes
+    raise `ShardMovingError`.
+
+    With a single database the router hands out `db_manager` and
+    `async_db_manager` directly, without touching the directory.
+
+    Rows fetched by id (a transaction, a goal) are always looked up with
+    their owner's telegram_id: ids are only unique within one database, and
+    the owner filter keeps one user from reaching another's row.
+    """
+
+    def __init__(self, shard_urls: dict = None):
+        self.managers = {DEFAULT_SHARD: db_manager}
+        self.async_managers = {DEFAULT_SHARD: async_db_manager}
+        for name, url in (shard_urls or {}).items():
+            if name == DEFAULT_SHARD:
+                raise ValueError(f"'{DEFAULT_SHARD}' is the DATABASE_URL shard, pick another name")
+            self.managers[name] = DatabaseManager(url)
+            self.async_managers[name] = AsyncDatabaseManager(url)
+        self.ring = HashRing(self.managers)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.managers) > 1
+
+    @property
+    def names(self):
+        return list(self.managers)
+
+    # ---------------- Placement ----------------
+    def shard_for(self, telegram_id: int, for_write: bool = False) -> str:
+        """Name of the user's shard; registers new users in the directory."""
+        if not self.sharded or telegram_id is None:
+            return DEFAULT_SHARD
+        entry = self._cached(telegram_id)
+        if entry is None:
+            entry = self._load_or_assign(telegram_id)
+        return self._check(telegram_id, entry, for_write)
+
+    async def shard_for_async(self, telegram_id: int, for_write: bool = False) -> str:
+        if not self.sharded or telegram_id is None:
+            return DEFAULT_SHARD
+        entry = self._cached(telegram_id)
+        if entry is None:
+            async with async_db_manager.get_session() as session:
+                entry = await session.run_sync(self._directory_entry, telegram_id)
+            self._remember(telegram_id, entry)
+        return self._check(telegram_id, entry, for_write)
+
+    def _check(self, telegram_id: int, entry: tuple, for_write: bool) -> str:
+        shard, moving = entry
+        if moving and for_write:
+            raise ShardMovingError(f"User {telegram_id} is being moved from shard '{shard}'")
+        return shard
+
+    def _cached(self, telegram_id: int):
+        with self._lock:
+            cached = self._cache.get(telegram_id)
+        if cached and time.monotonic() - cached[1] < config.SHARD_DIRECTORY_CACHE_SECONDS:
+            return cached[0]
+        return None
+
+    def _remember(self, telegram_id: int, entry: tuple):
+        with self._lock:
+            self._cache[telegram_id] = (entry, time.monotonic())
+            if len(self._cache) > 100000:
+                self._cache.clear()
+
+    def _load_or_assign(self, telegram_id: int) -> tuple:
+        with db_manager.get_session() as session:
+            entry = self._directory_entry(session, telegram_id)
+        self._remember(telegram_id, entry)
+        return entry
+
+    def _directory_entry(self, session, telegram_id: int) -> tuple:
+        """(shard, moving) from the directory, adding the entry the first time the user is seen."""
+        row = session.get(UserShard, telegram_id)
+        if row is None:
+            # Users created before sharding live on the default shard.
+            legacy = session.execute(select(User.id).where(User.telegram_id == telegram_id)).first()
+            shard = DEFAULT_SHARD if legacy else self.ring.lookup(telegram_id)
+            # INSERT ... ON CONFLICT DO NOTHING: another process may register the user at the same time.
+            upsert(session, UserShard, {"telegram_id": telegram_id, "shard": shard, "moving": False},
+                   key_columns=("telegram_id",))
+            session.commit()
+            row = session.get(UserShard, telegram_id, populate_existing=True)
+        return row.shard, row.moving
+
+    def set_placement(self, telegram_id: int, shard: str, moving: bool):
+        """Point the directory at `shard` (used by the move tool); other processes see it after the cache TTL."""
+        with db_manager.get_session() as session:
+            upsert(session, UserShard, {"telegram_id": telegram_id, "shard": shard, "moving": moving},
+                   key_columns=("telegram_id",), replace=("shard", "moving"))
+            session.commit()
+        self._remember(telegram_id, (shard, moving))
+
+    # ---------------- Sessions ----------------
+    def manager_for(self, telegram_id: int, for_write: bool = True) -> DatabaseManager:
+        return self.managers[self.shard_for(telegram_id, for_write)]
+
+    def get_session(self, telegram_id: int = None, for_write: bool = True):
+        """
+        Session on the user's primary shard (the default shard when no user is given).
+
+        Pass `for_write=False` for reads that must see the primary but should
+        not fail while the user is being moved.
+        """
+        return self.manager_for(telegram_id, for_write).get_session()
+
+    def get_read_session(self, telegram_id: int = None):
+        return self.manager_for(telegram_id, for_write=False).get_read_session(telegram_id)
+
+    def mark_write(self, telegram_id: int):
+        if telegram_id is not None:
+            recent_writes.mark(telegram_id)
+
+    @asynccontextmanager
+    async def get_async_session(self, telegram_id: int = None, for_write: bool = True):
+        """`async with shard_router.get_async_session(telegram_id) as session` on the user's shard."""
+        manager = self.async_managers[await self.shard_for_async(telegram_id, for_write)]
+        async with manager.get_session() as session:
+            yield session
+
+    @asynccontextmanager
+    async def get_async_read_session(self, telegram_id: int = None):
+        manager = self.async_managers[await self.shard_for_async(telegram_id)]
+        async with manager.get_read_session(telegram_id) as session:
+            yield session
+
+    # ---------------- Fan-out ----------------
+    def fan_out(self, fn, read: bool = True) -> dict:
+        """
+        Run `fn(session)` on every shard in parallel and return {shard name: result}.
+
+        For admin aggregations across all users; each call gets its own
+        session (a read session unless `read` is False).
+        """
+        def run(manager):
+            with (manager.get_read_session() if read else manager.get_session()) as session:
+                return fn(session)
+
+        if not self.sharded:
+            return {DEFAULT_SHARD: run(db_manager)}
+        with ThreadPoolExecutor(max_workers=len(self.managers)) as pool:
+            futures = {name: pool.submit(run, manager) for name, manager in self.managers.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    async def dispose_async(self):
+        for manager in self.async_managers.values():
+            await manager.dispose()
+
+
+shard_router = ShardRouter(parse_shards(config.DATABASE_SHARDS))
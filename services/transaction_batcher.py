@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+
+from models.user import User
+from services.metrics import Histogram
+from services.rollup_service import rollup_service
+from services.shard_router import shard_router
+from services.users_service import PROFILE_CREATED, UsersService
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionWriteBatcher:
+    """
+    Write-behind queue for the transactions the bot creates.
+
+    `submit` queues a new Transaction (and its sender's Telegram profile) and
+    waits until it is committed. Rows are grouped per shard and a batch is
+    written when `window_ms` has passed since its first row or when
+    `max_rows` are waiting, whichever comes first: one profile upsert, one
+    flush (the ORM sends a single multi-row INSERT ... RETURNING where the
+    driver supports it), one rollup upsert per table and one commit for the
+    whole batch.
+
+    Only one batch per shard is written at a time; rows arriving during a
+    commit form the next batch, so batches grow with the load (group
+    commit). A caller is answered only after its batch committed. If the
+    commit fails, every caller in the batch gets the exception and none of
+    their rows were written. Profile changes are logged once their batch is
+    committed, like `UsersService` does. `close` writes whatever is still queued.
+    """
+
+    def __init__(self, window_ms: float = 10, max_rows: int = 100):
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        # shard -> [(transaction, telegram profile, future, enqueued_at)] not written yet.
+        self._queued = {}
+        # shard -> timer that flushes its queue once the window is over.
+        self._timers = {}
+        # Shards with a batch being written.
+        self._writing = set()
+        self._tasks = set()
+        self.commits = 0
+        self.failed_batches = 0
+        self.batch_size = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.queue_wait_ms = Histogram([1, 5, 10, 25, 50, 100, 250, 500, 1000])
+
+    async def submit(self, transaction, telegram_user_data=None):
+        """Queue a new Transaction and return it once committed (with its id); the profile is upserted with it."""
+        shard = await shard_router.shard_for_async(transaction.telegram_id, for_write=True)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queued.setdefault(shard, [])
+        queue.append((transaction, telegram_user_data, future, time.perf_counter()))
+        if len(queue) >= self.max_rows:
+            self._flush_now(shard)
+        elif shard not in self._timers:
+            self._timers[shard] = loop.call_later(self.window, self._flush_now, shard)
+
+        # Shielded, so a cancelled caller does not cancel the batch other callers share.
+        return await asyncio.shield(future)
+
+    async def close(self):
+        """Write every queued row and wait for the batches in flight (on bot shutdown)."""
+        for shard in list(self._queued):
+            self._flush_now(shard)
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": sum(len(queue) for queue in self._queued.values()),
+            "commits": self.commits,
+            "failed_batches": self.failed_batches,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    def _flush_now(self, shard: str):
+        timer = self._timers.pop(shard, None)
+        if timer is not None:
+            timer.cancel()
+        # A batch in flight picks the queue up as soon as it commits.
+        if self._queued.get(shard) and shard not in self._writing:
+            self._writing.add(shard)
+            task = asyncio.get_running_loop().create_task(self._drain(shard))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, shard: str):
+        try:
+            while self._queued.get(shard):
+                queue = self._queued[shard]
+                batch, self._queued[shard] = queue[:self.max_rows], queue[self.max_rows:]
+                timer = self._timers.pop(shard, None)
+                if timer is not None:
+                    timer.cancel()
+                await self._write(shard, batch)
+        finally:
+            self._writing.discard(shard)
+
+    async def _write(self, shard: str, batch: list):
+        now = time.perf_counter()
+        self.batch_size.observe(len(batch))
+        for _, _, _, enqueued_at in batch:
+            self.queue_wait_ms.observe((now - enqueued_at) * 1000)
+
+        transactions = [transaction for transaction, _, _, _ in batch]
+        profiles = [profile for _, profile, _, _ in batch if profile is not None]
+        try:
+            async with shard_router.async_managers[shard].get_session() as session:
+                changes = await session.run_sync(self._add_all, transactions, profiles)
+                await session.commit()
+            self.commits += 1
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"❌ Write-behind batch of {len(batch)} transactions failed: {e}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for profile, change in changes:
+            UsersService._log_change(profile["id"], profile["username"], change)
+        for transaction, _, future, _ in batch:
+            if not future.done():
+                future.set_result(transaction)
+
+    def _add_all(self, session, transactions: list, profiles: list) -> list:
+        """Add the batch in the caller's transaction; returns the profile changes, see `_upsert_profiles`."""
+        changes = self._upsert_profiles(session, profiles) if profiles else []
+        session.add_all(transactions)
+        # One flush for the batch; it also resolves the category ids the rollups need.
+        session.flush()
+        rollup_service.record_many(session, [
+            {"telegram_id": t.telegram_id, "date": t.date, "type": t.type, "category_id": t.category_id,
+             "amount_cents": t.amount_cents}
+            for t in transactions
+        ])
+        return changes
+
+    def _upsert_profiles(self, session, profiles: list) -> list:
+        """Upsert the senders' profiles; returns (profile, "created"/"updated") for the rows that changed."""
+        # One row per user: PostgreSQL rejects a multi-row upsert that touches the same row twice.
+        latest = {profile["id"]: profile for profile in profiles}
+        dialect = session.get_bind().dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            changes = [(profile, UsersService.upsert_profile(session, profile)) for profile in latest.values()]
+            return [(profile, change) for profile, change in changes if change]
+        # Only inserted and updated rows come back, so each row carries its telegram_id.
+        rows = session.execute(
+            UsersService.profile_upsert(dialect).returning(User.__table__.c.telegram_id, PROFILE_CREATED),
+            [UsersService.profile_values(profile) for profile in latest.values()],
+        )
+        return [(latest[telegram_id], UsersService.profile_change((created,))) for telegram_id, created in rows]
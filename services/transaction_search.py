@@ -0,0 +1,82 @@
+# services/transaction_search.py
+import re
+import unicodedata
+
+from sqlalchemy import Float, Integer, func, literal, literal_column, text
+
+from models.transaction import Transaction
+
+# Words as the SQLite unicode61 tokenizer splits them: letters and digits only.
+WORD = re.compile(r"[^\W_]+")
+
+
+def search_words(term: str) -> list:
+    """Words of a search, lowercased and without accents: "Almoço no centro" -> ["almoco", "no", "centro"]."""
+    folded = unicodedata.normalize("NFKD", (term or "").lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return WORD.findall(folded)
+
+
+class TransactionSearch:
+    """
+    Full-text search over transaction descriptions, backed by the index from migration 0005.
+
+    Every word of the search must start a word of the description, ignoring
+    case and accents ("almoco" finds "Almoço", "merc" finds "Mercado").
+
+    - SQLite: the `transactions_fts` FTS5 table (unicode61 tokenizer with
+      diacritics removed), kept in sync by triggers on `transactions`. The
+      user's telegram_id is indexed too, so a search only walks that user's
+      postings; ranked by bm25.
+    - PostgreSQL: a GIN index on `to_tsvector('simple', f_unaccent(description))`
+      with prefix tsqueries; ranked by ts_rank.
+    - Other databases: LIKE on the lowercased description, unranked.
+
+    `apply` returns the filtered query and, with `ranked=True`, a rank column
+    where lower is more relevant, so relevance pages with the same keyset seek
+    as the other sorts. The work grows with the number of matching rows, not
+    with the size of the history; ranking costs extra (bm25 reads the whole
+    posting list of every word), so it is only computed when asked for.
+    """
+
+    def apply(self, session, query, telegram_id: int, term: str, ranked: bool = False):
+        """Restrict `query` to transactions matching `term`; returns (query, rank column or None)."""
+        words = search_words(term)
+        if not words:
+            return query, None
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            return self._sqlite(query, telegram_id, words, ranked)
+        if dialect == "postgresql":
+            return self._postgresql(query, words, ranked)
+        for word in words:
+            query = query.filter(func.lower(Transaction.description).contains(word, autoescape=True))
+        return query, None
+
+    def _sqlite(self, query, telegram_id: int, words: list, ranked: bool):
+        # Words are letters and digits only, so quoting them is enough to keep FTS5 syntax out.
+        match = " AND ".join([f'telegram_id : "{int(telegram_id)}"'] + [f'description : "{word}" *' for word in words])
+        columns = "rowid AS id, bm25(transactions_fts, 1.0, 0.0) AS rank" if ranked else "rowid AS id"
+        # MATERIALIZED: the matches drive the join. As a plain subquery SQLite
+        # flattens it and runs the MATCH once per row of the user's history.
+        matches = (
+            text(f"SELECT {columns} FROM transactions_fts WHERE transactions_fts MATCH :match")
+            .bindparams(match=match)
+            .columns(id=Integer, **({"rank": Float} if ranked else {}))
+            .cte("search")
+            .prefix_with("MATERIALIZED")
+        )
+        query = query.join(matches, matches.c.id == Transaction.id)
+        return query, matches.c.rank if ranked else None
+
+    def _postgresql(self, query, words: list, ranked: bool):
+        # Same expression as the index in migration 0005, literals included, so the planner uses it.
+        vector = func.to_tsvector(
+            literal_column("'simple'::regconfig"),
+            func.f_unaccent(func.coalesce(Transaction.description, literal_column("''"))),
+        )
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), literal(" & ".join(f"{word}:*" for word in words)))
+        return query.filter(vector.op("@@")(tsquery)), -func.ts_rank(vector, tsquery) if ranked else None
+
+
+transaction_search = TransactionSearch()
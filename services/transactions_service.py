@@ -1,10 +1,18 @@
 # services/transactions_service.py
 import logging
 import pandas as pd
-from datetime import datetime, timedelta
-from services.database import db_manager
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from services.shard_router import shard_router
+from models.category import Category, resolve_category_id
 from models.transaction import Transaction
+from config.config import config
 from services.ai_processor import ai_processor
+from services.rollup_service import rollup_key, rollup_service
+from services.transaction_batcher import TransactionWriteBatcher
+from services.transaction_search import transaction_search
+from services.users_service import PROFILE_CREATED, UsersService
 
 logger = logging.getLogger(__name__)
 
@@ -12,119 +20,348 @@ class TransactionsService:
     def __init__(self):
         # Default categories used by the text processor.
         self.categories = ai_processor.categories
+        # Groups the bot's inserts into shared commits (see services/transaction_batcher.py).
+        self.write_batcher = TransactionWriteBatcher(
+            window_ms=config.WRITE_BEHIND_FLUSH_MS,
+            max_rows=config.WRITE_BEHIND_MAX_ROWS,
+        ) if config.WRITE_BEHIND_ENABLED else None
 
     # ---------------- CRUD ----------------
-    def get_transactions(self, telegram_id: int, filters=None, page: int = 0, items_per_page: int = 25):
+    def get_transactions(self, telegram_id: int, filters=None, page: int = 0, items_per_page: int = 25,
+                         after=None):
         """
-        Return transactions for a user, after applying filters, sorting and pagination.
+        Return one page of a user's transactions and the total number of pages.
+
+        Filters, sorting and pagination all run in a single SQL query. Pass
+        `after` (from `cursor_for` on the last row of the previous page) to seek
+        straight to the next page instead of skipping `page * items_per_page`
+        rows with OFFSET. With a `search_term`, the "relevance" sort orders by
+        the full-text rank (see services/transaction_search.py).
         """
-        filters = filters or {}
-        transactions = self._get_all_transactions(telegram_id)
+        try:
+            with shard_router.get_read_session(telegram_id) as session:
+                return self._fetch_page(session, telegram_id, filters or {}, page, items_per_page, after)
+        except Exception as e:
+            logger.error(f"Error while fetching transactions: {e}")
+            return [], 1
 
-        # Apply filters in memory.
-        transactions = self._apply_search(transactions, filters.get("search_term"))
-        transactions = self._apply_category_filter(transactions, filters.get("category"))
-        transactions = self._apply_type_filter(transactions, filters.get("type"))
-        transactions = self._apply_date_filter(transactions, filters.get("date_range"))
+    def _fetch_page(self, session, telegram_id: int, filters: dict, page: int, items_per_page: int, after):
+        sort_by = filters.get("sort_by") or "date_desc"
+        filtered, rank = self._build_query(session, telegram_id, filters, ranked=sort_by == "relevance")
 
-        # Then apply sorting.
-        transactions = self._apply_sort(transactions, filters.get("sort_by"))
+        if sort_by == "relevance" and rank is not None:
+            field, descending, column = "search_rank", False, rank
+        else:
+            field, descending = self._sort_option(sort_by)
+            column = self._sort_key(getattr(Transaction, field), field)
+        query = filtered
+        if after is not None:
+            value, last_id = after
+            query = query.filter(self._seek_clause(column, descending, self._sort_key(value, field), last_id))
+        order = (column.desc(), Transaction.id.desc()) if descending else (column.asc(), Transaction.id.asc())
+        query = query.order_by(*order)
+        if after is None:
+            query = query.offset(page * items_per_page)
+        if rank is None:
+            transactions = query.limit(items_per_page).all()
+        else:
+            transactions = []
+            for t, t_rank in query.add_columns(rank).limit(items_per_page).all():
+                # Kept on the row for `cursor_for`.
+                t.search_rank = t_rank
+                transactions.append(t)
 
-        # Finally, calculate pagination slice.
-        total_pages = max(1, (len(transactions) + items_per_page - 1) // items_per_page)
-        start = page * items_per_page
-        end = start + items_per_page
-        return transactions[start:end], total_pages
+        # The count does not need the search rank, the expensive part of a ranked search.
+        counted = filtered if rank is None else self._build_query(session, telegram_id, filters)[0]
+        total_pages = self._total_pages(counted, page, items_per_page, len(transactions))
+        return transactions, total_pages
 
-    def _get_all_transactions(self, telegram_id: int):
-        try:
-            with db_manager.get_session() as session:
-                return session.query(Transaction).filter(Transaction.telegram_id == telegram_id).all()
-        except Exception as e:
-            logger.error(f"Error while fetching transactions: {e}")
-            return []
+    def cursor_for(self, transaction, sort_by: str = None):
+        """Keyset cursor pointing right after `transaction`, for the `after` argument of `get_transactions`."""
+        if sort_by == "relevance" and hasattr(transaction, "search_rank"):
+            return transaction.search_rank, transaction.id
+        field, _ = self._sort_option(sort_by or "date_desc")
+        return getattr(transaction, field), transaction.id
 
     def create(self, telegram_id: int, description: str, amount: float, category: str, type: str, date, detected_by: str = "manual"):
         try:
-            with db_manager.get_session() as session:
-                t = Transaction(
-                    telegram_id=telegram_id,
-                    description=description,
-                    amount=amount,
-                    category=category,
-                    type=type,
-                    date=date,
-                    detected_by=detected_by
-                )
-                session.add(t)
+            with shard_router.get_session(telegram_id) as session:
+                t = self._add(session, telegram_id, description, amount, category, type, date, detected_by)
                 session.commit()
                 session.refresh(t)
-                return t
+            shard_router.mark_write(telegram_id)
+            # Feed the per-user categorization memory (only rows the user typed in count).
+            ai_processor.category_memory.learn(telegram_id, description, category, type, detected_by)
+            return t
         except Exception as e:
             logger.error(f"Error while creating transaction: {e}")
             return None
 
-    def update(self, transaction_id: int, **kwargs):
+    def _add_for_user(self, session, telegram_user_data, description, amount, category, type, date, detected_by):
+        """Returns (transaction, profile change); see `create_for_user_async`."""
+        if session.get_bind().dialect.name == "postgresql":
+            return self._insert_with_profile(session, telegram_user_data, description, amount, category, type, date,
+                                             detected_by)
+        change = UsersService.upsert_profile(session, telegram_user_data)
+        t = self._add(session, telegram_user_data["id"], description, amount, category, type, date, detected_by)
+        return t, change
+
+    def _insert_with_profile(self, session, telegram_user_data, description, amount, category, type, date,
+                             detected_by):
+        """
+        One PostgreSQL statement: the transaction INSERT ... RETURNING id, with
+        the profile and rollup upserts as data-modifying CTEs. The foreign key
+        to users is checked at the end of the statement, after the upsert.
+        """
+        now = datetime.now(timezone.utc)
+        t = Transaction(
+            telegram_id=telegram_user_data["id"], description=description, amount=amount, category=category,
+            type=type, date=date or now.date(), detected_by=detected_by, created_at=now, updated_at=now,
+        )
+        # Set after `category`, whose setter clears the id until the next flush.
+        t.category_id = resolve_category_id(session, category)
+
+        profile = UsersService.profile_upsert("postgresql", UsersService.profile_values(telegram_user_data))
+        profile = profile.returning(PROFILE_CREATED).cte("upsert_profile")
+        rollups = [
+            stmt.cte(f"upsert_rollup_{index}")
+            for index, stmt in enumerate(rollup_service.create_statements("postgresql", rollup_key(t)))
+        ]
+        table = Transaction.__table__
+        stmt = (
+            postgresql_insert(table)
+            .values({column.key: getattr(t, column.key) for column in table.c if column.key != "id"})
+            .returning(table.c.id, select(profile.c.created).scalar_subquery())
+            .add_cte(profile, *rollups)
+        )
+        t.id, created = session.execute(stmt).one()
+        return t, UsersService.profile_change(None if created is None else (created,))
+
+    def _add(self, session, telegram_id, description, amount, category, type, date, detected_by):
+        t = Transaction(
+            telegram_id=telegram_id,
+            description=description,
+            amount=amount,
+            category=category,
+            type=type,
+            date=date,
+            detected_by=detected_by
+        )
+        session.add(t)
+        # Flush first so column defaults (e.g. the date) are set before the rollups read them.
+        session.flush()
+        rollup_service.record_create(session, t)
+        return t
+
+    def update(self, transaction_id: int, telegram_id: int, **kwargs):
+        """Apply `kwargs` to the transaction if it belongs to `telegram_id` (looked up on their shard)."""
         try:
-            with db_manager.get_session() as session:
-                t = session.query(Transaction).filter(Transaction.id == transaction_id).first()
+            with shard_router.get_session(telegram_id) as session:
+                t = self._apply_update(session, transaction_id, kwargs, telegram_id)
                 if not t:
                     return False
-                for key, value in kwargs.items():
-                    if hasattr(t, key):
-                        setattr(t, key, value)
                 session.commit()
-                return True
+            shard_router.mark_write(t.telegram_id)
+            self._learn_correction(t, kwargs)
+            return True
         except Exception as e:
             logger.error(f"Error while updating transaction: {e}")
             return False
 
-    def delete(self, transaction_id):
+    def _apply_update(self, session, transaction_id: int, changes: dict, telegram_id: int):
+        t = self._find(session, transaction_id, telegram_id)
+        if not t:
+            return None
+        old_key = rollup_key(t)
+        for key, value in changes.items():
+            if hasattr(t, key):
+                setattr(t, key, value)
+        # Resolves a new category name to its id before the rollups read it.
+        session.flush()
+        rollup_service.record_update(session, old_key, t)
+        return t
+
+    def _learn_correction(self, t, changes: dict):
+        # A user correction is the best training signal the memory can get.
+        if {"description", "category", "type"} & changes.keys():
+            ai_processor.category_memory.learn(t.telegram_id, t.description, t.category, t.type)
+
+    def delete(self, transaction_id, telegram_id: int):
         try:
-            with db_manager.get_session() as session:
-                t = session.query(Transaction).filter(Transaction.id == transaction_id).first()
-                if t:
-                    session.delete(t)
-                    session.commit()
-                    return True
-                return False
+            with shard_router.get_session(telegram_id) as session:
+                t = self._delete(session, transaction_id, telegram_id)
+                if not t:
+                    return False
+                session.commit()
+            shard_router.mark_write(t.telegram_id)
+            return True
         except Exception as e:
             logger.error(f"Error while deleting transaction: {e}")
             return False
 
-    def get_by_id(self, transaction_id: int):
+    def _delete(self, session, transaction_id, telegram_id: int):
+        """Delete the transaction and its rollup share; returns the deleted row, or None if it did not exist."""
+        t = self._find(session, transaction_id, telegram_id)
+        if not t:
+            return None
+        rollup_service.record_delete(session, t)
+        session.delete(t)
+        return t
+
+    def _find(self, session, transaction_id: int, telegram_id: int):
+        """
+        The transaction with this id, if it belongs to `telegram_id`.
+
+        Ids are only unique within one shard, so the owner is required: the
+        lookup runs on the owner's shard and never matches another user's row.
+        """
+        return (
+            session.query(Transaction)
+            .filter(Transaction.id == transaction_id, Transaction.telegram_id == telegram_id)
+            .first()
+        )
+
+    def get_by_id(self, transaction_id: int, telegram_id: int):
         """
-        Fetch a single transaction by its ID.
+        Fetch a single transaction of `telegram_id` by its ID (None if it is not theirs).
 
         This is important for edit/delete flows that start from a selected record.
         """
         try:
-            with db_manager.get_session() as session:
-                return session.query(Transaction).filter(Transaction.id == transaction_id).first()
+            with shard_router.get_session(telegram_id, for_write=False) as session:
+                return self._find(session, transaction_id, telegram_id)
         except Exception as e:
             logger.error(f"Error while fetching transaction by ID: {e}")
             return None
 
-    # ---------------- Filters ----------------
-    def _apply_search(self, transactions, search_term):
+    # ---------------- Async CRUD (used by the bot) ----------------
+    # Same queries as the sync methods above, run on the async engine with
+    # `run_sync`, so the bot's event loop keeps serving other users meanwhile.
+    async def get_transactions_async(self, telegram_id: int, filters=None, page: int = 0,
+                                     items_per_page: int = 25, after=None):
+        try:
+            async with shard_router.get_async_read_session(telegram_id) as session:
+                return await session.run_sync(
+                    self._fetch_page, telegram_id, filters or {}, page, items_per_page, after
+                )
+        except Exception as e:
+            logger.error(f"Error while fetching transactions: {e}")
+            return [], 1
+
+    async def create_async(self, telegram_id: int, description: str, amount: float, category: str, type: str,
+                           date, detected_by: str = "manual"):
+        try:
+            async with shard_router.get_async_session(telegram_id) as session:
+                t = await session.run_sync(
+                    self._add, telegram_id, description, amount, category, type, date, detected_by
+                )
+                await session.commit()
+                await session.refresh(t)
+            shard_router.mark_write(telegram_id)
+            ai_processor.category_memory.learn(telegram_id, description, category, type, detected_by)
+            return t
+        except Exception as e:
+            logger.error(f"Error while creating transaction: {e}")
+            return None
+
+    async def create_for_user_async(self, telegram_user_data, description: str, amount: float, category: str,
+                                    type: str, date, detected_by: str = "manual"):
+        """
+        Unit of work of one bot message: upsert the sender's profile and add the transaction, one commit.
+
+        Replaces `get_or_create_user_async` + `create_async` (two sessions,
+        about five statements). On PostgreSQL the profile upsert, the INSERT
+        and the rollup upserts are a single statement; SQLite runs them one
+        after the other in the same transaction. With write-behind batching
+        on, both join the next batch instead.
+        """
+        telegram_id = telegram_user_data["id"]
+        try:
+            if self.write_batcher is not None:
+                t = await self.write_batcher.submit(Transaction(
+                    telegram_id=telegram_id, description=description, amount=amount, category=category,
+                    type=type, date=date, detected_by=detected_by,
+                ), telegram_user_data)
+                # The batcher logs the profile changes of its batches.
+                change = None
+            else:
+                async with shard_router.get_async_session(telegram_id) as session:
+                    t, change = await session.run_sync(
+                        self._add_for_user, telegram_user_data, description, amount, category, type, date,
+                        detected_by,
+                    )
+                    await session.commit()
+            shard_router.mark_write(telegram_id)
+            if change:
+                UsersService._log_change(telegram_id, telegram_user_data["username"], change)
+            ai_processor.category_memory.learn(telegram_id, description, category, type, detected_by)
+            return t
+        except Exception as e:
+            logger.error(f"Error while creating transaction: {e}")
+            return None
+
+    async def update_async(self, transaction_id: int, telegram_id: int, **kwargs):
+        try:
+            async with shard_router.get_async_session(telegram_id) as session:
+                t = await session.run_sync(self._apply_update, transaction_id, kwargs, telegram_id)
+                if not t:
+                    return False
+                await session.commit()
+            shard_router.mark_write(t.telegram_id)
+            self._learn_correction(t, kwargs)
+            return True
+        except Exception as e:
+            logger.error(f"Error while updating transaction: {e}")
+            return False
+
+    async def delete_async(self, transaction_id, telegram_id: int):
+        try:
+            async with shard_router.get_async_session(telegram_id) as session:
+                t = await session.run_sync(self._delete, transaction_id, telegram_id)
+                if not t:
+                    return False
+                await session.commit()
+            shard_router.mark_write(t.telegram_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error while deleting transaction: {e}")
+            return False
+
+    async def get_by_id_async(self, transaction_id: int, telegram_id: int):
+        try:
+            async with shard_router.get_async_session(telegram_id, for_write=False) as session:
+                return await session.run_sync(self._find, transaction_id, telegram_id)
+        except Exception as e:
+            logger.error(f"Error while fetching transaction by ID: {e}")
+            return None
+
+    # ---------------- Query building ----------------
+    def _build_query(self, session, telegram_id: int, filters: dict, ranked: bool = False):
+        """Translate the filter dict used by the UI into WHERE clauses; returns (query, search rank or None)."""
+        query = session.query(Transaction).filter(Transaction.telegram_id == telegram_id)
+
+        rank = None
+        search_term = filters.get("search_term")
         if search_term:
-            term = search_term.lower()
-            return [t for t in transactions if term in t.description.lower()]
-        return transactions
+            query, rank = transaction_search.apply(session, query, telegram_id, search_term, ranked)
 
-    def _apply_category_filter(self, transactions, category):
+        category = filters.get("category")
         if category and category != "Todas":
-            return [t for t in transactions if t.category == category]
-        return transactions
+            query = query.filter(Transaction.category_id.in_(select(Category.id).where(Category.name == category)))
 
-    def _apply_type_filter(self, transactions, type_filter):
+        type_filter = filters.get("type")
         if type_filter and type_filter != "Todos":
-            return [t for t in transactions if t.type == type_filter]
-        return transactions
+            query = query.filter(Transaction.type == type_filter)
+
+        start_date = self._date_range_start(filters.get("date_range"))
+        if start_date is not None:
+            query = query.filter(Transaction.date >= start_date)
+        return query, rank
 
-    def _apply_date_filter(self, transactions, date_range):
-        if not date_range:
-            return transactions
+    def _date_range_start(self, date_range):
+        """First date included by a "Período" option, or None when nothing is filtered out."""
+        if not date_range or date_range == "all_time":
+            return None
         today = datetime.now().date()
         ranges = {
             '7_days': today - timedelta(days=7),
@@ -132,33 +369,51 @@ class TransactionsService:
             '90_days': today - timedelta(days=90),
             'current_month': today.replace(day=1),
             'last_month': (today.replace(day=1) - timedelta(days=1)).replace(day=1),
-            'all_time': datetime.min.date()
         }
-        start_date = ranges.get(date_range, datetime.min.date())
-        result = []
-        for t in transactions:
-            t_date = t.date
-            if isinstance(t_date, str):
-                t_date = datetime.strptime(t_date, "%Y-%m-%d").date()
-            if t_date >= start_date:
-                result.append(t)
-        return result
-
-    def _apply_sort(self, transactions, sort_by):
-        if not sort_by:
-            sort_by = "date_desc"
-        key_funcs = {
-            'date_desc': lambda t: t.date,
-            'date_asc': lambda t: t.date,
-            'amount_desc': lambda t: t.amount,
-            'amount_asc': lambda t: t.amount,
-            'description_asc': lambda t: t.description.lower()
+        return ranges.get(date_range)
+
+    def _sort_option(self, sort_by: str):
+        """Return (column name, descending) for a "Ordenar por" option; unknown options sort by date."""
+        sort_options = {
+            'date_desc': ("date", True),
+            'date_asc': ("date", False),
+            'amount_desc': ("amount_cents", True),
+            'amount_asc': ("amount_cents", False),
+            'description_asc': ("description", False),
         }
-        reverse = sort_by in ['date_desc', 'amount_desc']
-        return sorted(transactions, key=key_funcs.get(sort_by, lambda t: t.date), reverse=reverse)
+        return sort_options.get(sort_by, ("date", True))
+
+    def _sort_key(self, value, field: str):
+        """
+        SQL expression rows are ordered by, applied the same way to the column and to a cursor value.
+
+        Descriptions are compared case-insensitively by the database's own lower(),
+        and missing descriptions sort as "", so every row has a comparable key.
+        """
+        if field == "description":
+            return func.lower(func.coalesce(value, ""))
+        return value
+
+    def _seek_clause(self, column, descending: bool, value, last_id: int):
+        """Rows strictly after the cursor in (column, id) order; id breaks ties between equal values."""
+        if descending:
+            return or_(column < value, and_(column == value, Transaction.id < last_id))
+        return or_(column > value, and_(column == value, Transaction.id > last_id))
+
+    def _total_pages(self, filtered, page: int, items_per_page: int, rows_on_page: int) -> int:
+        """
+        Number of pages, counting rows only when the current page cannot tell.
+
+        A page that is not full is the last one, so the count is skipped for
+        small histories and whenever the user reaches the end of the list.
+        """
+        if 0 < rows_on_page < items_per_page or (rows_on_page == 0 and page == 0):
+            return page + 1
+        total = filtered.with_entities(func.count(Transaction.id)).scalar()
+        return max(1, (total + items_per_page - 1) // items_per_page)
 
     def get_recent_transactions(self, telegram_id: int, limit: int = 5):
-        with db_manager.get_session() as session:
+        with shard_router.get_read_session(telegram_id) as session:
             return (
                 session.query(Transaction)
                 .filter(Transaction.telegram_id == telegram_id)
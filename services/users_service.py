@@ -1,10 +1,16 @@
-from services.database import db_manager
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from services.shard_router import shard_router
 from models.user import User
 from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Telegram profile fields copied to the users row.
+PROFILE_FIELDS = ("username", "first_name", "last_name")
+
 
 class UsersService:
     @staticmethod
@@ -12,54 +18,137 @@ class UsersService:
         """
         Get a user by Telegram ID, or create it if it does not exist yet.
 
-        `telegram_user_data` is expected to be the object returned by Telegram
-        (it can be a dict-like object that has keys like "id", "username", etc).
+        `telegram_user_data` is the telegram.User of the update, or a dict
+        with the same keys ("id", "username", ...); fields are read by key,
+        which both support (telegram.User has no `.get`).
         """
-        with db_manager.get_session() as session:
-            user = session.query(User).filter_by(telegram_id=telegram_user_data.get('id')).first()
-
-            if user:
-                # Keep the database in sync with Telegram profile changes (username/name).
-                updated = False
-                if user.username != telegram_user_data.get('username'):
-                    user.username = telegram_user_data.get('username')
-                    updated = True
-                if user.first_name != telegram_user_data.get('first_name'):
-                    user.first_name = telegram_user_data.get('first_name')
-                    updated = True
-                if user.last_name != telegram_user_data.get('last_name'):
-                    user.last_name = telegram_user_data.get('last_name')
-                    updated = True
-                if updated:
-                    user.updated_at = datetime.now(timezone.utc)
-                    session.commit()
-                    session.refresh(user)
-                    logger.info(f"Usuário atualizado: {user.telegram_id} - {user.username}")
-                return user
-
-            # Create a new local record for this Telegram user.
-            user = User(
-                telegram_id=telegram_user_data.get('id'),
-                username=telegram_user_data.get('username'),
-                first_name=telegram_user_data.get('first_name'),
-                last_name=telegram_user_data.get('last_name'),
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc)
-            )
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            logger.info(f"Novo usuário criado: {user.telegram_id} - {user.username}")
+        with shard_router.get_session(telegram_user_data['id']) as session:
+            user, change = UsersService._sync_profile(session, telegram_user_data)
+            if change:
+                session.commit()
+                session.refresh(user)
+                shard_router.mark_write(user.telegram_id)
+                UsersService._log_change(user.telegram_id, user.username, change)
+            return user
+
+    @staticmethod
+    async def get_or_create_user_async(telegram_user_data):
+        """Async version of `get_or_create_user` for the bot handlers."""
+        async with shard_router.get_async_session(telegram_user_data['id']) as session:
+            user, change = await session.run_sync(UsersService._sync_profile, telegram_user_data)
+            if change:
+                await session.commit()
+                await session.refresh(user)
+                shard_router.mark_write(user.telegram_id)
+                UsersService._log_change(user.telegram_id, user.username, change)
             return user
 
+    @staticmethod
+    def _sync_profile(session, telegram_user_data):
+        """
+        Load the user and apply Telegram profile changes, or add a new one.
+
+        Returns (user, "created" | "updated" | None); the caller commits.
+        """
+        user = session.query(User).filter_by(telegram_id=telegram_user_data['id']).first()
+
+        if user:
+            # Keep the database in sync with Telegram profile changes (username/name).
+            updated = False
+            if user.username != telegram_user_data['username']:
+                user.username = telegram_user_data['username']
+                updated = True
+            if user.first_name != telegram_user_data['first_name']:
+                user.first_name = telegram_user_data['first_name']
+                updated = True
+            if user.last_name != telegram_user_data['last_name']:
+                user.last_name = telegram_user_data['last_name']
+                updated = True
+            if updated:
+                user.updated_at = datetime.now(timezone.utc)
+                return user, "updated"
+            return user, None
+
+        # Create a new local record for this Telegram user.
+        user = User(
+            telegram_id=telegram_user_data['id'],
+            username=telegram_user_data['username'],
+            first_name=telegram_user_data['first_name'],
+            last_name=telegram_user_data['last_name'],
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc)
+        )
+        session.add(user)
+        return user, "created"
+
+    @staticmethod
+    def profile_values(telegram_user_data) -> dict:
+        """Column values of the users row for a Telegram user (a telegram.User, or a dict with the same keys)."""
+        now = datetime.now(timezone.utc)
+        values = {"telegram_id": telegram_user_data["id"], "created_at": now, "updated_at": now}
+        values.update({field: telegram_user_data[field] for field in PROFILE_FIELDS})
+        return values
+
+    @staticmethod
+    def profile_upsert(dialect: str, values: dict = None):
+        """
+        INSERT ... ON CONFLICT (telegram_id) DO UPDATE of the user's profile (SQLite and PostgreSQL).
+
+        An existing row is only rewritten when a profile field changed. With
+        RETURNING, inserted and updated rows come back and unchanged ones do
+        not; `PROFILE_CREATED` tells a new user from an update. Without
+        `values` it is meant for an executemany.
+        """
+        table = User.__table__
+        insert_fn = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert_fn(table)
+        if values is not None:
+            stmt = stmt.values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=["telegram_id"],
+            set_={**{field: stmt.excluded[field] for field in PROFILE_FIELDS}, "updated_at": stmt.excluded.updated_at},
+            where=or_(*(table.c[field].is_distinct_from(stmt.excluded[field]) for field in PROFILE_FIELDS)),
+        )
+
+    @staticmethod
+    def upsert_profile(session, telegram_user_data):
+        """
+        Add the user or apply Telegram profile changes in one statement, without loading the row.
+
+        Runs in the caller's transaction; returns "created", "updated" or None.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            return UsersService._sync_profile(session, telegram_user_data)[1]
+        stmt = UsersService.profile_upsert(dialect, UsersService.profile_values(telegram_user_data))
+        return UsersService.profile_change(session.execute(stmt.returning(PROFILE_CREATED)).first())
+
+    @staticmethod
+    def profile_change(row):
+        """"created", "updated" or None from the RETURNING row of `profile_upsert` (None when nothing changed)."""
+        if row is None:
+            return None
+        return "created" if row[0] else "updated"
+
+    @staticmethod
+    def _log_change(telegram_id: int, username, change: str):
+        if change == "created":
+            logger.info(f"Novo usuário criado: {telegram_id} - {username}")
+        else:
+            logger.info(f"Usuário atualizado: {telegram_id} - {username}")
+
     @staticmethod
     def get_user_by_telegram_id(telegram_id: int):
         """
         Fetch a user using the Telegram ID as the main key.
         This is the method the Streamlit app should use after login.
         """
-        with db_manager.get_session() as session:
+        with shard_router.get_read_session(telegram_id) as session:
             return session.query(User).filter_by(telegram_id=telegram_id).first()
 
+# RETURNING expression of `profile_upsert`: a new row has created_at == updated_at,
+# an updated one gets a newer updated_at.
+PROFILE_CREATED = (User.__table__.c.created_at == User.__table__.c.updated_at).label("created")
+
 # Global instance for convenience imports across the project.
 users_service = UsersService()
\ No newline at end of file
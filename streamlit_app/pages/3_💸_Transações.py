@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
+import os
 import sys
+import tempfile
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from services.transactions_service import transactions_service
+from services.statement_import import statement_importer
+from services.transaction_export import parquet_available, transaction_exporter
 from services.ai_processor import ai_processor # Para as categorias
 from utils import check_authentication
 
@@ -57,6 +61,7 @@ def show_transaction_form(transaction_to_edit=None):
                 if is_editing:
                     success = transactions_service.update(
                         transaction_to_edit.id,
+                        telegram_id,
                         description=description,
                         amount=amount,
                         category=category,
@@ -87,7 +92,7 @@ def show_transaction_form(transaction_to_edit=None):
 
 # If we have an ID in session_state, load that transaction and show the edit form.
 if st.session_state.editing_transaction_id:
-    transaction_to_edit = transactions_service.get_by_id(st.session_state.editing_transaction_id)
+    transaction_to_edit = transactions_service.get_by_id(st.session_state.editing_transaction_id, telegram_id)
     if transaction_to_edit:
         show_transaction_form(transaction_to_edit)
     else:
@@ -97,6 +102,53 @@ else:
     # Default view: show the create form.
     show_transaction_form()
 
+# ==============================================================================
+# Block 1b: Bank statement import
+# ==============================================================================
+with st.expander("📥 Importar Extrato (CSV ou OFX)", expanded=False):
+    statement = st.file_uploader("Arquivo do banco", type=["csv", "ofx"])
+    if statement is not None and st.button("📥 Importar", use_container_width=True):
+        progress_text = st.empty()
+
+        def show_progress(stats):
+            progress_text.info(
+                f"⏳ {stats['read']} linhas lidas, {stats['imported']} novas "
+                f"({stats['rows_per_second']:.0f} linhas/s)"
+            )
+
+        stats = statement_importer.import_file(telegram_id, statement, statement.name, progress=show_progress)
+        progress_text.empty()
+        if stats["error"]:
+            st.error(f"❌ Importação interrompida: {stats['error']}")
+        if stats["imported"] or not stats["error"]:
+            st.success(
+                f"✅ {stats['imported']} novas transações importadas; {stats['duplicates']} já existentes e "
+                f"{stats['invalid']} linhas sem data ou valor foram ignoradas "
+                f"({stats['read']} linhas em {stats['seconds']:.1f}s, {stats['rows_per_second']:.0f} linhas/s)."
+            )
+
+# ==============================================================================
+# Block 1c: Full history export
+# ==============================================================================
+with st.expander("📤 Exportar Histórico (CSV ou Parquet)", expanded=False):
+    export_fmt = st.radio("Formato", ["csv", "parquet"] if parquet_available() else ["csv"], horizontal=True)
+    if st.button("📤 Gerar arquivo", use_container_width=True):
+        with tempfile.TemporaryDirectory() as folder:
+            # The export streams to disk; Streamlit then keeps the finished file to serve the download.
+            path = os.path.join(folder, f"transacoes_{date.today():%Y-%m-%d}.{export_fmt}")
+            stats = transaction_exporter.export_path(telegram_id, path, export_fmt)
+            if stats["error"]:
+                st.error(f"❌ Erro ao exportar: {stats['error']}")
+            else:
+                with open(path, "rb") as exported:
+                    st.download_button(
+                        f"⬇️ Baixar {stats['rows']} transações",
+                        data=exported,
+                        file_name=os.path.basename(path),
+                        mime="text/csv" if export_fmt == "csv" else "application/octet-stream",
+                        use_container_width=True,
+                    )
+
 st.markdown("---")
 
 
@@ -114,7 +166,7 @@ with st.expander("🔍 Filtros Avançados", expanded=False):
     with col4:
         date_range = st.selectbox("Período", ["7_days","30_days","90_days","current_month","last_month","all_time"])
     
-    sort_by = st.selectbox("Ordenar por", ["date_desc","date_asc","amount_desc","amount_asc","description_asc"])
+    sort_by = st.selectbox("Ordenar por", ["date_desc","date_asc","amount_desc","amount_asc","description_asc","relevance"])
     items_per_page = st.selectbox("Itens por página", [25, 50, 100], index=0)
 
 filters = {
@@ -125,13 +177,26 @@ filters = {
     "sort_by": sort_by
 }
 
+# Keyset cursors of the pages already visited (page -> cursor); reset whenever the filters change.
+filters_key = (tuple(sorted(filters.items())), items_per_page)
+if st.session_state.get('page_cursors_key') != filters_key:
+    st.session_state.page_cursors_key = filters_key
+    st.session_state.page_cursors = {}
+    st.session_state.current_page = 0
+
 # Fetch transactions from the service using the current filters and page.
+# A known cursor lets the database seek straight to the page instead of using OFFSET.
 transactions, total_pages = transactions_service.get_transactions(
     telegram_id=telegram_id,
     filters=filters,
     page=st.session_state.current_page,
-    items_per_page=items_per_page
+    items_per_page=items_per_page,
+    after=st.session_state.page_cursors.get(st.session_state.current_page)
 )
+if transactions:
+    st.session_state.page_cursors[st.session_state.current_page + 1] = transactions_service.cursor_for(
+        transactions[-1], sort_by
+    )
 
 # Render the transaction list.
 if transactions:
@@ -151,7 +216,7 @@ if transactions:
                     st.session_state.editing_transaction_id = t.id
                     st.rerun()
                 if st.button("🗑️", key=f"delete_{t.id}", help="Excluir"):
-                    if transactions_service.delete(t.id):
+                    if transactions_service.delete(t.id, telegram_id):
                         st.success("✅ Transação excluída!")
                         st.rerun()
                     else:
@@ -0,0 +1,57 @@
+import itertools
+import os
+
+import pytest
+
+# config/config.py requires these; the tests never talk to Telegram.
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+os.environ.setdefault("TELEGRAM_BOT_USERNAME", "test_bot")
+
+import models  # noqa: E402,F401  (registers every mapper before the first query)
+import scripts.shards  # noqa: E402
+import services.shard_router  # noqa: E402
+import services.transactions_service  # noqa: E402
+import services.users_service  # noqa: E402
+from config.config import config  # noqa: E402
+from scripts.migrate import migrate  # noqa: E402
+from services.async_database import async_db_manager  # noqa: E402
+from services.database import db_manager  # noqa: E402
+from services.goal_service import goal_service  # noqa: E402
+from services.shard_router import ShardRouter  # noqa: E402
+from services.statement_import import statement_importer  # noqa: E402
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """
+    A router over two migrated SQLite files, "default" and "other", used by
+    the services and scripts.shards instead of the configured databases.
+    """
+    previous = (db_manager.database_url, db_manager.read_url)
+    previous_async = (async_db_manager.database_url, async_db_manager.read_url)
+    default_url = f"sqlite:///{tmp_path / 'default.db'}"
+    db_manager.configure(default_url)
+    async_db_manager.configure(default_url)
+    router = ShardRouter({"other": f"sqlite:///{tmp_path / 'other.db'}"})
+    for manager in router.managers.values():
+        migrate(manager=manager)
+
+    # No directory caching, so placement changes are seen at once (and moves do not wait).
+    monkeypatch.setattr(config, "SHARD_DIRECTORY_CACHE_SECONDS", 0)
+    # services.shard_router too, for the modules that import the router when they use it.
+    for module in (services.shard_router, services.transactions_service, services.users_service, scripts.shards):
+        monkeypatch.setattr(module, "shard_router", router)
+    monkeypatch.setattr(goal_service, "db", router)
+    monkeypatch.setattr(statement_importer, "db", router)
+    yield router
+
+    for manager in router.managers.values():
+        if manager is not db_manager:
+            manager.engine.dispose()
+    db_manager.configure(*previous)
+    async_db_manager.configure(*previous_async)
+
+
+def user_on(router, shard: str, start: int = 1000) -> int:
+    """A telegram_id that the hash ring places on `shard`."""
+    return next(telegram_id for telegram_id in itertools.count(start) if router.ring.lookup(telegram_id) == shard)
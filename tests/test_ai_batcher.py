@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from services.ai_batcher import AIMicroBatcher
+
+
+class FakeProcessor:
+    """Answers every message with its own text; `block` holds the calls until it is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.block = None
+
+    async def _detect_batch_with_ai_async(self, messages):
+        self.calls.append(list(messages))
+        if self.block is not None:
+            await self.block.wait()
+        return [{"description": m} for m in messages]
+
+
+def test_concurrent_requests_share_one_batch_and_coalesce_by_key():
+    processor = FakeProcessor()
+
+    async def run():
+        batcher = AIMicroBatcher(processor, window_ms=10)
+        return await asyncio.gather(
+            batcher.submit("uber 18", "uber"),
+            batcher.submit("uber 25", "uber"),
+            batcher.submit("cinema 40", "cinema"),
+        )
+
+    results = asyncio.run(run())
+    assert processor.calls == [["uber 18", "cinema 40"]]
+    assert [r["description"] for r in results] == ["uber 18", "uber 18", "cinema 40"]
+
+
+@pytest.mark.parametrize("started", [True, False], ids=["in flight", "before starting"])
+def test_a_cancelled_batch_releases_its_keys(started):
+    processor = FakeProcessor()
+
+    async def run():
+        batcher = AIMicroBatcher(processor, window_ms=1)
+        processor.block = asyncio.Event()
+        waiting = asyncio.create_task(batcher.submit("uber 18", "uber"))
+        while not (processor.calls if started else batcher._tasks):
+            await asyncio.sleep(0)
+        for task in list(batcher._tasks):
+            task.cancel()
+        first = await waiting
+
+        # A later request with the same key starts a new batch instead of waiting forever.
+        processor.block = None
+        second = await asyncio.wait_for(batcher.submit("uber 25", "uber"), timeout=1)
+        return first, second, batcher._futures
+
+    first, second, pending = asyncio.run(run())
+    assert first is None
+    assert second == {"description": "uber 25"}
+    assert pending == {}
+
+
+def test_close_sends_the_queued_requests():
+    processor = FakeProcessor()
+
+    async def run():
+        batcher = AIMicroBatcher(processor, window_ms=60_000)
+        waiting = asyncio.create_task(batcher.submit("uber 18", "uber"))
+        await asyncio.sleep(0)
+        await batcher.close()
+        return await waiting, batcher._tasks
+
+    result, tasks = asyncio.run(run())
+    assert result == {"description": "uber 18"}
+    assert tasks == set()
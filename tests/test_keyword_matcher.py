@@ -0,0 +1,58 @@
+import pytest
+
+from services.ai_processor import ai_processor
+from services.keyword_matcher import SECTION_PRIORITY, KeywordMatcher
+
+matcher = KeywordMatcher(ai_processor.categories)
+
+
+def category_of(message: str):
+    result = matcher.match(message)
+    return result and (result["category"], result["type"])
+
+
+@pytest.mark.parametrize("message, expected", [
+    # Whole words only: "bar" is not inside "barbearia", "etf" not inside "netflix".
+    ("barbearia 40", None),
+    ("netflix 55,90", ("Lazer", "despesa_variavel")),
+    ("bar 80", ("Lazer", "despesa_variavel")),
+    # Plurals of a keyword still match.
+    ("bares 120", ("Lazer", "despesa_variavel")),
+    ("mercados 350", ("Alimentação", "despesa_variavel")),
+    ("almoço 32,50", ("Alimentação", "despesa_variavel")),
+    ("conta de água 90", ("Moradia", "despesa_fixa")),
+])
+def test_keywords_match_whole_words_and_plurals(message, expected):
+    assert category_of(message) == expected
+
+
+@pytest.mark.parametrize("message, expected", [
+    # "presente" is both an income and a variable expense.
+    ("presente 150", ("Outros", "renda")),
+    ("dividendos fii 87,40", ("Investimentos", "renda")),
+    # "previdência" is both a fixed expense and a saving.
+    ("previdência 300", ("Previdência", "economia")),
+    ("uber pro cinema 30", ("Transporte", "despesa_fixa")),
+])
+def test_sections_are_ranked_by_priority(message, expected):
+    assert category_of(message) == expected
+
+
+def test_priority_order_of_every_section():
+    categories = {section: {section.title(): [f"kw{i}"]} for i, section in enumerate(SECTION_PRIORITY)}
+    ranked = KeywordMatcher(categories)
+    for i, section in enumerate(SECTION_PRIORITY):
+        message = " ".join(f"kw{j}" for j in reversed(range(i, len(SECTION_PRIORITY))))
+        assert ranked.match(message)["category"] == section.title()
+
+
+def test_first_keyword_wins_inside_a_section():
+    assert category_of("ifood depois do cinema")[0] == "Alimentação"
+    assert category_of("cinema depois do ifood")[0] == "Lazer"
+
+
+def test_longest_overlapping_keyword_wins():
+    # "investimento" alone is an income, but here it is part of "fundo de investimento".
+    assert category_of("investimento 500") == ("Investimentos", "renda")
+    assert category_of("fundo de investimento 500") == ("Fundos", "economia")
+    assert matcher.match("fundo de investimento 500")["keyword"] == "fundo de investimento"
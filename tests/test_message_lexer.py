@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+
+from services.message_lexer import parse_date, parse_message, parse_money
+
+TODAY = date(2026, 1, 10)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.234,56", 1234.56),
+    ("R$ 1.234,56", 1234.56),
+    ("2.500", 2500.0),
+    ("12.5", 12.5),
+    ("45.50", 45.5),
+    ("45,50", 45.5),
+    ("R$ 150", 150.0),
+    ("r$150", 150.0),
+    ("1500", 1500.0),
+    ("abc", None),
+])
+def test_parse_money(text, expected):
+    assert parse_money(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hoje", date(2026, 1, 10)),
+    ("ontem", date(2026, 1, 9)),
+    ("Anteontem", date(2026, 1, 8)),
+    ("05/01", date(2026, 1, 5)),
+    # Without a year, a day still to come this year means last year.
+    ("15/03", date(2025, 3, 15)),
+    ("28/12", date(2025, 12, 28)),
+    ("15/03/24", date(2024, 3, 15)),
+    ("15/03/2024", date(2024, 3, 15)),
+    ("31/02", None),
+    ("29/02/2025", None),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text, TODAY) == expected
+
+
+def test_relative_dates_cross_month_boundaries():
+    assert parse_date("ontem", date(2026, 3, 1)) == date(2026, 2, 28)
+
+
+@pytest.mark.parametrize("message, amount, day, description", [
+    ("almoço 32,50", 32.5, None, "almoço"),
+    ("ontem uber 18", 18.0, date(2026, 1, 9), "uber"),
+    ("mercado 15/03 R$ 245,90", 245.9, date(2025, 3, 15), "mercado"),
+    ("2 camisas 99,90 hoje", 99.9, date(2026, 1, 10), "2 camisas"),
+    ("aluguel 1.500", 1500.0, None, "aluguel"),
+    # An impossible date is not read as an amount either, it stays in the description.
+    ("31/02 cinema 40", 40.0, None, "31/02 cinema"),
+])
+def test_parse_message(message, amount, day, description):
+    parsed = parse_message(message, TODAY)
+    assert (parsed.amount, parsed.date, parsed.description) == (amount, day, description)
@@ -0,0 +1,124 @@
+from collections import defaultdict
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select, text
+
+from models.category import Category, resolve_category_id
+from models.money import from_cents, to_cents
+from models.rollup import MonthlyRollup
+from models.transaction import Transaction
+from scripts.migrate import backfill_rollups, migrate
+from services.database import db_manager
+
+# (telegram_id, type, amount in reais as the FLOAT column stored it, category, date)
+LEGACY_TRANSACTIONS = [
+    (1, "despesa_variavel", 0.1 + 0.2, "Alimentação", date(2025, 1, 5)),
+    (1, "despesa_variavel", 19.99, "Alimentação", date(2025, 1, 20)),
+    (1, "despesa_fixa", 1500.0, "Moradia", date(2025, 1, 10)),
+    (1, "despesa_variavel", 45.5, "Pets", date(2025, 2, 3)),
+    (1, "renda", 5000.01, "Salário", date(2025, 2, 5)),
+    (2, "despesa_variavel", 12.5, "Alimentação", date(2025, 1, 7)),
+]
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """
+    A database as the baseline models' `create_all` made it: FLOAT amounts,
+    category names on every row, no rollup tables and no alembic_version.
+    """
+    previous = (db_manager.database_url, db_manager.read_url)
+    db_manager.configure(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # Revision 0001 is that schema; drop what create_all never made.
+    migrate("0001")
+    with db_manager.engine.begin() as connection:
+        for table in ("alembic_version", "daily_rollups", "monthly_rollups"):
+            connection.execute(text(f"DROP TABLE {table}"))
+        for telegram_id in {row[0] for row in LEGACY_TRANSACTIONS}:
+            connection.execute(
+                text("INSERT INTO users (telegram_id, first_name) VALUES (:id, 'Legacy')"), {"id": telegram_id}
+            )
+        for telegram_id, type_, amount, category, day in LEGACY_TRANSACTIONS:
+            connection.execute(
+                text(
+                    "INSERT INTO transactions (telegram_id, type, amount, category, description, date) "
+                    "VALUES (:telegram_id, :type, :amount, :category, 'legado', :date)"
+                ),
+                {"telegram_id": telegram_id, "type": type_, "amount": amount, "category": category, "date": day},
+            )
+    yield db_manager
+    db_manager.configure(*previous)
+
+
+@pytest.mark.parametrize("value, cents", [
+    (0.1 + 0.2, 30),
+    (19.99, 1999),
+    ("19.99", 1999),
+    # Half up on the decimal value, where float rounding would give 267.
+    (2.675, 268),
+    (0.125, 13),
+    (-0.125, -13),
+    (1500, 150000),
+    (None, None),
+])
+def test_to_cents(value, cents):
+    assert to_cents(value) == cents
+
+
+def test_reais_attribute_reads_and_writes_cents():
+    t = Transaction(amount=19.99)
+    assert t.amount_cents == 1999
+    assert t.amount == 19.99
+    t.amount = 0.1 + 0.2
+    assert (t.amount_cents, t.amount) == (30, 0.3)
+    assert from_cents(None) is None
+
+
+def test_migration_converts_float_amounts_to_cents(legacy_database):
+    migrate(manager=legacy_database)
+    backfill_rollups(legacy_database)
+
+    with legacy_database.get_session() as session:
+        transactions = session.execute(select(Transaction).order_by(Transaction.id)).scalars().all()
+        assert [t.amount_cents for t in transactions] == [30, 1999, 150000, 4550, 500001, 1250]
+        assert [t.category for t in transactions] == [row[3] for row in LEGACY_TRANSACTIONS]
+        # The reais attribute also works in SQL.
+        assert session.execute(
+            select(func.count(Transaction.id)).where(Transaction.amount > 1000)
+        ).scalar() == 2
+
+
+def test_migration_adds_every_category_name(legacy_database):
+    migrate(manager=legacy_database)
+
+    with legacy_database.get_session() as session:
+        names = set(session.execute(select(Category.name)).scalars())
+        assert names == {row[3] for row in LEGACY_TRANSACTIONS}
+        # "Pets" is not a default category: it got its row like the others.
+        assert resolve_category_id(session, "Pets") == session.execute(
+            select(Category.id).where(Category.name == "Pets")
+        ).scalar()
+        # A name seen for the first time after the migration gets a new row.
+        new_id = resolve_category_id(session, "Viagem")
+        session.commit()
+        assert session.execute(select(Category.name).where(Category.id == new_id)).scalar() == "Viagem"
+        assert session.execute(select(func.count(Category.id))).scalar() == len(names) + 1
+
+
+def test_backfilled_monthly_rollups_match_the_transactions(legacy_database):
+    migrate(manager=legacy_database)
+    backfill_rollups(legacy_database)
+
+    expected = defaultdict(lambda: [0, 0])
+    for telegram_id, type_, amount, category, day in LEGACY_TRANSACTIONS:
+        key = (telegram_id, day.year, day.month, type_, category)
+        expected[key][0] += to_cents(amount)
+        expected[key][1] += 1
+
+    with legacy_database.get_session() as session:
+        rollups = session.execute(select(MonthlyRollup, Category.name).join(Category)).all()
+        actual = {
+            (r.telegram_id, r.year, r.month, r.type, name): [r.total_cents, r.count] for r, name in rollups
+        }
+    assert actual == dict(expected)
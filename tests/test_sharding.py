@@ -0,0 +1,173 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+import scripts.shards
+from conftest import user_on
+from models.category import resolve_category_id
+from models.financial_goal import FinancialGoal
+from models.rollup import MonthlyRollup
+from models.transaction import Transaction
+from models.user import User
+from models.user_shard import UserShard
+from services.goal_service import goal_service
+from services.shard_router import DEFAULT_SHARD, HashRing, ShardMovingError, parse_shards
+from services.transactions_service import transactions_service
+from services.users_service import UsersService
+
+
+def add_user(telegram_id: int):
+    UsersService.get_or_create_user({"id": telegram_id, "username": None, "first_name": "Test", "last_name": None})
+
+
+def add_transaction(telegram_id: int, description: str, amount: float = 10.0, category: str = "Alimentação"):
+    return transactions_service.create(telegram_id, description, amount, category, "despesa_variavel", date.today())
+
+
+def rows_on(router, shard: str, model, telegram_id: int) -> int:
+    with router.managers[shard].get_session() as session:
+        return session.query(func.count(model.id)).filter(model.telegram_id == telegram_id).scalar()
+
+
+def test_parse_shards():
+    assert parse_shards("") == {}
+    assert parse_shards(" a=sqlite:///a.db , b=sqlite:///b.db") == {"a": "sqlite:///a.db", "b": "sqlite:///b.db"}
+    with pytest.raises(ValueError):
+        parse_shards("a")
+
+
+def test_hash_ring_only_remaps_keys_to_the_new_shard():
+    before = HashRing(["default", "a"])
+    after = HashRing(["default", "a", "b"])
+    moved = [key for key in range(3000) if before.lookup(key) != after.lookup(key)]
+    assert all(after.lookup(key) == "b" for key in moved)
+    assert 0.15 < len(moved) / 3000 < 0.5
+
+
+def test_new_users_are_placed_by_the_ring_and_recorded(shards):
+    telegram_id = user_on(shards, "other")
+    add_user(telegram_id)
+
+    assert shards.shard_for(telegram_id) == "other"
+    assert rows_on(shards, "other", User, telegram_id) == 1
+    assert rows_on(shards, DEFAULT_SHARD, User, telegram_id) == 0
+    # The directory lives on the default shard.
+    with shards.managers[DEFAULT_SHARD].get_session() as session:
+        assert session.get(UserShard, telegram_id).shard == "other"
+
+
+def test_users_created_before_sharding_stay_on_default(shards):
+    telegram_id = user_on(shards, "other")
+    with shards.managers[DEFAULT_SHARD].get_session() as session:
+        session.add(User(telegram_id=telegram_id, first_name="Legacy"))
+        session.commit()
+
+    assert shards.shard_for(telegram_id) == DEFAULT_SHARD
+
+
+def test_transactions_are_written_to_the_owner_shard(shards):
+    telegram_id = user_on(shards, "other")
+    add_user(telegram_id)
+    add_transaction(telegram_id, "mercado")
+
+    assert rows_on(shards, "other", Transaction, telegram_id) == 1
+    assert rows_on(shards, DEFAULT_SHARD, Transaction, telegram_id) == 0
+    assert transactions_service.get_recent_transactions(telegram_id)[0].description == "mercado"
+
+
+def test_lookups_by_id_never_match_another_users_row(shards):
+    owner, neighbour = user_on(shards, DEFAULT_SHARD), user_on(shards, DEFAULT_SHARD, start=5000)
+    remote = user_on(shards, "other")
+    for telegram_id in (owner, neighbour, remote):
+        add_user(telegram_id)
+    mine = add_transaction(owner, "aluguel")
+    theirs = add_transaction(remote, "cinema")
+    # Ids are only unique per shard: both are the first row of their database.
+    assert mine.id == theirs.id
+
+    assert transactions_service.get_by_id(mine.id, owner).description == "aluguel"
+    assert transactions_service.get_by_id(theirs.id, remote).description == "cinema"
+    assert transactions_service.get_by_id(mine.id, neighbour) is None
+    assert transactions_service.update(mine.id, neighbour, description="hacked") is False
+    assert transactions_service.delete(mine.id, neighbour) is False
+    assert transactions_service.get_by_id(mine.id, owner).description == "aluguel"
+
+    assert goal_service.create_goal(owner, "Viagem", 1000, "2030-01-01")
+    goal_id = goal_service.get_user_goals(owner)[0]["id"]
+    assert goal_service.get_goal_by_id(goal_id, neighbour) is None
+    assert goal_service.update_goal_progress(goal_id, 500, neighbour) is False
+    assert goal_service.delete_goal(goal_id, neighbour) is False
+    assert goal_service.get_goal_by_id(goal_id, owner)["current_amount"] == 0
+
+
+def test_async_lookups_are_routed_and_owner_checked(shards):
+    owner, stranger = user_on(shards, "other"), user_on(shards, DEFAULT_SHARD)
+    add_user(owner)
+    add_user(stranger)
+    t = add_transaction(owner, "farmácia")
+
+    async def run():
+        try:
+            found = await transactions_service.get_by_id_async(t.id, owner)
+            missing = await transactions_service.get_by_id_async(t.id, stranger)
+            deleted = await transactions_service.delete_async(t.id, stranger)
+            return found, missing, deleted
+        finally:
+            await shards.dispose_async()
+
+    found, missing, deleted = asyncio.run(run())
+    assert found.description == "farmácia"
+    assert missing is None
+    assert deleted is False
+
+
+def test_writes_fail_while_the_user_is_moving(shards):
+    telegram_id = user_on(shards, "other")
+    add_user(telegram_id)
+    shards.set_placement(telegram_id, "other", moving=True)
+
+    assert shards.shard_for(telegram_id, for_write=False) == "other"
+    with pytest.raises(ShardMovingError):
+        shards.shard_for(telegram_id, for_write=True)
+    assert add_transaction(telegram_id, "mercado") is None
+
+
+def test_move_copies_the_user_and_switches_the_directory(shards):
+    telegram_id = user_on(shards, DEFAULT_SHARD)
+    add_user(telegram_id)
+    add_transaction(telegram_id, "almoço", 32.5, "Alimentação")
+    add_transaction(telegram_id, "uber", 18.0, "Transporte")
+    goal_service.create_goal(telegram_id, "Reserva", 5000, "2030-01-01")
+    # Category ids are numbered per shard; the move must translate them by name.
+    with shards.managers["other"].get_session() as session:
+        resolve_category_id(session, "Lazer")
+        session.commit()
+
+    scripts.shards.move(telegram_id, "other")
+
+    assert shards.shard_for(telegram_id) == "other"
+    for model in (User, Transaction, FinancialGoal, MonthlyRollup):
+        assert rows_on(shards, DEFAULT_SHARD, model, telegram_id) == 0
+        assert rows_on(shards, "other", model, telegram_id) > 0
+    with shards.managers["other"].get_session() as session:
+        moved = session.execute(
+            select(Transaction).where(Transaction.telegram_id == telegram_id).order_by(Transaction.id)
+        ).scalars().all()
+        assert [(t.description, t.category, t.amount) for t in moved] == [
+            ("almoço", "Alimentação", 32.5),
+            ("uber", "Transporte", 18.0),
+        ]
+    # The services follow the directory.
+    assert sorted(t.description for t in transactions_service.get_recent_transactions(telegram_id)) == ["almoço", "uber"]
+
+
+def test_move_to_the_current_shard_changes_nothing(shards):
+    telegram_id = user_on(shards, "other")
+    add_user(telegram_id)
+    add_transaction(telegram_id, "mercado")
+
+    scripts.shards.move(telegram_id, "other")
+
+    assert rows_on(shards, "other", Transaction, telegram_id) == 1
@@ -0,0 +1,120 @@
+import io
+from datetime import date
+
+import pytest
+
+from conftest import user_on
+from services.shard_router import DEFAULT_SHARD
+from services.statement_import import (
+    StatementRow, parse_amount, read_csv, read_ofx, read_statement, sniff_delimiter, statement_importer,
+)
+from services.transactions_service import transactions_service
+from services.users_service import UsersService
+
+BANK_CSV = """Banco Exemplo S.A.
+Agência: 0001;Conta: 12345-6
+Período: 01/01/2025 a 31/01/2025
+
+Data;Descrição;Valor;Saldo
+02/01/2025;Pix enviado mercado;-245,90;1.754,10
+05/01/2025;Salário;5.000,00;6.754,10
+;Saldo do dia;;6.754,10
+10/01/2025;Netflix.com;-55,90;6.698,20
+"""
+
+SGML_OFX = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250102120000[-3:BRT]
+<TRNAMT>-245.90
+<MEMO>Pix enviado mercado
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250105
+<TRNAMT>5000.00
+<NAME>Salario
+</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+EXPECTED = [
+    StatementRow(date(2025, 1, 2), -24590, "Pix enviado mercado"),
+    StatementRow(date(2025, 1, 5), 500000, "Salário"),
+    None,
+    StatementRow(date(2025, 1, 10), -5590, "Netflix.com"),
+]
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("-1.234,56", -123456),
+    ("1,234.56", 123456),
+    ("1.234.567,89", 123456789),
+    ("(45.90)", -4590),
+    ("45,90 D", -4590),
+    ("45,90 C", 4590),
+    ("45,90-", -4590),
+    ("R$ 2.500", 250000),
+    ("+12,3", 1230),
+    ("", None),
+    ("saldo", None),
+])
+def test_parse_amount(text, cents):
+    assert parse_amount(text) == cents
+
+
+def test_sniff_delimiter_ignores_the_bank_header():
+    assert sniff_delimiter(BANK_CSV) == ";"
+    assert sniff_delimiter("date,description,amount\n2025-01-02,uber,-18.00\n") == ","
+    assert sniff_delimiter("data\tdescricao\tvalor\n02/01/2025\tuber\t-18,00\n") == "\t"
+
+
+def test_read_csv_finds_the_header_below_the_account_details():
+    assert list(read_csv(io.StringIO(BANK_CSV))) == EXPECTED
+
+
+def test_read_csv_without_the_columns_fails():
+    with pytest.raises(ValueError):
+        list(read_csv(io.StringIO("a;b;c\n1;2;3\n")))
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_read_ofx_with_unclosed_sgml_tags(chunk_size):
+    # Small chunks cut tags in half between reads.
+    rows = list(read_ofx(io.StringIO(SGML_OFX), chunk_size=chunk_size))
+    assert rows == [
+        StatementRow(date(2025, 1, 2), -24590, "Pix enviado mercado"),
+        StatementRow(date(2025, 1, 5), 500000, "Salario"),
+    ]
+
+
+def test_read_statement_detects_format_and_encoding():
+    cp1252 = BANK_CSV.encode("cp1252")
+    assert list(read_statement(io.BytesIO(cp1252), "extrato.csv")) == EXPECTED
+    assert len(list(read_statement(io.BytesIO(SGML_OFX.encode()), "extrato"))) == 2
+
+
+def test_importing_the_same_file_twice_adds_nothing(shards):
+    telegram_id = user_on(shards, DEFAULT_SHARD)
+    UsersService.get_or_create_user({"id": telegram_id, "username": None, "first_name": "Test", "last_name": None})
+    data = BANK_CSV.encode()
+
+    first = statement_importer.import_file(telegram_id, io.BytesIO(data), "extrato.csv", chunk_size=2)
+    second = statement_importer.import_file(telegram_id, io.BytesIO(data), "extrato.csv", chunk_size=2)
+
+    assert (first["error"], first["imported"], first["duplicates"], first["invalid"]) == (None, 3, 0, 1)
+    assert (second["error"], second["imported"], second["duplicates"], second["invalid"]) == (None, 0, 3, 1)
+    stored = transactions_service.get_recent_transactions(telegram_id)
+    assert sorted((t.date, t.type, t.amount) for t in stored) == [
+        (date(2025, 1, 2), "despesa_variavel", 245.9),
+        (date(2025, 1, 5), "renda", 5000.0),
+        (date(2025, 1, 10), "despesa_variavel", 55.9),
+    ]
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from datetime import date
+
+from conftest import user_on
+from models.user import User
+from services.shard_router import DEFAULT_SHARD
+from services.transaction_batcher import TransactionWriteBatcher
+from services.transactions_service import transactions_service
+
+
+def profile(telegram_id: int, username: str) -> dict:
+    return {"id": telegram_id, "username": username, "first_name": "Test", "last_name": None}
+
+
+def test_batched_messages_upsert_and_log_profile_changes(shards, monkeypatch, caplog):
+    batcher = TransactionWriteBatcher(window_ms=5)
+    monkeypatch.setattr(transactions_service, "write_batcher", batcher)
+    first, second = user_on(shards, DEFAULT_SHARD), user_on(shards, "other")
+
+    async def send(*profiles):
+        try:
+            return await asyncio.gather(*(
+                transactions_service.create_for_user_async(
+                    p, "almoço", 32.5, "Alimentação", "despesa_variavel", date.today(), "regex"
+                )
+                for p in profiles
+            ))
+        finally:
+            await shards.dispose_async()
+
+    def messages():
+        return [r.getMessage() for r in caplog.records if r.name == "services.users_service"]
+
+    with caplog.at_level(logging.INFO, logger="services.users_service"):
+        created = asyncio.run(send(profile(first, "ana"), profile(first, "ana"), profile(second, "bia")))
+        assert all(t is not None and t.id is not None for t in created)
+        assert sorted(messages()) == sorted([f"Novo usuário criado: {first} - ana", f"Novo usuário criado: {second} - bia"])
+
+        caplog.clear()
+        asyncio.run(send(profile(first, "ana_b"), profile(second, "bia")))
+        assert messages() == [f"Usuário atualizado: {first} - ana_b"]
+
+    with shards.get_session(first) as session:
+        assert session.query(User).filter_by(telegram_id=first).one().username == "ana_b"
+    assert len(transactions_service.get_recent_transactions(first)) == 3
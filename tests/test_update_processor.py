@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from bot.update_processor import PerUserUpdateProcessor
+
+
+def message_from(update_id: int, telegram_id: int) -> Update:
+    user = User(id=telegram_id, first_name="Test", is_bot=False)
+    chat = Chat(id=telegram_id, type="private")
+    return Update(update_id, message=Message(update_id, datetime.now(), chat, from_user=user, text="x"))
+
+
+def test_each_users_updates_run_in_order_and_users_run_concurrently():
+    processor = PerUserUpdateProcessor(64)
+    events = []
+
+    async def handle(update_id: int, delay: float):
+        events.append(("start", update_id))
+        await asyncio.sleep(delay)
+        events.append(("end", update_id))
+
+    async def run():
+        # Update 1 is slow; 2 and 4 (same user) must wait for it, 3 (another user) must not.
+        await asyncio.gather(*(
+            processor.process_update(message_from(update_id, telegram_id), handle(update_id, delay))
+            for update_id, telegram_id, delay in [(1, 10, 0.05), (2, 10, 0), (3, 20, 0), (4, 10, 0)]
+        ))
+
+    asyncio.run(run())
+    same_user = [e for e in events if e[1] != 3]
+    assert same_user == [("start", 1), ("end", 1), ("start", 2), ("end", 2), ("start", 4), ("end", 4)]
+    assert events.index(("end", 3)) < events.index(("end", 1))
+    assert processor._locks == {}